@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Benchmark and quality harness for the WMNF stylized terrain engine.
+
+Builds a deterministic Gaussian-hill DEM fixture (wmnf_terrain.fixture) on a
+block of whole tiles at a fixed native zoom and runs the tile stages of
+build-wmnf-stylized-tiles.py on it directly, with no GDAL or network access:
+
+  hash       per-tile input hashing used for incremental planning
+  hillshade  windowed Horn hillshade of the whole fixture
+  contours   native contour tracing to zoom-banded GeoJSONSeq
+  mvt        contour tiles encoded to MVT
+  terrain    Terrain-RGB/Terrarium elevation tiles
+  pmtiles    contour + terrain archives
+
+Each stage reports wall time (best of --repeat), tiles (or features) per
+second and bytes per tile. Outputs are then checked against the committed
+golden set (data/wmnf-terrain-bench-golden.json):
+
+  hillshade/terrain  per-tile pixel hash, falling back to a 4x4 block-mean
+                     pixel diff within a tolerance
+  contours/mvt       feature counts per zoom / per tile
+  terrain            decode round-trip error against the sampled DEM
+
+so engine changes can be validated for speed (compare with --baseline) and
+output parity offline. Intentional output changes are recorded with
+--update-golden. --write-geotiff also saves the fixture as an EPSG:3857
+GeoTIFF for an end-to-end run with build-wmnf-stylized-tiles.py --dem-source.
+
+Outputs:
+  tmp/wmnf-bench/report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from wmnf_terrain.archive import iter_directory_tiles, write_pmtiles
+from wmnf_terrain.contours import generate_native_contours, iter_geojson_features
+from wmnf_terrain.dem import DemRaster, mercator_to_lonlat, np, require_numpy, window_size_for_budget
+from wmnf_terrain.elevation import decode_elevation, native_zoom, sample_tile, write_elevation_tiles
+from wmnf_terrain.fixture import fixture_summary, tile_for_lonlat, write_fixture_dem, write_fixture_geotiff
+from wmnf_terrain.hillshade import render_hillshade
+from wmnf_terrain.manifest import iter_footprint, tile_input_hashes
+from wmnf_terrain.mvt import BUFFER as MVT_BUFFER, EXTENT as MVT_EXTENT, layer_feature_counts, write_contour_tiles
+from wmnf_terrain.tiles import iter_tile_files, tile_id
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - surfaced when terrain tiles are checked
+    Image = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_WORK_DIR = ROOT / "tmp" / "wmnf-bench"
+DEFAULT_GOLDEN = ROOT / "data" / "wmnf-terrain-bench-golden.json"
+# Fixture anchor inside the WMNF so coordinates and latitudes are realistic.
+FIXTURE_ANCHOR_LONLAT = (-71.45, 44.3)
+THUMBNAIL_BLOCKS = 4
+ENCODING_PRECISION_M = {"mapbox": 0.05, "terrarium": 1.0 / 256.0}
+
+
+def iso_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+
+def write_json(path: Path, payload: Dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="\n") as handle:
+        json.dump(payload, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def reset_dir(path: Path) -> None:
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+
+def timed(repeat: int, prepare: Callable[[], None], run: Callable[[], object]) -> Tuple[float, object]:
+    """Best wall time of ``repeat`` runs of ``run`` (each after ``prepare``) and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        prepare()
+        started = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def stage_record(name: str, seconds: float, items: int, unit: str, byte_count: int) -> Dict:
+    record = {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "items": items,
+        "unit": unit,
+        "items_per_sec": round(items / seconds, 2) if seconds > 0 else None,
+        "bytes": byte_count,
+        "bytes_per_item": round(byte_count / items, 1) if items else None,
+    }
+    print(
+        f"[bench-wmnf-stylized] {name:<10} {seconds:8.3f}s  {items:6d} {unit}(s)  "
+        f"{record['items_per_sec'] or 0:10.1f} {unit}/s  {record['bytes_per_item'] or 0:10.1f} B/{unit}"
+    )
+    return record
+
+
+def raster_signature(values: "np.ndarray", decimals: int) -> Dict:
+    """Exact hash of a tile's pixels plus a coarse block-mean thumbnail for pixel diffs."""
+    rounded = np.round(values, decimals)
+    digest = hashlib.sha256(np.ascontiguousarray(np.nan_to_num(rounded, nan=-1e9)).tobytes()).hexdigest()[:16]
+    block = values.shape[0] // THUMBNAIL_BLOCKS
+    blocks = values[: block * THUMBNAIL_BLOCKS, : block * THUMBNAIL_BLOCKS].reshape(
+        THUMBNAIL_BLOCKS, block, THUMBNAIL_BLOCKS, block
+    )
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=(1, 3))
+    totals = np.where(valid, blocks, 0.0).sum(axis=(1, 3))
+    means = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    return {
+        "sha": digest,
+        "thumb": [None if np.isnan(value) else round(float(value), 2) for value in means.ravel()],
+    }
+
+
+def hillshade_signatures(raw_path: Path, dem: DemRaster) -> Dict[str, Dict]:
+    """Signatures of the shaded raster cut into the fixture's native-zoom tiles."""
+    zoom = int(round(native_zoom(dem)))
+    row_offset, col_offset = dem.global_offset
+    shaded = np.memmap(raw_path, dtype=np.uint8, mode="r", shape=(dem.rows, dem.cols))
+    signatures = {}
+    for row0 in range(0, dem.rows, 256):
+        for col0 in range(0, dem.cols, 256):
+            tile = shaded[row0:row0 + 256, col0:col0 + 256].astype(np.float64)
+            tile[tile == 0] = np.nan
+            tid = tile_id(zoom, (col0 + col_offset) // 256, (row0 + row_offset) // 256)
+            signatures[tid] = raster_signature(tile, 0)
+    return signatures
+
+
+def terrain_signatures(terrain_dir: Path, dem: DemRaster, encoding: str) -> Tuple[Dict[str, Dict], float]:
+    """Signatures of decoded elevation tiles and the worst decode error against the sampled DEM."""
+    if Image is None:
+        raise RuntimeError("Pillow is required to check terrain tiles. Install with `python -m pip install pillow`.")
+    signatures = {}
+    worst = 0.0
+    for tid, path in iter_tile_files(terrain_dir, ".png"):
+        with Image.open(BytesIO(path.read_bytes())) as image:
+            rgb = np.asarray(image.convert("RGB"))
+        z, x, y = (int(part) for part in tid.split("/"))
+        expected = sample_tile(dem, z, x, y)
+        decoded = decode_elevation(rgb, encoding)
+        valid = ~np.isnan(expected)
+        if valid.any():
+            worst = max(worst, float(np.abs(decoded[valid] - expected[valid]).max()))
+        decoded[~valid] = np.nan
+        signatures[tid] = raster_signature(decoded, 2)
+    return signatures, worst
+
+
+def contour_zoom_counts(geojson_path: Path, min_zoom: int, max_zoom: int) -> Dict[str, Dict[str, int]]:
+    """Features and vertices visible at each zoom of the zoom-banded contour file."""
+    counts = {str(zoom): {"features": 0, "vertices": 0} for zoom in range(min_zoom, max_zoom + 1)}
+    for feature in iter_geojson_features(geojson_path):
+        hints = feature.get("tippecanoe") or {}
+        vertices = len((feature.get("geometry") or {}).get("coordinates") or [])
+        for zoom in range(max(min_zoom, hints.get("minzoom", min_zoom)), min(max_zoom, hints.get("maxzoom", max_zoom)) + 1):
+            counts[str(zoom)]["features"] += 1
+            counts[str(zoom)]["vertices"] += vertices
+    return counts
+
+
+def mvt_feature_counts(contours_dir: Path) -> Dict[str, int]:
+    return {
+        tid: sum(layer_feature_counts(path.read_bytes()).values()) for tid, path in iter_tile_files(contours_dir, ".pbf")
+    }
+
+
+def compare_rasters(layer: str, golden: Dict[str, Dict], current: Dict[str, Dict], tolerance: float) -> Tuple[Dict, List[str]]:
+    """Exact hash match per tile, else the largest block-mean pixel difference must stay within ``tolerance``."""
+    failures = []
+    missing = sorted(set(golden) - set(current))
+    extra = sorted(set(current) - set(golden))
+    if missing:
+        failures.append(f"{layer}: {len(missing)} golden tile(s) missing, e.g. {missing[0]}")
+    if extra:
+        failures.append(f"{layer}: {len(extra)} unexpected tile(s), e.g. {extra[0]}")
+    exact = 0
+    max_diff = 0.0
+    for tid in sorted(set(golden) & set(current)):
+        expected, actual = golden[tid], current[tid]
+        if expected["sha"] == actual["sha"]:
+            exact += 1
+            continue
+        for want, got in zip(expected["thumb"], actual["thumb"]):
+            if (want is None) != (got is None):
+                failures.append(f"{layer}: nodata footprint changed in tile {tid}")
+                break
+            if want is not None:
+                max_diff = max(max_diff, abs(want - got))
+    if max_diff > tolerance:
+        failures.append(f"{layer}: block-mean pixel diff {max_diff:g} exceeds tolerance {tolerance:g}")
+    summary = {"tiles": len(current), "exact": exact, "max_block_diff": round(max_diff, 4), "tolerance": tolerance}
+    print(
+        f"[bench-wmnf-stylized] parity {layer}: {exact}/{len(golden)} exact, "
+        f"max block diff {max_diff:g} (tolerance {tolerance:g})"
+    )
+    return summary, failures
+
+
+def compare_counts(layer: str, golden: Dict, current: Dict, tolerance: float) -> Tuple[Dict, List[str]]:
+    """Compare (possibly nested) count tables key by key within a relative ``tolerance``."""
+    failures = []
+    worst = 0.0
+    checked = 0
+
+    def walk(prefix: str, want, got) -> None:
+        nonlocal worst, checked
+        if isinstance(want, dict):
+            for key in sorted(set(want) | set(got or {})):
+                walk(f"{prefix}{key}/", want.get(key), (got or {}).get(key))
+            return
+        checked += 1
+        if got is None or want is None:
+            failures.append(f"{layer}: {prefix.rstrip('/')} present in only one of golden/current")
+            return
+        drift = abs(got - want) / max(1, want)
+        worst = max(worst, drift)
+        if drift > tolerance:
+            failures.append(f"{layer}: {prefix.rstrip('/')} is {got}, golden {want}")
+
+    walk("", golden, current)
+    summary = {"checked": checked, "max_relative_drift": round(worst, 4), "tolerance": tolerance}
+    print(
+        f"[bench-wmnf-stylized] parity {layer}: {checked} count(s), "
+        f"max relative drift {worst:g} (tolerance {tolerance:g})"
+    )
+    return summary, failures[:20]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the WMNF stylized tile stages on a synthetic DEM fixture.")
+    parser.add_argument("--work-dir", type=Path, default=DEFAULT_WORK_DIR)
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN)
+    parser.add_argument("--report", type=Path, default=None, help="Report path (default: <work-dir>/report.json).")
+    parser.add_argument("--baseline", type=Path, default=None, help="Earlier report.json to compare stage speeds against.")
+    parser.add_argument("--update-golden", action="store_true", help="Record the current outputs as the golden set.")
+    parser.add_argument("--write-geotiff", type=Path, default=None, help="Also save the fixture as an EPSG:3857 GeoTIFF.")
+    parser.add_argument("--native-zoom", type=int, default=13, help="Zoom whose 256 px tiles match the fixture pixels.")
+    parser.add_argument("--tiles", type=int, default=4, help="Fixture size in native-zoom tiles per side.")
+    parser.add_argument("--min-zoom", type=int, default=10)
+    parser.add_argument("--minor-ft", type=int, default=50)
+    parser.add_argument("--major-ft", type=int, default=200)
+    parser.add_argument("--minor-min-zoom", type=int, default=12)
+    parser.add_argument("--simplify-px", type=float, default=1.0)
+    parser.add_argument("--terrain-encoding", choices=["mapbox", "terrarium"], default="mapbox")
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=16,
+        help="RAM budget for hillshade windows; the small default forces several windows (and seams) on the fixture.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Processes for MVT/terrain stages (1 keeps timings stable).")
+    parser.add_argument("--repeat", type=int, default=1, help="Run each stage this many times and keep the best time.")
+    parser.add_argument("--pixel-tolerance", type=float, default=1.0, help="Max hillshade block-mean diff (shade levels).")
+    parser.add_argument("--elevation-tolerance", type=float, default=0.5, help="Max terrain block-mean diff (metres).")
+    parser.add_argument("--count-tolerance", type=float, default=0.0, help="Max relative drift of feature counts.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    require_numpy()
+    work_dir = args.work_dir.resolve()
+    report_path = (args.report or work_dir / "report.json").resolve()
+    max_zoom = int(args.native_zoom)
+    min_zoom = min(int(args.min_zoom), max_zoom)
+
+    anchor_x, anchor_y = tile_for_lonlat(*FIXTURE_ANCHOR_LONLAT, max_zoom)
+    dem = write_fixture_dem(work_dir / "fixture.bin", max_zoom, anchor_x, anchor_y, args.tiles, args.tiles)
+    fixture = fixture_summary(dem)
+    print(
+        f"[bench-wmnf-stylized] Fixture: {dem.cols}x{dem.rows} px at z{max_zoom} "
+        f"({dem.pixel_width:.2f} m/px), zooms {min_zoom}-{max_zoom}"
+    )
+    if args.write_geotiff:
+        write_fixture_geotiff(dem, args.write_geotiff.resolve())
+        print(f"[bench-wmnf-stylized] Wrote fixture GeoTIFF: {args.write_geotiff}")
+
+    lons, lats = mercator_to_lonlat(
+        np.array([dem.origin_x, dem.origin_x + dem.cols * dem.pixel_width]),
+        np.array([dem.origin_y + dem.rows * dem.pixel_height, dem.origin_y]),
+    )
+    bounds_wgs84 = {
+        "minLon": float(lons[0]),
+        "maxLon": float(lons[1]),
+        "minLat": float(lats[0]),
+        "maxLat": float(lats[1]),
+    }
+    params = {
+        "fixture": fixture,
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "minor_ft": int(args.minor_ft),
+        "major_ft": int(args.major_ft),
+        "minor_min_zoom": int(args.minor_min_zoom),
+        "simplify_px": float(args.simplify_px),
+        "terrain_encoding": args.terrain_encoding,
+    }
+    stages: List[Dict] = []
+    noop = lambda: None  # noqa: E731
+
+    # Input hashing (incremental planning) over the hillshade footprint.
+    seconds, hashes = timed(args.repeat, noop, lambda: tile_input_hashes(dem, min_zoom, max_zoom, "bench", halo_px=2))
+    stages.append(stage_record("hash", seconds, len(hashes), "tile", 0))
+
+    hillshade_vrt = work_dir / "hillshade" / "hillshade.vrt"
+    window = window_size_for_budget(int(args.memory_mb))
+    seconds, _ = timed(
+        args.repeat,
+        lambda: reset_dir(hillshade_vrt.parent),
+        lambda: render_hillshade(dem, hillshade_vrt, window),
+    )
+    native_tiles = (dem.rows // 256) * (dem.cols // 256)
+    stages.append(stage_record("hillshade", seconds, native_tiles, "tile", dem.rows * dem.cols))
+    hillshade = hillshade_signatures(hillshade_vrt.with_suffix(".bin"), dem)
+
+    contours_geojson = work_dir / "contours.geojsonseq"
+    seconds, feature_count = timed(
+        args.repeat,
+        noop,
+        lambda: generate_native_contours(
+            dem,
+            contours_geojson,
+            minor_ft=int(args.minor_ft),
+            major_ft=int(args.major_ft),
+            min_zoom=min_zoom,
+            max_zoom=max_zoom,
+            minor_min_zoom=int(args.minor_min_zoom),
+            simplify_px=float(args.simplify_px),
+        ),
+    )
+    stages.append(stage_record("contours", seconds, int(feature_count), "feature", contours_geojson.stat().st_size))
+    contours = contour_zoom_counts(contours_geojson, min_zoom, max_zoom)
+
+    contours_dir = work_dir / "contours"
+    seconds, encoded = timed(
+        args.repeat,
+        lambda: reset_dir(contours_dir),
+        lambda: write_contour_tiles(
+            contours_geojson, contours_dir, bounds_wgs84, min_zoom, max_zoom, workers=int(args.workers)
+        ),
+    )
+    stages.append(stage_record("mvt", seconds, encoded["tile_count"], "tile", encoded["bytes"]))
+    mvt = mvt_feature_counts(contours_dir)
+
+    terrain_dir = work_dir / "terrain"
+    terrain_tiles = [
+        (zoom, x, y) for zoom in range(min_zoom, max_zoom + 1) for x, y in iter_footprint(dem, zoom)
+    ]
+    seconds, written = timed(
+        args.repeat,
+        lambda: reset_dir(terrain_dir),
+        lambda: write_elevation_tiles(
+            dem, terrain_dir, terrain_tiles, encoding=args.terrain_encoding, workers=int(args.workers)
+        ),
+    )
+    stages.append(stage_record("terrain", seconds, written["tile_count"], "tile", written["bytes"]))
+    terrain, decode_error = terrain_signatures(terrain_dir, dem, args.terrain_encoding)
+
+    def write_archives() -> Dict:
+        contour_archive = write_pmtiles(
+            work_dir / "contours.pmtiles",
+            iter_directory_tiles(contours_dir, ".pbf"),
+            tile_type="mvt",
+            bounds_wgs84=bounds_wgs84,
+            metadata={"name": "bench-contours", "extent": MVT_EXTENT, "buffer": MVT_BUFFER},
+        )
+        terrain_archive = write_pmtiles(
+            work_dir / "terrain.pmtiles",
+            iter_directory_tiles(terrain_dir, ".png"),
+            tile_type="png",
+            bounds_wgs84=bounds_wgs84,
+            metadata={"name": "bench-terrain", "encoding": args.terrain_encoding},
+        )
+        return {"contours": contour_archive, "terrain": terrain_archive}
+
+    seconds, archives = timed(args.repeat, noop, write_archives)
+    archive_tiles = encoded["tile_count"] + written["tile_count"]
+    archive_bytes = sum((work_dir / archive["path"]).stat().st_size for archive in archives.values())
+    stages.append(stage_record("pmtiles", seconds, archive_tiles, "tile", archive_bytes))
+
+    current = {"hillshade": hillshade, "contours": contours, "mvt": mvt, "terrain": terrain}
+    report = {
+        "generated_at": iso_now(),
+        "params": params,
+        "workers": int(args.workers),
+        "repeat": int(args.repeat),
+        "stages": stages,
+        "terrain_decode_error_m": round(decode_error, 4),
+    }
+
+    if args.baseline:
+        baseline = {stage["stage"]: stage for stage in json.loads(args.baseline.read_text(encoding="utf-8"))["stages"]}
+        for stage in stages:
+            before = baseline.get(stage["stage"])
+            if before and before["seconds"] and stage["seconds"]:
+                print(
+                    f"[bench-wmnf-stylized] vs baseline {stage['stage']:<10} "
+                    f"{before['seconds'] / stage['seconds']:6.2f}x ({before['seconds']:.3f}s -> {stage['seconds']:.3f}s)"
+                )
+
+    failures: List[str] = []
+    precision = ENCODING_PRECISION_M[args.terrain_encoding]
+    if decode_error > precision + 1e-9:
+        failures.append(f"terrain: decode error {decode_error:g} m exceeds the {args.terrain_encoding} step {precision:g} m")
+
+    if args.update_golden:
+        write_json(args.golden.resolve(), {"generated_at": iso_now(), "params": params, **current})
+        print(f"[bench-wmnf-stylized] Updated golden set: {args.golden}")
+    else:
+        golden_path = args.golden.resolve()
+        if not golden_path.exists():
+            raise RuntimeError(f"Golden set not found: {golden_path} (record one with --update-golden)")
+        golden = json.loads(golden_path.read_text(encoding="utf-8"))
+        if golden.get("params") != params:
+            raise RuntimeError(
+                "Golden set was recorded with different fixture/build parameters; "
+                "rerun with matching arguments or --update-golden."
+            )
+        parity: Dict[str, Dict] = {}
+        for layer, tolerance in (("hillshade", args.pixel_tolerance), ("terrain", args.elevation_tolerance)):
+            parity[layer], layer_failures = compare_rasters(layer, golden[layer], current[layer], tolerance)
+            failures.extend(layer_failures)
+        for layer in ("contours", "mvt"):
+            parity[layer], layer_failures = compare_counts(layer, golden[layer], current[layer], args.count_tolerance)
+            failures.extend(layer_failures)
+        report["parity"] = parity
+
+    report["failures"] = failures
+    write_json(report_path, report)
+    print(f"[bench-wmnf-stylized] Wrote report: {report_path}")
+    for failure in failures:
+        print(f"[bench-wmnf-stylized] FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[bench-wmnf-stylized] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
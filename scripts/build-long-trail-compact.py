@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Write simplified, compact copies of the generated long-trail section files.
+
+  data/long-trails/generated/<trail>/<section>.json   full resolution (kept)
+  data/long-trails/compact/<trail>/<section>.json     one encoded line per zoom
+  data/long-trails/compact/index.json                 size report per trail
+
+Lines are simplified with zoom-aware Douglas-Peucker (--method dp) or
+Visvalingam-Whyatt (--method vw) at --tolerance-px pixels for each --zoom,
+and encoded as polyline6 (default) or int32 delta arrays (--encoding delta).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from longtrails.compact import COMPACT_DIR, GENERATED_DIR, build_compact
+from longtrails.simplify import DEFAULT_TOLERANCE_PX, DEFAULT_ZOOMS, FORMATS, METHODS
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simplify and encode the generated long-trail sections.")
+    parser.add_argument("--input-dir", type=Path, default=GENERATED_DIR)
+    parser.add_argument("--output-dir", type=Path, default=COMPACT_DIR)
+    parser.add_argument("--zoom", action="append", type=int, help=f"Zoom level to emit (repeatable; default {list(DEFAULT_ZOOMS)}).")
+    parser.add_argument("--tolerance-px", type=float, default=DEFAULT_TOLERANCE_PX, help="Allowed deviation in pixels per zoom.")
+    parser.add_argument("--method", choices=METHODS, default="dp")
+    parser.add_argument("--encoding", choices=FORMATS, default="polyline6")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    zooms = tuple(sorted(set(args.zoom))) if args.zoom else DEFAULT_ZOOMS
+    report = build_compact(
+        args.input_dir, args.output_dir, zooms, args.tolerance_px, args.method, args.encoding, max(1, args.workers)
+    )
+    for trail, entry in sorted(report.items()):
+        saved = 1 - entry["output_bytes"] / entry["source_bytes"] if entry["source_bytes"] else 0.0
+        print(
+            f"[build-long-trail-compact] {trail}: {entry['sections']} section(s), "
+            f"{entry['source_bytes']} -> {entry['output_bytes']} bytes ({saved:.1%} smaller)"
+        )
+    source_total = sum(entry["source_bytes"] for entry in report.values())
+    output_total = sum(entry["output_bytes"] for entry in report.values())
+    index = {
+        "zooms": list(zooms),
+        "tolerancePx": args.tolerance_px,
+        "method": args.method,
+        "encoding": args.encoding,
+        "sourceBytes": source_total,
+        "outputBytes": output_total,
+        "trails": report,
+    }
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    (args.output_dir / "index.json").write_text(json.dumps(index, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(
+        f"[build-long-trail-compact] {sum(entry['sections'] for entry in report.values())} section(s), "
+        f"{source_total} -> {output_total} bytes in {time.perf_counter() - started:.1f}s; wrote {args.output_dir}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-long-trail-compact] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
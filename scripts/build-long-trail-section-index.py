@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Build the quadkey tile index over the generated long-trail sections.
+
+Writes data/long-trails/sections-index.json: every section's bbox and point
+count plus, per zoom-7 tile (--zoom), the sections whose line crosses it.
+Query it with scripts/query-long-trail-sections.py or
+``longtrails.SectionIndex``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from longtrails.compact import GENERATED_DIR
+from longtrails.sections import INDEX_ZOOM, SECTION_INDEX_PATH, build_section_index, write_section_index
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the long-trail section tile index.")
+    parser.add_argument("--input-dir", type=Path, default=GENERATED_DIR)
+    parser.add_argument("--output", "-o", type=Path, default=SECTION_INDEX_PATH)
+    parser.add_argument("--zoom", type=int, default=INDEX_ZOOM, help="Tile zoom of the index.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    index = build_section_index(args.input_dir, args.zoom)
+    write_section_index(index, args.output)
+    print(
+        f"[build-long-trail-section-index] Wrote {args.output} ({len(index['sections'])} section(s), "
+        f"{len(index['tiles'])} tile(s) at z{args.zoom}, {index['skipped']} without geometry, "
+        f"{args.output.stat().st_size} bytes, {time.perf_counter() - started:.1f}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-long-trail-section-index] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
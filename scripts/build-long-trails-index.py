@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Build the per-trail byte offset index for data/long-trails-full.json.
+
+Writes data/long-trails-full.index.json (slug, id, name, byte offset and
+length of every trail, plus the small top-level values) so Python readers
+(``longtrails.LongTrailsFull``) seek to and decode one trail instead of
+parsing the whole document. Re-run after scripts/prepare-long-trails.js;
+--check exits 1 when the index is missing or no longer matches the file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import sys
+from pathlib import Path
+
+from longtrails.full import FULL_PATH, INDEX_PATH, INDEX_VERSION, read_json, write_offset_index
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the long-trails-full.json offset index.")
+    parser.add_argument("--input", "-i", type=Path, default=FULL_PATH)
+    parser.add_argument("--output", "-o", type=Path, default=INDEX_PATH)
+    parser.add_argument("--check", action="store_true", help="Only report whether the index is current.")
+    return parser.parse_args()
+
+
+def index_is_current(source: Path, index_path: Path) -> bool:
+    if not index_path.exists():
+        return False
+    try:
+        index = read_json(index_path)
+    except ValueError:
+        return False
+    raw = source.read_bytes()
+    return (
+        index.get("version") == INDEX_VERSION
+        and index.get("size") == len(raw)
+        and index.get("sha256") == hashlib.sha256(raw).hexdigest()
+    )
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.input.exists():
+        raise RuntimeError(f"Missing {args.input}. Run scripts/prepare-long-trails.js first.")
+    if args.check:
+        current = index_is_current(args.input, args.output)
+        print(f"[build-long-trails-index] {args.output.name} is {'current' if current else 'missing or stale'}")
+        return 0 if current else 1
+    index = write_offset_index(args.input, args.output)
+    print(
+        f"[build-long-trails-index] Wrote {args.output} ({len(index['trails'])} trail(s), "
+        f"{index['size']} source bytes{', BOM' if index['bom'] else ''})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-long-trails-index] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
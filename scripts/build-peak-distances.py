@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Build peak-to-peak distance matrices and nearest-neighbour lists.
+
+For every peak list (nh48.json, NE115.json, ADK46.json, ...) writes to
+data/peak-distances/:
+
+  <list>.f32             condensed float32 distance matrix (km)
+  <list>.neighbors.json  slug order, k nearest peaks per peak and, for the
+                         NH48, the legs of each planner day-trip group
+  index.json             lists, peak counts and files
+
+so planner suggestions and "nearby peaks" blocks read precomputed data
+instead of computing distances in the browser or the worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from nh48data.distances import DEFAULT_NEIGHBORS, DEFAULT_OUTPUT_DIR, peak_distances, write_distances
+from nh48data.loader import ROOT
+from nh48data.snapshot import default_sources
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build peak distance matrices and neighbour lists.")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data", help="Directory holding the list datasets.")
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        type=Path,
+        help="List dataset to include (repeatable); defaults to every known list in --data-dir.",
+    )
+    parser.add_argument("--k", type=int, default=DEFAULT_NEIGHBORS, help="Nearest peaks kept per peak.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    sources = [path.resolve() for path in args.source] or default_sources(args.data_dir.resolve())
+    lists = []
+    for source in sources:
+        if not source.exists():
+            print(f"[build-peak-distances] Skipping missing {source}")
+            continue
+        distances = peak_distances(source)
+        if not len(distances):
+            print(f"[build-peak-distances] Skipping {distances.list_name}: no peak has coordinates")
+            continue
+        index = write_distances(distances, args.output_dir, args.k)
+        lists.append({
+            "list": distances.list_name,
+            "count": index["count"],
+            "missingCoordinates": len(index["missingCoordinates"]),
+            "matrix": index["matrix"]["file"],
+            "neighbors": f"{distances.list_name}.neighbors.json",
+        })
+        print(
+            f"[build-peak-distances] {distances.list_name}: {index['count']} peak(s), "
+            f"{len(index['missingCoordinates'])} without coordinates"
+        )
+    (args.output_dir / "index.json").write_text(json.dumps({"k": args.k, "lists": lists}, indent=2) + "\n", encoding="utf-8")
+    print(f"[build-peak-distances] Wrote {len(lists)} list(s) to {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-peak-distances] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Build the columnar peak list snapshot (data/peak-lists.npz).
+
+Parses every list dataset (nh48.json, NE115.json, ADK46.json, ...) once,
+cleans text numbers ("4,698", "14.8") into float columns (elevation,
+prominence, coordinates, completion time, route distance and gain) and
+writes them with a shared string table to an uncompressed .npz that
+analytics scripts memory-map via ``nh48data.open_snapshot``.
+
+The snapshot records the sha256 of each source; unchanged inputs are not
+rebuilt unless --force is passed. --check exits 1 when the snapshot is
+missing or stale.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from nh48data import DEFAULT_SNAPSHOT, build_snapshot, open_snapshot
+from nh48data.loader import ROOT
+from nh48data.snapshot import default_sources
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the columnar peak list snapshot.")
+    parser.add_argument("--output", "-o", type=Path, default=DEFAULT_SNAPSHOT)
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data", help="Directory holding the list datasets.")
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        type=Path,
+        help="List dataset to include (repeatable); defaults to every known list in --data-dir.",
+    )
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the sources are unchanged.")
+    parser.add_argument("--check", action="store_true", help="Only report whether the snapshot is current.")
+    return parser.parse_args()
+
+
+def snapshot_is_current(output: Path, sources) -> bool:
+    if not output.exists():
+        return False
+    try:
+        return open_snapshot(output).is_current(sources)
+    except Exception:  # noqa: BLE001 - unreadable or old-format snapshots are rebuilt
+        return False
+
+
+def main() -> int:
+    args = parse_args()
+    output = args.output.resolve()
+    sources = [path.resolve() for path in args.source] or default_sources(args.data_dir.resolve())
+    current = snapshot_is_current(output, sources)
+
+    if args.check:
+        print(f"[build-peak-list-snapshot] {output.name} is {'current' if current else 'missing or stale'}")
+        return 0 if current else 1
+    if current and not args.force:
+        print(f"[build-peak-list-snapshot] Sources unchanged; keeping {output}")
+        return 0
+
+    meta = build_snapshot(output, sources)
+    print(
+        f"[build-peak-list-snapshot] Wrote {output} "
+        f"({len(meta['lists'])} list(s), {meta['peak_count']} peak row(s), {meta['route_count']} route(s), "
+        f"{meta['string_count']} string(s), {output.stat().st_size} bytes)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-peak-list-snapshot] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
@@ -1,91 +1,63 @@
-#!/usr/bin/env python3
-import json, re, math, time, urllib.parse, urllib.request
+"""
+Build sameAs links (Wikipedia / Wikidata / OSM / Peakbagger) for the peak lists.
+
+NH48 goes to data/peak-sameas.json; --dataset / --all add the other lists
+(NE115, ADK46, CO14, USStateHighpoints, ...), each written to
+data/peak-sameas/<list>.json.
+
+Peaks are resolved concurrently on asyncio: Nominatim searches are held to
+one request per second, then every search result goes into one candidate
+pool that is blocked by geohash cell and name token (sameas.blocking), so a
+peak is scored, vectorized, against its own results plus nearby same-name
+rows found by other searches. The Wikidata entity of each peak's best own
+row is queued as soon as its search returns, so ``wbgetentities`` batches
+(up to 50 QIDs, --batch-linger) overlap the searches; hits that pooling
+changes are looked up afterwards. Every response is kept in a persistent
+cache (tmp/sameas-cache.sqlite, --ttl-days), and per-list state
+(tmp/sameas-state/) records each peak's query and links so re-runs only
+search peaks whose name/coordinates changed or that are still unresolved. --offline never touches the network, and --nominatim-url /
+--wikidata-url point the run at a local stand-in. --entity-index matches
+peaks against a local index built from Wikidata/OSM dumps
+(build-sameas-entity-index.py) instead, with no requests at all; only peaks
+inside the index's bbox are matched and lists outside it are skipped.
+"""
+import argparse, asyncio, hashlib, json, re, sys, urllib.parse
 from pathlib import Path
+from urllib.parse import urlparse
 
-ROOT = Path(__file__).resolve().parent.parent
-NH48 = ROOT / 'data' / 'nh48.json'
-OUT = ROOT / 'data' / 'peak-sameas.json'
-OVERRIDES = ROOT / 'data' / 'peak-sameas.overrides.json'
-
-UA = 'nh48-sameas-builder/1.2 (https://nh48.info)'
-NOMINATIM = 'https://nominatim.openstreetmap.org/search'
-WD_API = 'https://www.wikidata.org/w/api.php'
+from nh48data import LIST_DATASETS, load_peaks
+from sameas import NOMINATIM_URL, WIKIDATA_API, HostLimit, JsonClient, ResponseCache, WikidataBatcher, nominatim_search_url
+from sameas.blocking import CandidatePool
+from sameas.dump import NORTHEAST_BBOX, EntityIndex, in_bbox
 
-
-def req_json(url, timeout=12, retries=2):
-    req = urllib.request.Request(url, headers={'User-Agent': UA})
-    for i in range(retries + 1):
-        try:
-            with urllib.request.urlopen(req, timeout=timeout) as r:
-                return json.loads(r.read().decode('utf-8'))
-        except Exception:
-            if i == retries:
-                raise
-            time.sleep(0.3 * (i + 1))
-
-
-def parse_coords(text):
-    m = re.findall(r'-?\d+(?:\.\d+)?', str(text or ''))
-    return (float(m[0]), float(m[1])) if len(m) >= 2 else None
-
-
-def norm(s):
-    s = re.sub(r'[^a-z0-9\s]', ' ', str(s or '').lower())
-    s = re.sub(r'\b(mount|mt|mountain|peak)\b', ' ', s)
-    return re.sub(r'\s+', ' ', s).strip()
-
-
-def sim(a, b):
-    sa, sb = set(norm(a).split()), set(norm(b).split())
-    return (len(sa & sb) / len(sa | sb)) if sa and sb else 0.0
-
-
-def km(a, b):
-    lat1, lon1, lat2, lon2 = map(math.radians, [a[0], a[1], b[0], b[1]])
-    dlat, dlon = lat2 - lat1, lon2 - lon1
-    x = math.sin(dlat/2)**2 + math.cos(lat1)*math.cos(lat2)*math.sin(dlon/2)**2
-    return 6371 * 2 * math.atan2(math.sqrt(x), math.sqrt(1-x))
-
-
-def nominatim_lookup(name, coords):
-    query = f'{name}, New Hampshire'
-    params = urllib.parse.urlencode({
-        'q': query,
-        'format': 'jsonv2',
-        'limit': 10,
-        'addressdetails': 1,
-        'extratags': 1,
-        'namedetails': 1,
-    })
-    rows = req_json(f'{NOMINATIM}?{params}', timeout=15)
-    best = None
-    for row in rows:
-        lat = float(row.get('lat', 0))
-        lon = float(row.get('lon', 0))
-        d = km(coords, (lat, lon)) if coords else 20
-        title = row.get('namedetails', {}).get('name') or row.get('display_name', '')
-        s = sim(name, title)
-        if row.get('class') != 'natural' or row.get('type') not in {'peak', 'mountain'}:
-            s *= 0.7
-        score = s * 4 - d * 0.25
-        if not best or score > best[0]:
-            best = (score, row)
-    return best[1] if best else None
-
-
-def wd_entity(qid):
-    if not qid:
-        return {}
-    params = urllib.parse.urlencode({
-        'action': 'wbgetentities',
-        'ids': qid,
-        'props': 'claims|sitelinks',
-        'languages': 'en|fr',
-        'format': 'json',
-        'origin': '*',
-    })
-    data = req_json(f'{WD_API}?{params}')
-    return data.get('entities', {}).get(qid, {})
+ROOT = Path(__file__).resolve().parent.parent
+DATA = ROOT / 'data'
+OUT = DATA / 'peak-sameas.json'
+OUT_DIR = DATA / 'peak-sameas'
+OVERRIDES = DATA / 'peak-sameas.overrides.json'
+CACHE = ROOT / 'tmp' / 'sameas-cache.sqlite'
+STATE_DIR = ROOT / 'tmp' / 'sameas-state'
+
+# Search context per list; lists spanning several states use the peak's "State" field or none.
+REGIONS = {
+    'nh48': 'New Hampshire', 'NH52WAV': 'New Hampshire', 'NH200': 'New Hampshire',
+    'NH300': 'New Hampshire', 'NH500': 'New Hampshire', 'ME4000': 'Maine', 'VT4000': 'Vermont',
+    'ADK46': 'New York', 'Catskill3500': 'New York', 'CO14': 'Colorado', 'ColoradoCentennials': 'Colorado',
+    'CA14ers': 'California', 'WABulgers': 'Washington', 'Montana53': 'Montana', 'AZ2020Peaks': 'Arizona',
+}
+# "State" fields hold postal codes; Nominatim's address.state holds the name.
+STATE_NAMES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California', 'CO': 'Colorado',
+    'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia', 'HI': 'Hawaii', 'ID': 'Idaho',
+    'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa', 'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana',
+    'ME': 'Maine', 'MD': 'Maryland', 'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota',
+    'MS': 'Mississippi', 'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada',
+    'NH': 'New Hampshire', 'NJ': 'New Jersey', 'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina',
+    'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania',
+    'RI': 'Rhode Island', 'SC': 'South Carolina', 'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas',
+    'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia',
+    'WI': 'Wisconsin', 'WY': 'Wyoming',
+}
 
 
 def claim(entity, pid):
@@ -96,7 +68,7 @@ def claim(entity, pid):
         return None
 
 
-def build_links(name, hit):
+def build_links(name, hit, entity):
     if not hit:
         return []
     links = []
@@ -118,7 +90,6 @@ def build_links(name, hit):
             links.insert(0, 'https://fr.wikipedia.org/wiki/' + urllib.parse.quote(title.replace(' ', '_')))
 
     if wd:
-        entity = wd_entity(wd)
         en = entity.get('sitelinks', {}).get('enwiki', {}).get('title')
         fr = entity.get('sitelinks', {}).get('frwiki', {}).get('title')
         if en:
@@ -148,34 +119,252 @@ def build_links(name, hit):
     return out
 
 
-def main():
-    peaks = json.loads(NH48.read_text())
-    overrides = json.loads(OVERRIDES.read_text()) if OVERRIDES.exists() else {}
-    out = {}
-    for slug, peak in peaks.items():
-        name = peak.get('Peak Name') or peak.get('peakName') or slug
-        coords = parse_coords(peak.get('Coordinates'))
-        hit = None
-        try:
-            hit = nominatim_lookup(name, coords)
-        except Exception:
-            hit = None
-        links = build_links(name, hit)
+def osm_fallback(hit):
+    # hard fallback: always provide at least OSM object when available
+    if hit and hit.get('osm_type') and hit.get('osm_id'):
+        kind = {'N': 'node', 'W': 'way', 'R': 'relation'}.get(hit['osm_type'].upper()[:1])
+        if kind:
+            return [f"https://www.openstreetmap.org/{kind}/{hit['osm_id']}"]
+    return []
+
+
+def search_query(stem, record, name):
+    region = REGIONS.get(stem) or record.get('State', default='')
+    return f'{name}, {region}' if region else f'{name}, United States'
+
+
+def peak_state(stem, record):
+    """Full state name of a peak (from its list, else its "State" field), or None."""
+    state = REGIONS.get(stem) or record.get('State', default='')
+    return STATE_NAMES.get(str(state).upper(), state) or None
+
+
+def signature(query, coords):
+    return hashlib.sha1(json.dumps([query, coords]).encode('utf-8')).hexdigest()[:16]
 
-        if slug in overrides and isinstance(overrides[slug], list):
-            links = [u for u in overrides[slug] if isinstance(u, str) and u.startswith('https://')]
 
-        # hard fallback: always provide at least OSM object when available
-        if not links and hit and hit.get('osm_type') and hit.get('osm_id'):
-            kind = {'N': 'node', 'W': 'way', 'R': 'relation'}.get(hit['osm_type'].upper()[:1])
-            if kind:
-                links = [f"https://www.openstreetmap.org/{kind}/{hit['osm_id']}"]
+class Job:
+    """One peak list: its peaks, previous state and where its links are written."""
 
-        out[slug] = links
-        print(f'{slug}: {len(links)}')
+    def __init__(self, source, args):
+        self.stem = source.stem
+        self.peaks = list(load_peaks(source))
+        self.output = args.output if self.stem == 'nh48' else args.output_dir / f'{self.stem}.json'
+        self.state_path = args.state_dir / f'{self.stem}.json'
+        self.state = json.loads(self.state_path.read_text()) if self.state_path.exists() else {}
+        self.links = {}
+        self.searched = 0
 
-    OUT.write_text(json.dumps({k: out.get(k, []) for k in sorted(peaks.keys())}, indent=2) + '\n')
-    print(f'Wrote {OUT}')
+
+async def search(client, url, fresh):
+    """Nominatim rows for ``url`` (``fresh`` bypasses the cache); None when the search failed."""
+    try:
+        rows = await client.fetch_json(url) if fresh else await client.get_json(url)
+        if fresh:
+            client.cache.put(url, rows)
+    except Exception:
+        return None
+    return rows if isinstance(rows, list) else []
+
+
+async def resolve_all(jobs, args, overrides):
+    cache = ResponseCache(args.cache, ttl_s=args.ttl_days * 86400)
+    # Nominatim last so its stricter limit wins when a stand-in serves both on one host.
+    limits = {
+        urlparse(args.wikidata_url).netloc: HostLimit(concurrency=4),
+        urlparse(args.nominatim_url).netloc: HostLimit(interval_s=args.nominatim_interval, concurrency=1),
+    }
+    client = JsonClient(cache, limits, offline=args.offline, refresh=args.refresh)
+    wikidata = WikidataBatcher(client, args.wikidata_url, linger_s=args.batch_linger)
+    pool = CandidatePool()
+    pending = []  # (job, record, name, signature, url)
+    lookups = {}  # qid -> entity task, started as soon as a search names it
+    remaining = [0]
+
+    def lookup(qid):
+        if qid not in lookups:
+            lookups[qid] = asyncio.ensure_future(wikidata.entity(qid))
+
+    async def search_and_prefetch(job, record, name, url, fresh):
+        # Queue the entity of the peak's own best hit while the other searches run.
+        try:
+            rows = await search(client, url, fresh)
+            if rows:
+                own = CandidatePool()
+                early = own.best(name, record.coordinates, own.add_all(rows), peak_state(job.stem, record))
+                qid = ((early or {}).get('extratags') or {}).get('wikidata')
+                if qid:
+                    lookup(qid)
+            return rows
+        finally:
+            # Once every search is done no more early QIDs can arrive: send the last batch now.
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                wikidata.flush()
+
+    try:
+        # 1. Reuse links of unchanged, resolved peaks (their cached rows still feed the pool); search the rest.
+        for job in jobs:
+            for record in job.peaks:
+                name = record.get('Peak Name', 'peakName', default=record.key)
+                url = nominatim_search_url(search_query(job.stem, record, name), args.nominatim_url)
+                sig = signature(url, record.coordinates)
+                prior = job.state.get(record.key) or {}
+                if prior.get('signature') == sig and prior.get('links') and not args.refresh:
+                    job.links[record.key] = prior['links']
+                    pool.add_all(client.cached(url) or [])
+                    continue
+                pending.append((job, record, name, sig, url))
+        remaining[0] = len(pending)
+        searches = await asyncio.gather(*(
+            search_and_prefetch(job, record, name, url, args.retry_unresolved and record.key in job.state and not args.offline)
+            for job, record, name, sig, url in pending
+        ))
+
+        # 2. Pool every result, then pick each peak's hit from its blocked candidates.
+        own = [pool.add_all(rows or []) for rows in searches]
+        hits = [
+            pool.best(name, record.coordinates, rows, peak_state(job.stem, record))
+            for (job, record, name, sig, url), rows in zip(pending, own)
+        ]
+
+        # 3. Reconcile: hits that pooling changed still need their entity; early lookups for
+        #    hits that were replaced are simply left unused.
+        qids = sorted({((hit or {}).get('extratags') or {}).get('wikidata') for hit in hits} - {None, ''})
+        for qid in qids:
+            lookup(qid)
+        await wikidata.drain()
+        entities, failed = {}, set()
+        for qid, result in zip(qids, await asyncio.gather(*(lookups[qid] for qid in qids), return_exceptions=True)):
+            entities[qid] = result if isinstance(result, dict) else {}
+            if not isinstance(result, dict):
+                failed.add(qid)
+        await asyncio.gather(*lookups.values(), return_exceptions=True)
+        stats = cache.stats()
+    finally:
+        cache.close()
+
+    # Failed searches and hits whose Wikidata lookup failed get no signature, so the next run retries them.
+    remembered = [
+        (job, record, name, sig if rows is not None and ((hit or {}).get('extratags') or {}).get('wikidata') not in failed else None)
+        for (job, record, name, sig, url), rows, hit in zip(pending, searches, hits)
+    ]
+    assign_links(jobs, remembered, hits, entities, overrides)
+    print(
+        f'[build-peak-sameas] {len(pending)} peak(s) searched, {len(pool)} pooled candidate(s), '
+        f'{client.requests} request(s), {wikidata.batches} wbgetentities batch(es), '
+        f'cache {stats["hits"]} hit(s) / {stats["misses"]} miss(es), {stats["rows"]} cached response(s)'
+    )
+
+
+def resolve_from_index(jobs, args, overrides):
+    """Match peaks inside the index bbox against the offline entity index; returns the lists covered.
+
+    Peaks without coordinates or outside the bbox the index was built for are
+    left unmatched, and a list with no peak inside it is skipped (its output
+    is not rewritten), so e.g. Colorado peaks never take Northeast entities.
+    """
+    index = EntityIndex(args.entity_index)
+    try:
+        bbox = tuple(index.meta().get('bbox') or NORTHEAST_BBOX)
+        covered = []
+        for job in jobs:
+            inside = [record for record in job.peaks if record.coordinates and in_bbox(*record.coordinates, bbox)]
+            if inside:
+                covered.append((job, inside))
+            else:
+                print(f'{job.stem}: skipped, no peak inside the index bbox {list(bbox)}')
+        pool = CandidatePool()
+        pool.add_all(index.rows())
+        pending = [(job, record, record.get('Peak Name', 'peakName', default=record.key), None) for job, inside in covered for record in inside]
+        hits = [pool.best(name, record.coordinates, []) for job, record, name, sig in pending]
+        qids = {((hit or {}).get('extratags') or {}).get('wikidata') for hit in hits} - {None, ''}
+        entities = {qid: index.entity(qid) for qid in qids}
+        stats = index.stats()
+    finally:
+        index.close()
+    jobs = [job for job, inside in covered]
+    for job in jobs:
+        job.links.update({record.key: [] for record in job.peaks})
+    assign_links(jobs, pending, hits, entities, overrides)
+    print(
+        f'[build-peak-sameas] {len(pending)} peak(s) matched offline against {args.entity_index} '
+        f'({stats["entities"]} entit(ies), {stats["osm"]} OSM peak(s), {len(pool)} candidate(s))'
+    )
+    return jobs
+
+
+def assign_links(jobs, pending, hits, entities, overrides):
+    """Links per matched peak, remembered in the list's state (no signature: retried next run)."""
+    for (job, record, name, sig), hit in zip(pending, hits):
+        qid = ((hit or {}).get('extratags') or {}).get('wikidata')
+        links = build_links(name, hit, entities.get(qid, {})) or osm_fallback(hit)
+        job.links[record.key] = links
+        job.searched += 1
+        job.state[record.key] = {'signature': sig, 'links': links}
+    for job in jobs:
+        if job.stem == 'nh48':
+            for slug, urls in overrides.items():
+                if slug in job.links and isinstance(urls, list):
+                    job.links[slug] = [u for u in urls if isinstance(u, str) and u.startswith('https://')]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build peak sameAs links from Nominatim and Wikidata.')
+    parser.add_argument('--dataset', action='append', default=[], help='Peak list to link (e.g. NE115 or data/ADK46.json); repeatable. Default: nh48.')
+    parser.add_argument('--all', action='store_true', help='Link every peak list in nh48data.LIST_DATASETS.')
+    parser.add_argument('--output', type=Path, default=OUT, help='Output for nh48.')
+    parser.add_argument('--output-dir', type=Path, default=OUT_DIR, help='Output directory for the other lists.')
+    parser.add_argument('--state-dir', type=Path, default=STATE_DIR, help='Per-list query signatures and links from the last run.')
+    parser.add_argument('--retry-unresolved', action='store_true', help='Re-query (bypassing the cache) peaks a previous run left without links or incomplete.')
+    parser.add_argument('--entity-index', type=Path, help='Resolve offline from an index built by build-sameas-entity-index.py.')
+    parser.add_argument('--cache', type=Path, default=CACHE, help='Persistent response cache (SQLite).')
+    parser.add_argument('--ttl-days', type=float, default=30.0, help='Re-fetch cached responses older than this.')
+    parser.add_argument('--refresh', action='store_true', help='Ignore cached responses and previous state (both are still updated).')
+    parser.add_argument('--offline', action='store_true', help='Serve only from the cache, stale entries included.')
+    parser.add_argument('--nominatim-url', default=NOMINATIM_URL, help='Nominatim /search endpoint (or a local stand-in).')
+    parser.add_argument('--wikidata-url', default=WIKIDATA_API, help='Wikidata api.php endpoint (or a local stand-in).')
+    parser.add_argument('--nominatim-interval', type=float, default=1.0, help='Seconds between Nominatim requests.')
+    parser.add_argument('--batch-linger', type=float, default=0.25, help='Seconds a partial wbgetentities batch waits for more QIDs.')
+    return parser.parse_args()
+
+
+def dataset_sources(args):
+    if args.all:
+        return [DATA / name for name in LIST_DATASETS]
+    sources = []
+    for value in args.dataset or ['nh48']:
+        path = Path(value)
+        if path.suffix != '.json':
+            path = DATA / f'{value}.json'
+        if not path.exists():
+            raise RuntimeError(f'Peak list not found: {path}')
+        sources.append(path)
+    return sources
+
+
+def main():
+    args = parse_args()
+    jobs = [Job(source, args) for source in dataset_sources(args)]
+    overrides = json.loads(OVERRIDES.read_text()) if OVERRIDES.exists() else {}
+    if args.entity_index:
+        jobs = resolve_from_index(jobs, args, overrides)
+    else:
+        asyncio.run(resolve_all(jobs, args, overrides))
+
+    for job in jobs:
+        out = job.links
+        job.output.parent.mkdir(parents=True, exist_ok=True)
+        job.output.write_text(json.dumps({k: out.get(k, []) for k in sorted(out)}, indent=2) + '\n')
+        if not args.entity_index:
+            job.state_path.parent.mkdir(parents=True, exist_ok=True)
+            job.state_path.write_text(json.dumps(job.state, indent=2, sort_keys=True) + '\n')
+        linked = sum(1 for links in out.values() if links)
+        print(f'{job.stem}: {linked}/{len(job.peaks)} linked, {job.searched} searched -> {job.output}')
 
 if __name__ == '__main__':
-    main()
+    try:
+        main()
+    except Exception as exc:  # noqa: BLE001
+        print(f'[build-peak-sameas] ERROR: {exc}', file=sys.stderr)
+        raise SystemExit(1)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Build the offline sameAs entity index (tmp/sameas-entities.sqlite).
+
+Streams a local Wikidata JSON dump (full or pre-filtered, plain/.gz/.bz2)
+and/or an OSM PBF extract, keeps the peaks inside --bbox (the Northeast by
+default) and stores them with the claims and sitelinks the sameAs builder
+links from. Then:
+
+    python scripts/build-peak-sameas.py --all --entity-index tmp/sameas-entities.sqlite
+
+resolves every list against the index without any network request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from nh48data.loader import ROOT
+from sameas.dump import NORTHEAST_BBOX, build_entity_index, parse_bbox
+
+DEFAULT_INDEX = ROOT / "tmp" / "sameas-entities.sqlite"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the offline sameAs entity index.")
+    parser.add_argument("--output", "-o", type=Path, default=DEFAULT_INDEX)
+    parser.add_argument("--wikidata-dump", type=Path, help="Wikidata JSON dump (one entity per line).")
+    parser.add_argument("--osm-pbf", type=Path, help="OSM PBF extract (requires pyosmium).")
+    parser.add_argument(
+        "--bbox",
+        type=parse_bbox,
+        default=NORTHEAST_BBOX,
+        help="south,west,north,east to keep (default: %s)." % ",".join(str(v) for v in NORTHEAST_BBOX),
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    result = build_entity_index(args.output, args.wikidata_dump, args.osm_pbf, args.bbox)
+    print(
+        f"[build-sameas-entity-index] Wrote {args.output} "
+        f"({result['entities']} Wikidata entit(ies), {result['osm']} OSM peak(s), {result['seconds']}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[build-sameas-entity-index] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
@@ -5,8 +5,37 @@ Build WMNF-only stylized terrain assets (hillshade + contour MVT tiles).
 Outputs (default):
   tmp/wmnf-stylized/v1/hillshade/{z}/{x}/{y}.png
   tmp/wmnf-stylized/v1/contours/{z}/{x}/{y}.pbf
+  tmp/wmnf-stylized/v1/terrain/{z}/{x}/{y}.png
   tmp/wmnf-stylized/v1/metadata.json
 
+With --tile-format pmtiles|both the layers are (also) written as single-file
+archives (hillshade.pmtiles, contours.pmtiles) referenced from metadata.json.
+
+The DEM is warped with bounded GDAL memory, exported once to a raw
+memory-mapped raster and shaded in halo-padded windows (--memory-mb), so
+large --dem-size exports build within a fixed RAM budget.
+
+Unless --terrain-encoding none, Mapbox Terrain-RGB (or Terrarium) elevation
+tiles are written to terrain/{z}/{x}/{y}.png for client-side shading and
+elevation queries. Turning terrain off removes a previous build's terrain
+tiles and terrain.pmtiles and lists them as deletions in the manifest.
+
+Contours are traced natively (NumPy marching squares, zoom-banded and
+Douglas-Peucker simplified) unless --contour-engine gdal is passed, and are
+encoded straight to MVT by wmnf_terrain.mvt unless --mvt-encoder tippecanoe.
+
+Transparent/uniform hillshade tiles are stored once under
+hillshade/_shared/ and indexed in metadata.json (hillshade.shared_tiles).
+
+Rebuilds are incremental: build-manifest.json records the DEM sha256, the
+parameters and per-tile input/content hashes, and only tiles whose footprint
+or inputs changed are regenerated (--force wipes the output root first).
+
+Bounds come from the NH48 overlay plus any --coverage-source datasets (peak
+lists, trail geometries). With --coverage tiles only the planning tiles
+within --padding-km of some coordinate are fetched and built, instead of
+one padded rectangle around everything.
+
 Also writes:
   data/wmnf-terrain-bounds.json
 """
@@ -16,15 +45,46 @@ from __future__ import annotations
 import argparse
 import hashlib
 import json
-import math
 import shutil
 import subprocess
 import sys
-import urllib.request
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Iterable, List, Tuple
 
+from wmnf_terrain.archive import iter_directory_tiles, write_pmtiles
+from wmnf_terrain.contours import CONTOUR_BLOCK_SIZE, annotate_contours, generate_native_contours
+from wmnf_terrain.coverage import (
+    TileCoverage,
+    bounds_tile_count,
+    coverage_tiles,
+    expand_sources,
+    load_points,
+    mask_dem,
+    merge_tile_boxes,
+    padded_bounds,
+    padded_hull,
+)
+from wmnf_terrain.demcache import USGS_EXPORT_ENDPOINT, fetch_dem_mosaic, fetch_url_cached
+from wmnf_terrain.dem import aligned_resolution, export_raw_dem, window_size_for_budget
+from wmnf_terrain.elevation import DECODE_FORMULAS, TILE_SIZE as TERRAIN_TILE_SIZE, native_zoom, write_elevation_tiles
+from wmnf_terrain.hillshade import render_hillshade
+from wmnf_terrain.manifest import (
+    MANIFEST_NAME,
+    build_manifest,
+    dirty_tile_set,
+    dirty_zoom_range,
+    drop_layer,
+    layer_record,
+    load_manifest,
+    params_digest,
+    plan_layer,
+    sync_layer,
+    tile_input_hashes,
+)
+from wmnf_terrain.mvt import BUFFER as MVT_BUFFER, EXTENT as MVT_EXTENT, write_contour_tiles
+from wmnf_terrain.tiles import SHARED_DIR_NAME, dedupe_tile_layer
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_OVERLAY = ROOT / "data" / "nh48_enriched_overlay.json"
@@ -37,11 +97,6 @@ def iso_now() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
 
-def read_json(path: Path) -> Dict:
-    with path.open("r", encoding="utf-8") as handle:
-        return json.load(handle)
-
-
 def write_json(path: Path, payload: Dict) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with path.open("w", encoding="utf-8", newline="\n") as handle:
@@ -75,46 +130,14 @@ def run(cmd: List[str], cwd: Path | None = None) -> None:
         raise RuntimeError(f"Command failed ({completed.returncode}): {' '.join(cmd)}")
 
 
-def extract_overlay_points(overlay_payload: Dict) -> List[Tuple[float, float]]:
-    points: List[Tuple[float, float]] = []
-    for entry in overlay_payload.values():
-        if not isinstance(entry, dict):
-            continue
-        lat = entry.get("latitude")
-        lon = entry.get("longitude")
-        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
-            if -90 <= float(lat) <= 90 and -180 <= float(lon) <= 180:
-                points.append((float(lat), float(lon)))
-    if not points:
-        raise RuntimeError("No valid latitude/longitude points found in overlay data.")
-    return points
-
-
-def compute_bounds(points: List[Tuple[float, float]], padding_km: float) -> Dict[str, float]:
-    min_lat = min(point[0] for point in points)
-    max_lat = max(point[0] for point in points)
-    min_lon = min(point[1] for point in points)
-    max_lon = max(point[1] for point in points)
-    center_lat = (min_lat + max_lat) / 2.0
-
-    lat_pad_deg = padding_km / 110.574
-    lon_denominator = max(0.01, 111.320 * math.cos(math.radians(center_lat)))
-    lon_pad_deg = padding_km / lon_denominator
-
-    bounded = {
-        "min_lat": max(-90.0, min_lat - lat_pad_deg),
-        "max_lat": min(90.0, max_lat + lat_pad_deg),
-        "min_lon": max(-180.0, min_lon - lon_pad_deg),
-        "max_lon": min(180.0, max_lon + lon_pad_deg),
-    }
-    bounded["center_lat"] = center_lat
-    bounded["center_lon"] = (min_lon + max_lon) / 2.0
-    bounded["padding_km"] = padding_km
-    return bounded
-
-
-def build_bounds_payload(bounds: Dict[str, float], source_path: Path, point_count: int) -> Dict:
-    return {
+def build_bounds_payload(
+    bounds: Dict[str, float],
+    source_path: Path,
+    point_count: int,
+    sources: List[Dict] | None = None,
+    coverage: Dict | None = None,
+) -> Dict:
+    payload = {
         "version": "v1",
         "generated_at": iso_now(),
         "source_overlay": source_path.relative_to(ROOT).as_posix(),
@@ -131,95 +154,50 @@ def build_bounds_payload(bounds: Dict[str, float], source_path: Path, point_coun
         },
         "padding_km": bounds["padding_km"],
     }
-
-
-def build_default_usgs_dem_url(bounds: Dict[str, float], width: int, height: int) -> str:
-    params = {
-        "bbox": f"{bounds['min_lon']},{bounds['min_lat']},{bounds['max_lon']},{bounds['max_lat']}",
-        "bboxSR": "4326",
-        "size": f"{width},{height}",
-        "imageSR": "4326",
-        "format": "tiff",
-        "pixelType": "F32",
-        "f": "image",
-        "interpolation": "RSP_BilinearInterpolation",
-    }
-    query = "&".join(f"{key}={value}" for key, value in params.items())
-    return (
-        "https://elevation.nationalmap.gov/arcgis/rest/services/3DEPElevation/"
-        f"ImageServer/exportImage?{query}"
-    )
-
-
-def fetch_dem(dem_source: str | None, bounds: Dict[str, float], cache_dir: Path, dem_size: int) -> Tuple[Path, str]:
+    if sources:
+        payload["sources"] = sources
+    if coverage:
+        payload["coverage"] = coverage
+    return payload
+
+
+def fetch_dem(
+    dem_source: str | None,
+    bounds: Dict[str, float],
+    cache_dir: Path,
+    dem_size: int,
+    endpoint: str,
+    tile_px: int,
+    gdalbuildvrt: str | None,
+    boxes: List[Dict] | None = None,
+) -> Tuple[Path, str, Dict | None]:
+    """
+    Return (DEM path, source reference, mosaic summary). Without --dem-source
+    the DEM is mosaicked from cached exportImage sub-tiles; a URL source is
+    cached by URL; a local file is used in place. ``boxes`` limits the
+    cached mosaic to sub-tiles intersecting the coverage rectangles.
+    """
     cache_dir.mkdir(parents=True, exist_ok=True)
-    dem_path = cache_dir / "wmnf_dem_source.tif"
-
     source_ref = dem_source.strip() if dem_source else ""
     if not source_ref:
-        source_ref = build_default_usgs_dem_url(bounds, dem_size, dem_size)
-        print(f"[build-wmnf-stylized] Using default USGS 3DEP export URL:\n{source_ref}")
+        if not gdalbuildvrt:
+            raise RuntimeError("gdalbuildvrt is required to mosaic cached DEM tiles.")
+        mosaic, summary = fetch_dem_mosaic(
+            bounds, cache_dir, dem_size, gdalbuildvrt, endpoint=endpoint, tile_px=tile_px, boxes=boxes
+        )
+        return mosaic, f"{endpoint} (cached {summary['resolution_arcsec']:g} arcsec mosaic)", summary
 
     if source_ref.startswith("http://") or source_ref.startswith("https://"):
-        print(f"[build-wmnf-stylized] Downloading DEM from URL -> {dem_path}")
-        with urllib.request.urlopen(source_ref) as response, dem_path.open("wb") as output:
-            shutil.copyfileobj(response, output)
+        dem_path = fetch_url_cached(source_ref, cache_dir)
     else:
-        source_path = Path(source_ref).expanduser().resolve()
-        if not source_path.exists():
-            raise RuntimeError(f"DEM source file not found: {source_path}")
-        print(f"[build-wmnf-stylized] Copying DEM file -> {dem_path}")
-        shutil.copyfile(source_path, dem_path)
+        dem_path = Path(source_ref).expanduser().resolve()
+        if not dem_path.exists():
+            raise RuntimeError(f"DEM source file not found: {dem_path}")
 
-    if not dem_path.exists() or dem_path.stat().st_size == 0:
+    if dem_path.stat().st_size == 0:
         raise RuntimeError("DEM download/copy failed; output file is missing or empty.")
 
-    return dem_path, source_ref
-
-
-def annotate_contours(raw_geojson: Path, output_geojson: Path, minor_ft: int, major_ft: int) -> int:
-    with raw_geojson.open("r", encoding="utf-8") as handle:
-        payload = json.load(handle)
-
-    features = payload.get("features", [])
-    if not isinstance(features, list):
-        raise RuntimeError("Unexpected contour GeoJSON structure (missing features list).")
-
-    major_every = max(1, int(round(float(major_ft) / float(minor_ft))))
-    output_features = []
-    for feature in features:
-        if not isinstance(feature, dict):
-            continue
-        props = feature.get("properties") or {}
-        elev_m = props.get("elev_m")
-        if elev_m is None:
-            elev_m = props.get("ELEV")
-        if elev_m is None:
-            elev_m = props.get("elev")
-        try:
-            elev_m_num = float(elev_m)
-        except (TypeError, ValueError):
-            continue
-        elev_ft = elev_m_num * 3.28084
-        level = int(round(elev_ft / float(minor_ft)))
-        is_major = 1 if level % major_every == 0 else 0
-        contour_type = "major" if is_major else "minor"
-        feature["properties"] = {
-            "elevation_ft": int(round(elev_ft)),
-            "elevation_m": round(elev_m_num, 2),
-            "interval_ft": int(minor_ft),
-            "is_major": is_major,
-            "contour_type": contour_type,
-            "level": level,
-        }
-        output_features.append(feature)
-
-    payload["features"] = output_features
-    output_geojson.parent.mkdir(parents=True, exist_ok=True)
-    with output_geojson.open("w", encoding="utf-8", newline="\n") as handle:
-        json.dump(payload, handle, separators=(",", ":"), sort_keys=True)
-        handle.write("\n")
-    return len(output_features)
+    return dem_path, source_ref, None
 
 
 def count_matching_files(root: Path, suffix: str) -> int:
@@ -238,8 +216,21 @@ def build_metadata(
     minor_ft: int,
     major_ft: int,
     contour_feature_count: int,
+    hillshade_index: Dict | None = None,
+    archives: Dict | None = None,
+    contour_engine: str = "gdal",
+    mvt_encoder: str = "tippecanoe",
+    minor_min_zoom: int | None = None,
+    terrain: Dict | None = None,
+    dem_mosaic: Dict | None = None,
 ) -> Dict:
-    return {
+    hillshade = {
+        "tile_count": count_matching_files(output_root / "hillshade", ".png"),
+    }
+    if hillshade_index:
+        hillshade["logical_tile_count"] = hillshade_index["logical_tile_count"]
+        hillshade["shared_tiles"] = hillshade_index
+    payload = {
         "version": "v1",
         "generated_at": iso_now(),
         "bounds_wgs84": bounds_payload.get("bounds_wgs84", {}),
@@ -249,17 +240,79 @@ def build_metadata(
             "minor_interval_ft": minor_ft,
             "major_interval_ft": major_ft,
             "feature_count": contour_feature_count,
+            "engine": contour_engine,
+            "mvt_encoder": mvt_encoder,
+            "minor_min_zoom": minor_min_zoom,
             "tile_count": count_matching_files(output_root / "contours", ".pbf"),
         },
-        "hillshade": {
-            "tile_count": count_matching_files(output_root / "hillshade", ".png"),
-        },
+        "hillshade": hillshade,
         "source_dem": {
             "reference": dem_source,
-            "sha256": sha256_file(dem_path),
+            # A mosaic's VRT only names its sub-tiles; hash the elevation data instead.
+            "sha256": dem_mosaic["tiles_sha256"] if dem_mosaic else sha256_file(dem_path),
             "bytes": dem_path.stat().st_size,
         },
     }
+    if bounds_payload.get("coverage"):
+        payload["coverage"] = bounds_payload["coverage"]
+    if dem_mosaic:
+        payload["source_dem"]["mosaic"] = dem_mosaic
+    if terrain:
+        payload["terrain"] = {
+            **terrain,
+            "tile_count": count_matching_files(output_root / "terrain", ".png"),
+        }
+    if archives:
+        payload["archives"] = archives
+    return payload
+
+
+def build_layer_archives(
+    output_root: Path,
+    hillshade_dir: Path,
+    hillshade_index: Dict | None,
+    contour_tiles: Iterable[Tuple[int, int, int, bytes]],
+    bounds_wgs84: Dict[str, float],
+    min_zoom: int,
+    max_zoom: int,
+    terrain_dir: Path | None = None,
+    terrain_max_zoom: int | None = None,
+) -> Dict:
+    archives = {}
+    print("[build-wmnf-stylized] Writing hillshade.pmtiles")
+    archives["hillshade"] = write_pmtiles(
+        output_root / "hillshade.pmtiles",
+        iter_directory_tiles(hillshade_dir, ".png", hillshade_index),
+        tile_type="png",
+        bounds_wgs84=bounds_wgs84,
+        metadata={"name": "wmnf-hillshade", "format": "png", "minzoom": min_zoom, "maxzoom": max_zoom},
+    )
+    print("[build-wmnf-stylized] Writing contours.pmtiles")
+    archives["contours"] = write_pmtiles(
+        output_root / "contours.pmtiles",
+        contour_tiles,
+        tile_type="mvt",
+        bounds_wgs84=bounds_wgs84,
+        metadata={
+            "name": "wmnf-contours",
+            "format": "pbf",
+            "minzoom": min_zoom,
+            "maxzoom": max_zoom,
+            "vector_layers": [{"id": "contours", "minzoom": min_zoom, "maxzoom": max_zoom}],
+        },
+    )
+    if terrain_dir is not None:
+        print("[build-wmnf-stylized] Writing terrain.pmtiles")
+        archives["terrain"] = write_pmtiles(
+            output_root / "terrain.pmtiles",
+            iter_directory_tiles(terrain_dir, ".png"),
+            tile_type="png",
+            bounds_wgs84=bounds_wgs84,
+            metadata={"name": "wmnf-terrain", "format": "png", "minzoom": min_zoom, "maxzoom": terrain_max_zoom},
+        )
+    for archive in archives.values():
+        archive["sha256"] = sha256_file(output_root / archive["path"])
+    return archives
 
 
 def parse_args() -> argparse.Namespace:
@@ -269,14 +322,110 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--output-root", type=Path, default=DEFAULT_OUTPUT_ROOT)
     parser.add_argument("--dem-cache-dir", type=Path, default=DEFAULT_DEM_CACHE_DIR)
     parser.add_argument("--dem-source", type=str, default="")
-    parser.add_argument("--dem-size", type=int, default=4096, help="Default USGS DEM export size in pixels.")
+    parser.add_argument(
+        "--dem-size",
+        type=int,
+        default=4096,
+        help="Approximate DEM width in pixels across the bbox; snapped to a power-of-two arc-second cache resolution.",
+    )
+    parser.add_argument(
+        "--dem-endpoint",
+        type=str,
+        default=USGS_EXPORT_ENDPOINT,
+        help="ImageServer exportImage URL for DEM sub-tiles (point at a local stand-in server for offline runs).",
+    )
+    parser.add_argument("--dem-tile-px", type=int, default=1024, help="Cached DEM sub-tile size in pixels.")
     parser.add_argument("--padding-km", type=float, default=12.0)
+    parser.add_argument(
+        "--coverage-source",
+        action="append",
+        default=[],
+        help=(
+            "Extra dataset whose coordinates the terrain must cover (repeatable; globs relative to the repo, "
+            "e.g. data/NH52WAV.json or 'data/wmnf-trails/*-normalized.json')."
+        ),
+    )
+    parser.add_argument(
+        "--coverage",
+        choices=["bbox", "tiles"],
+        default="bbox",
+        help="Build one padded rectangle around all points, or only the tiles within --padding-km of a point.",
+    )
+    parser.add_argument(
+        "--coverage-zoom",
+        type=int,
+        default=10,
+        help="Zoom of the planning tiles used by --coverage tiles.",
+    )
     parser.add_argument("--min-zoom", type=int, default=7)
     parser.add_argument("--max-zoom", type=int, default=14)
     parser.add_argument("--minor-ft", type=int, default=50)
     parser.add_argument("--major-ft", type=int, default=200)
+    parser.add_argument(
+        "--contour-engine",
+        choices=["numpy", "gdal"],
+        default="numpy",
+        help="Trace contours natively with zoom-banded simplification, or use gdal_contour + tippecanoe dropping.",
+    )
+    parser.add_argument(
+        "--mvt-encoder",
+        choices=["native", "tippecanoe"],
+        default="native",
+        help="Encode contour tiles directly in Python (numpy engine only) or through tippecanoe + tile-join.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Parallel processes for native MVT encoding (default: CPU count).",
+    )
+    parser.add_argument(
+        "--minor-min-zoom",
+        type=int,
+        default=12,
+        help="First zoom that carries minor contours (numpy engine); lower zooms get major levels only.",
+    )
+    parser.add_argument(
+        "--simplify-px",
+        type=float,
+        default=1.0,
+        help="Douglas-Peucker tolerance in screen pixels per zoom (numpy engine).",
+    )
+    parser.add_argument(
+        "--terrain-encoding",
+        choices=["mapbox", "terrarium", "none"],
+        default="mapbox",
+        help="Also emit raster-dem elevation tiles (terrain/{z}/{x}/{y}.png) in this RGB encoding.",
+    )
+    parser.add_argument(
+        "--terrain-max-zoom",
+        type=int,
+        default=0,
+        help="Highest elevation tile zoom (default: the DEM's native zoom, capped at --max-zoom).",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=1024,
+        help="RAM budget for DEM processing: sizes the shading windows and GDAL's warp/cache memory.",
+    )
     parser.add_argument("--bounds-only", action="store_true", help="Compute and write bounds only.")
-    parser.add_argument("--force", action="store_true", help="Delete existing output root before rebuilding.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Delete the output root (and its build manifest) for a full rebuild instead of an incremental one.",
+    )
+    parser.add_argument(
+        "--tile-format",
+        choices=["dir", "pmtiles", "both"],
+        default="dir",
+        help="Write loose {z}/{x}/{y} tiles, one PMTiles archive per layer, or both.",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Keep every transparent/uniform hillshade tile instead of sharing one blob.",
+    )
     return parser.parse_args()
 
 
@@ -289,10 +438,28 @@ def main() -> int:
 
     if not overlay_path.exists():
         raise RuntimeError(f"Overlay file not found: {overlay_path}")
-    overlay_payload = read_json(overlay_path)
-    points = extract_overlay_points(overlay_payload)
-    bounds = compute_bounds(points, args.padding_km)
-    bounds_payload = build_bounds_payload(bounds, overlay_path, len(points))
+    source_paths = expand_sources([str(overlay_path), *args.coverage_source], ROOT)
+    points, sources = load_points(source_paths, ROOT)
+    bounds = padded_bounds(points, args.padding_km)
+    coverage = None
+    coverage_summary = None
+    if args.coverage == "tiles":
+        coverage_zoom = int(args.coverage_zoom)
+        covered = coverage_tiles(points, args.padding_km, coverage_zoom)
+        coverage = TileCoverage.from_array(coverage_zoom, covered)
+        coverage_summary = {
+            "mode": "tiles",
+            "zoom": coverage_zoom,
+            "tile_count": len(coverage.tiles),
+            "bbox_tile_count": bounds_tile_count(bounds, coverage_zoom),
+            "boxes": merge_tile_boxes(covered, coverage_zoom),
+            "hull_wgs84": padded_hull(points, args.padding_km),
+        }
+        print(
+            f"[build-wmnf-stylized] Coverage: {coverage_summary['tile_count']} z{coverage_zoom} tile(s) in "
+            f"{len(coverage_summary['boxes'])} box(es) vs {coverage_summary['bbox_tile_count']} for the padded bbox"
+        )
+    bounds_payload = build_bounds_payload(bounds, overlay_path, len(points), sources, coverage_summary)
     write_json(bounds_output, bounds_payload)
     print(f"[build-wmnf-stylized] Wrote bounds: {bounds_output.relative_to(ROOT)}")
 
@@ -301,34 +468,77 @@ def main() -> int:
 
     required_commands = {
         "gdalwarp": resolve_command(["gdalwarp"]),
-        "gdaldem": resolve_command(["gdaldem"]),
         "gdal_translate": resolve_command(["gdal_translate"]),
         "gdal2tiles": resolve_command(["gdal2tiles.py", "gdal2tiles"]),
-        "gdal_contour": resolve_command(["gdal_contour"]),
-        "tippecanoe": resolve_command(["tippecanoe"]),
-        "tile_join": resolve_command(["tile-join"]),
+        "gdalinfo": resolve_command(["gdalinfo"]),
     }
+    if not args.dem_source:
+        required_commands["gdalbuildvrt"] = resolve_command(["gdalbuildvrt"])
+    native_mvt = args.contour_engine == "numpy" and args.mvt_encoder == "native"
+    if not native_mvt:
+        required_commands["tippecanoe"] = resolve_command(["tippecanoe"])
+    if args.contour_engine == "gdal":
+        required_commands["gdal_contour"] = resolve_command(["gdal_contour"])
+    write_dirs = args.tile_format in ("dir", "both")
+    write_archives = args.tile_format in ("pmtiles", "both")
+    if not native_mvt:
+        required_commands["tile_join"] = resolve_command(["tile-join"])
 
     if args.force and output_root.exists():
         shutil.rmtree(output_root)
-    (output_root / "hillshade").mkdir(parents=True, exist_ok=True)
-    (output_root / "contours").mkdir(parents=True, exist_ok=True)
+    previous_manifest = load_manifest(output_root)
+    previous_layers = previous_manifest.get("layers", {})
     build_tmp = output_root / "_build"
     build_tmp.mkdir(parents=True, exist_ok=True)
-
-    dem_source_tif, dem_source_reference = fetch_dem(args.dem_source, bounds, dem_cache_dir, args.dem_size)
+    hillshade_dir = output_root / "hillshade" if write_dirs else build_tmp / "hillshade"
+    hillshade_dir.mkdir(parents=True, exist_ok=True)
+    contours_dir = output_root / "contours" if write_dirs else build_tmp / "contours"
+    contours_dir.mkdir(parents=True, exist_ok=True)
+    terrain_dir = output_root / "terrain" if write_dirs else build_tmp / "terrain"
+
+    dem_source_tif, dem_source_reference, dem_mosaic = fetch_dem(
+        args.dem_source,
+        bounds,
+        dem_cache_dir,
+        args.dem_size,
+        endpoint=args.dem_endpoint,
+        tile_px=int(args.dem_tile_px),
+        gdalbuildvrt=required_commands.get("gdalbuildvrt"),
+        boxes=coverage_summary["boxes"] if coverage_summary else None,
+    )
     dem_3857 = build_tmp / "wmnf_dem_3857.tif"
-    hillshade_tif = build_tmp / "wmnf_hillshade.tif"
-    hillshade_byte_tif = build_tmp / "wmnf_hillshade_byte.tif"
-    contours_raw_geojson = build_tmp / "wmnf_contours_raw.geojson"
-    contours_tagged_geojson = build_tmp / "wmnf_contours_tagged.geojson"
+    hillshade_vrt = build_tmp / "wmnf_hillshade.vrt"
+    hillshade_stage = build_tmp / "hillshade_stage"
+    contours_stage = build_tmp / "contours_stage"
+    terrain_stage = build_tmp / "terrain_stage"
+    contours_raw_geojson = build_tmp / "wmnf_contours_raw.geojsonl"
+    contours_tagged_geojson = build_tmp / "wmnf_contours_tagged.geojsonl"
     contours_mbtiles = build_tmp / "wmnf_contours.mbtiles"
 
+    # Warp onto a tile-aligned grid so a padded bbox keeps interior pixels (and
+    # their tile input hashes) identical to the previous build.
+    warp_zoom, warp_resolution_m = aligned_resolution(bounds_payload["bounds_wgs84"], args.dem_size)
+    gdal_cache_mb = max(16, int(args.memory_mb) // 4)
     run([
         required_commands["gdalwarp"],
         "-overwrite",
+        "--config",
+        "GDAL_CACHEMAX",
+        str(gdal_cache_mb),
+        "-wm",
+        str(gdal_cache_mb),
+        "-co",
+        "TILED=YES",
+        "-co",
+        "COMPRESS=DEFLATE",
+        "-co",
+        "BIGTIFF=IF_SAFER",
         "-t_srs",
         "EPSG:3857",
+        "-tr",
+        f"{warp_resolution_m:.10f}",
+        f"{warp_resolution_m:.10f}",
+        "-tap",
         "-r",
         "bilinear",
         "-dstnodata",
@@ -336,87 +546,276 @@ def main() -> int:
         str(dem_source_tif),
         str(dem_3857),
     ])
-
-    run([
-        required_commands["gdaldem"],
-        "hillshade",
-        str(dem_3857),
-        str(hillshade_tif),
-        "-z",
-        "1.0",
-        "-az",
-        "315",
-        "-alt",
-        "45",
-        "-compute_edges",
-    ])
-
-    run([
+    dem_raster = export_raw_dem(
+        dem_3857,
+        build_tmp / "wmnf_dem_3857.bin",
         required_commands["gdal_translate"],
-        "-ot",
-        "Byte",
-        "-scale",
-        "0",
-        "255",
-        "0",
-        "255",
-        str(hillshade_tif),
-        str(hillshade_byte_tif),
-    ])
-
-    run([
-        required_commands["gdal2tiles"],
-        "--xyz",
-        "-w",
-        "none",
-        "-z",
-        f"{args.min_zoom}-{args.max_zoom}",
-        str(hillshade_byte_tif),
-        str(output_root / "hillshade"),
-    ])
-
-    minor_m = float(args.minor_ft) * 0.3048
-    run([
-        required_commands["gdal_contour"],
-        "-i",
-        f"{minor_m:.6f}",
-        "-a",
-        "elev_m",
-        str(dem_3857),
-        str(contours_raw_geojson),
-    ])
-
-    contour_feature_count = annotate_contours(
-        contours_raw_geojson,
-        contours_tagged_geojson,
-        minor_ft=int(args.minor_ft),
-        major_ft=int(args.major_ft),
+        required_commands["gdalinfo"],
+        cache_mb=gdal_cache_mb,
+    )
+    if coverage is not None:
+        masked = mask_dem(dem_raster, coverage)
+        print(f"[build-wmnf-stylized] Masked {masked} DEM pixel(s) outside the coverage tiles")
+    window = window_size_for_budget(int(args.memory_mb))
+
+    hillshade_params = {
+        "engine": "numpy-horn",
+        "z_factor": 1.0,
+        "azimuth": 315,
+        "altitude": 45,
+        "warp_zoom": warp_zoom,
+        "dedupe": write_dirs and not args.no_dedupe,
+    }
+    contour_params = {
+        "minor_ft": int(args.minor_ft),
+        "major_ft": int(args.major_ft),
+        "engine": args.contour_engine,
+        "mvt_encoder": "native" if native_mvt else "tippecanoe",
+        "minor_min_zoom": int(args.minor_min_zoom),
+        "simplify_px": float(args.simplify_px),
+        "warp_zoom": warp_zoom,
+    }
+    if not native_mvt:
+        # tippecanoe thins features across the whole layer, so every tile
+        # depends on every input; key the digest on the full zoom range.
+        contour_params["zoom"] = [int(args.min_zoom), int(args.max_zoom)]
+    terrain_params = None
+    terrain_max_zoom = None
+    if args.terrain_encoding != "none":
+        terrain_max_zoom = int(args.terrain_max_zoom) or int(round(native_zoom(dem_raster)))
+        terrain_max_zoom = max(int(args.min_zoom), min(int(args.max_zoom), terrain_max_zoom))
+        terrain_params = {"encoding": args.terrain_encoding, "warp_zoom": warp_zoom}
+    hillshade_digest = params_digest(hillshade_params)
+    contour_digest = params_digest(contour_params)
+    print("[build-wmnf-stylized] Hashing tile inputs")
+    keep = coverage.contains if coverage is not None else None
+    hillshade_inputs = tile_input_hashes(
+        dem_raster, int(args.min_zoom), int(args.max_zoom), hillshade_digest, keep=keep
+    )
+    contour_inputs = tile_input_hashes(
+        dem_raster,
+        int(args.min_zoom),
+        int(args.max_zoom),
+        contour_digest,
+        halo_px=1,
+        buffer_fraction=MVT_BUFFER / MVT_EXTENT,
+        block_size=CONTOUR_BLOCK_SIZE,
+        keep=keep,
+    )
+    terrain_digest = params_digest(terrain_params) if terrain_params else ""
+    terrain_inputs = (
+        tile_input_hashes(dem_raster, int(args.min_zoom), terrain_max_zoom, terrain_digest, halo_px=1, keep=keep)
+        if terrain_params
+        else {}
+    )
+    contour_dirty, contour_removed = plan_layer(previous_layers.get("contours"), contour_inputs)
+    if contour_dirty and not native_mvt:
+        contour_dirty = list(contour_inputs)
+    hillshade_dirty, hillshade_removed = plan_layer(previous_layers.get("hillshade"), hillshade_inputs)
+    print(
+        "[build-wmnf-stylized] Incremental plan: "
+        f"hillshade {len(hillshade_dirty)}/{len(hillshade_inputs)} tile(s) dirty, {len(hillshade_removed)} removed; "
+        f"contours {len(contour_dirty)}/{len(contour_inputs)} tile(s) dirty, {len(contour_removed)} removed"
     )
 
-    run([
-        required_commands["tippecanoe"],
-        "-o",
-        str(contours_mbtiles),
-        "-l",
-        "contours",
-        "-Z",
-        str(args.min_zoom),
-        "-z",
-        str(args.max_zoom),
-        "--drop-densest-as-needed",
-        "--coalesce-densest-as-needed",
-        "--extend-zooms-if-still-dropping",
-        "--no-feature-limit",
-        "--no-tile-size-limit",
-        str(contours_tagged_geojson),
-    ])
+    hillshade_zooms = dirty_zoom_range(hillshade_dirty)
+    shutil.rmtree(hillshade_stage, ignore_errors=True)
+    if hillshade_zooms is not None:
+        print(f"[build-wmnf-stylized] Shading DEM in {window}px windows")
+        render_hillshade(
+            dem_raster,
+            hillshade_vrt,
+            window,
+            z_factor=hillshade_params["z_factor"],
+            azimuth=hillshade_params["azimuth"],
+            altitude=hillshade_params["altitude"],
+        )
+
+        run([
+            required_commands["gdal2tiles"],
+            "--xyz",
+            "-w",
+            "none",
+            "-z",
+            f"{hillshade_zooms[0]}-{hillshade_zooms[1]}",
+            "--config",
+            "GDAL_CACHEMAX",
+            str(gdal_cache_mb),
+            str(hillshade_vrt),
+            str(hillshade_stage),
+        ])
+
+    previous_hillshade_index = previous_layers.get("hillshade", {}).get("shared_tiles")
+    hillshade_contents, hillshade_changed, hillshade_deleted = sync_layer(
+        hillshade_stage, hillshade_dir, ".png", hillshade_dirty, hillshade_removed
+    )
+    hillshade_index = None
+    if write_dirs and not args.no_dedupe:
+        hillshade_index, folded = dedupe_tile_layer(
+            hillshade_dir,
+            ".png",
+            previous=previous_hillshade_index,
+            invalidated=[*hillshade_dirty, *hillshade_removed],
+        )
+        print(
+            "[build-wmnf-stylized] Hillshade dedupe: "
+            f"{hillshade_index['deduplicated_tile_count']} tile(s) -> {len(hillshade_index['blobs'])} shared blob(s), "
+            f"{hillshade_index['bytes_saved']} byte(s) saved"
+        )
+        hillshade_changed = [path for path in hillshade_changed if (hillshade_dir / path).exists()]
+        # Tiles the previous build published standalone but that now live in a
+        # blob must be deleted, or the stale object keeps shadowing the blob.
+        previous_tiles = previous_layers.get("hillshade", {}).get("tiles", {})
+        previously_shared = {
+            tid for ids in (previous_hillshade_index or {}).get("blobs", {}).values() for tid in ids
+        }
+        hillshade_deleted += [
+            f"{tid}.png"
+            for tid in folded
+            if (previous_tiles.get(tid) or {}).get("content") and tid not in previously_shared
+        ]
+        previous_blobs = set((previous_hillshade_index or {}).get("blobs", {}))
+        hillshade_changed += [f"{SHARED_DIR_NAME}/{blob}" for blob in hillshade_index["blobs"] if blob not in previous_blobs]
+        hillshade_deleted += [f"{SHARED_DIR_NAME}/{blob}" for blob in previous_blobs if blob not in hillshade_index["blobs"]]
+    elif (hillshade_dir / SHARED_DIR_NAME).exists():
+        shutil.rmtree(hillshade_dir / SHARED_DIR_NAME)
+
+    contour_feature_count = previous_layers.get("contours", {}).get("feature_count", 0)
+    shutil.rmtree(contours_stage, ignore_errors=True)
+    if contour_dirty and args.contour_engine == "gdal":
+        minor_m = float(args.minor_ft) * 0.3048
+        run([
+            required_commands["gdal_contour"],
+            "-f",
+            "GeoJSONSeq",
+            "-i",
+            f"{minor_m:.6f}",
+            "-a",
+            "elev_m",
+            str(dem_3857),
+            str(contours_raw_geojson),
+        ])
+
+        contour_feature_count = annotate_contours(
+            contours_raw_geojson,
+            contours_tagged_geojson,
+            minor_ft=int(args.minor_ft),
+            major_ft=int(args.major_ft),
+        )
+        tippecanoe_thinning = [
+            "--drop-densest-as-needed",
+            "--coalesce-densest-as-needed",
+            "--extend-zooms-if-still-dropping",
+        ]
+    elif contour_dirty:
+        print("[build-wmnf-stylized] Tracing native contours")
+        contour_feature_count = generate_native_contours(
+            dem_raster,
+            contours_tagged_geojson,
+            minor_ft=int(args.minor_ft),
+            major_ft=int(args.major_ft),
+            min_zoom=int(args.min_zoom),
+            max_zoom=int(args.max_zoom),
+            minor_min_zoom=int(args.minor_min_zoom),
+            simplify_px=float(args.simplify_px),
+        )
+        # Features are already zoom-banded and simplified; keep tippecanoe
+        # from dropping or re-simplifying them.
+        tippecanoe_thinning = ["--no-line-simplification"]
+
+    if contour_dirty and native_mvt:
+        print("[build-wmnf-stylized] Encoding contour MVT tiles")
+        encoded = write_contour_tiles(
+            contours_tagged_geojson,
+            contours_stage,
+            bounds_payload["bounds_wgs84"],
+            min_zoom=int(args.min_zoom),
+            max_zoom=int(args.max_zoom),
+            workers=int(args.workers) or None,
+            tiles=dirty_tile_set(contour_dirty),
+        )
+        print(
+            f"[build-wmnf-stylized] Encoded {encoded['tile_count']} contour tile(s), "
+            f"{encoded['bytes']} byte(s) in {encoded['jobs']} job(s)"
+        )
+    elif contour_dirty:
+        run([
+            required_commands["tippecanoe"],
+            "-o",
+            str(contours_mbtiles),
+            "-l",
+            "contours",
+            "-Z",
+            str(args.min_zoom),
+            "-z",
+            str(args.max_zoom),
+            *tippecanoe_thinning,
+            "--no-feature-limit",
+            "--no-tile-size-limit",
+            "--force",
+            "-P",
+            str(contours_tagged_geojson),
+        ])
+
+        # Unpacked even for --tile-format pmtiles: the manifest diffs loose
+        # tiles, and the contour archive is packed from the synced directory.
+        run([
+            required_commands["tile_join"],
+            "-e",
+            str(contours_stage),
+            str(contours_mbtiles),
+        ])
+    contour_contents, contour_changed, contour_deleted = sync_layer(
+        contours_stage, contours_dir, ".pbf", contour_dirty, contour_removed
+    )
 
-    run([
-        required_commands["tile_join"],
-        "-e",
-        str(output_root / "contours"),
-        str(contours_mbtiles),
-    ])
+    terrain_contents: Dict = {}
+    terrain_changed: List[str] = []
+    terrain_deleted: List[str] = []
+    archive_deleted: List[str] = []
+    shutil.rmtree(terrain_stage, ignore_errors=True)
+    if terrain_params:
+        terrain_dirty, terrain_removed = plan_layer(previous_layers.get("terrain"), terrain_inputs)
+        print(
+            f"[build-wmnf-stylized] Terrain plan: {len(terrain_dirty)}/{len(terrain_inputs)} tile(s) dirty, "
+            f"{len(terrain_removed)} removed"
+        )
+        if terrain_dirty:
+            rendered = write_elevation_tiles(
+                dem_raster,
+                terrain_stage,
+                dirty_tile_set(terrain_dirty),
+                encoding=terrain_params["encoding"],
+                workers=int(args.workers) or None,
+            )
+            print(
+                f"[build-wmnf-stylized] Rendered {rendered['tile_count']} {terrain_params['encoding']} "
+                f"elevation tile(s), {rendered['bytes']} byte(s)"
+            )
+        terrain_contents, terrain_changed, terrain_deleted = sync_layer(
+            terrain_stage, terrain_dir, ".png", terrain_dirty, terrain_removed
+        )
+    else:
+        # Terrain turned off: the old tiles and archive are deletions for publish.
+        terrain_deleted = drop_layer(terrain_dir, ".png")
+        terrain_archive = output_root / "terrain.pmtiles"
+        if terrain_archive.exists():
+            terrain_archive.unlink()
+            archive_deleted.append(terrain_archive.name)
+
+    archives = None
+    if write_archives:
+        archives = build_layer_archives(
+            output_root=output_root,
+            hillshade_dir=hillshade_dir,
+            hillshade_index=hillshade_index,
+            contour_tiles=iter_directory_tiles(contours_dir, ".pbf"),
+            bounds_wgs84=bounds_payload["bounds_wgs84"],
+            min_zoom=int(args.min_zoom),
+            max_zoom=int(args.max_zoom),
+            terrain_dir=terrain_dir if terrain_params else None,
+            terrain_max_zoom=terrain_max_zoom,
+        )
 
     metadata_payload = build_metadata(
         output_root=output_root,
@@ -428,8 +827,69 @@ def main() -> int:
         minor_ft=int(args.minor_ft),
         major_ft=int(args.major_ft),
         contour_feature_count=contour_feature_count,
+        hillshade_index=hillshade_index,
+        archives=archives,
+        contour_engine=args.contour_engine,
+        mvt_encoder="native" if native_mvt else "tippecanoe",
+        minor_min_zoom=int(args.minor_min_zoom) if args.contour_engine == "numpy" else None,
+        dem_mosaic=dem_mosaic,
+        terrain=(
+            {
+                "encoding": terrain_params["encoding"],
+                "decode": DECODE_FORMULAS[terrain_params["encoding"]],
+                "tile_size": TERRAIN_TILE_SIZE,
+                "zoom": {"min": int(args.min_zoom), "max": terrain_max_zoom},
+            }
+            if terrain_params
+            else None
+        ),
     )
     write_json(output_root / "metadata.json", metadata_payload)
+
+    hillshade_record = layer_record(previous_layers.get("hillshade"), hillshade_digest, hillshade_inputs, hillshade_contents)
+    if hillshade_index:
+        hillshade_record["shared_tiles"] = hillshade_index
+    contour_record = layer_record(previous_layers.get("contours"), contour_digest, contour_inputs, contour_contents)
+    contour_record["feature_count"] = contour_feature_count
+    layer_records = {"hillshade": hillshade_record, "contours": contour_record}
+    # PMTiles-only builds keep the layer dirs under _build/ as staging; those
+    # paths are never published, and the archives always upload in full.
+    layer_changes = [
+        (hillshade_dir, hillshade_changed, hillshade_deleted),
+        (contours_dir, contour_changed, contour_deleted),
+        (terrain_dir, terrain_changed, terrain_deleted),
+    ] if write_dirs else []
+    if terrain_params:
+        layer_records["terrain"] = layer_record(previous_layers.get("terrain"), terrain_digest, terrain_inputs, terrain_contents)
+    manifest = build_manifest(
+        dem_sha256=metadata_payload["source_dem"]["sha256"],
+        params={
+            "bounds_wgs84": bounds_payload.get("bounds_wgs84", {}),
+            "padding_km": args.padding_km,
+            "zoom": {"min": int(args.min_zoom), "max": int(args.max_zoom)},
+            "hillshade": hillshade_params,
+            "contours": contour_params,
+            "terrain": terrain_params,
+            "tile_format": args.tile_format,
+        },
+        layers=layer_records,
+        changed=[
+            f"{layer_dir.relative_to(output_root).as_posix()}/{path}"
+            for layer_dir, changed, _ in layer_changes
+            for path in changed
+        ],
+        deleted=[
+            f"{layer_dir.relative_to(output_root).as_posix()}/{path}"
+            for layer_dir, _, deleted in layer_changes
+            for path in deleted
+        ]
+        + archive_deleted,
+    )
+    write_json(output_root / MANIFEST_NAME, manifest)
+    print(
+        f"[build-wmnf-stylized] Manifest: {len(manifest['last_build']['changed'])} changed, "
+        f"{len(manifest['last_build']['deleted'])} deleted tile file(s)"
+    )
     print(f"[build-wmnf-stylized] Build complete: {output_root}")
     return 0
 
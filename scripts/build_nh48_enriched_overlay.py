@@ -5,6 +5,11 @@ Build an enrichment overlay for NH48 peaks for planner + risk filtering.
 Input (default): https://nh48.info/data/nh48.json
 Output: JSON object keyed by slug containing ONLY new/normalized fields, suitable for merging.
 
+With --all, every peak list in data/ (nh48.json, NE115.json, ADK46.json, ...)
+is read locally and built in parallel worker processes into
+<output-dir>/<list>.json, plus an index.json summarising each list and which
+lists every slug belongs to.
+
 Design goals:
 - No speculation: derive from existing dataset fields wherever possible.
 - Deterministic mapping: same input produces same risk chips and prep notes.
@@ -15,13 +20,23 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
 import sys
-import urllib.request
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
-from typing import Any, Dict, List, Optional, Set, Tuple
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from nh48data import LIST_DATASETS, PeakIndex, load_peaks, parse_float, parse_hours, parse_max_miles
+from nh48data.loader import ROOT
+from nh48data.risk import OVERLAY_RISK_ENGINE
 
 DEFAULT_SOURCE = "https://nh48.info/data/nh48.json"
+CANONICAL_DATA_URL = "https://nh48.info/data/"
+DEFAULT_DATA_DIR = ROOT / "data"
+DEFAULT_OUTPUT_DIR = ROOT / "data" / "enriched-overlays"
 
 RANGE_GROUP_MAP = [
     ("Presidential", "Presidential Range"),
@@ -44,16 +59,7 @@ RANGE_GROUP_MAP = [
     ("Tecumseh", "Sandwich / Waterville Range"),
 ]
 
-RISK_FACTOR_ENUM = [
-    "AboveTreelineExposure",
-    "SevereWeather",
-    "LongBailout",
-    "LimitedWater",
-    "Navigation",
-    "ScrambleSteep",
-    "UnbridgedRiverCrossings",
-    "NoCellService",
-]
+_RANGE_GROUP_NEEDLES = [(needle.lower(), group) for needle, group in RANGE_GROUP_MAP]
 
 _ws_re = re.compile(r"\s+")
 
@@ -62,30 +68,11 @@ def _norm(value: str) -> str:
     return _ws_re.sub(" ", (value or "").strip())
 
 
-def load_dataset(source: str) -> Dict[str, Any]:
-    if source.startswith("http://") or source.startswith("https://"):
-        with urllib.request.urlopen(source) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    with open(source, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def parse_coords(coord_text: str) -> Tuple[Optional[float], Optional[float]]:
-    if not coord_text:
-        return None, None
-    parts = [p.strip() for p in coord_text.split(",")]
-    if len(parts) != 2:
-        return None, None
-    try:
-        return float(parts[0]), float(parts[1])
-    except Exception:
-        return None, None
-
-
+@lru_cache(maxsize=1024)
 def normalize_range_group(range_raw: str) -> Optional[str]:
-    rr = range_raw or ""
-    for needle, group in RANGE_GROUP_MAP:
-        if needle.lower() in rr.lower():
+    rr = (range_raw or "").lower()
+    for needle, group in _RANGE_GROUP_NEEDLES:
+        if needle in rr:
             return group
     return None
 
@@ -94,11 +81,6 @@ def _to_str(value: Any) -> str:
     return "" if value is None else str(value)
 
 
-def _contains_any(haystack: str, needles: List[str]) -> bool:
-    h = (haystack or "").lower()
-    return any(n.lower() in h for n in needles)
-
-
 def extract_first_route(peak: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     routes = peak.get("Standard Routes")
     if isinstance(routes, list) and routes:
@@ -107,103 +89,14 @@ def extract_first_route(peak: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return None
 
 
-def parse_number(text: Any) -> Optional[float]:
-    if text is None:
-        return None
-    try:
-        return float(str(text).replace(",", "").strip())
-    except Exception:
-        return None
-
-
-def parse_typical_time(text: str) -> Optional[float]:
-    if not text:
-        return None
-    numbers = re.findall(r"\d+(?:\.\d+)?", text)
-    if not numbers:
-        return None
-    values = [float(n) for n in numbers]
-    if len(values) >= 2:
-        return round((values[0] + values[1]) / 2.0, 1)
-    return round(values[0], 1)
-
-
 def naismith_hours(distance_mi: Optional[float], gain_ft: Optional[float]) -> Optional[float]:
     if distance_mi is None or gain_ft is None:
         return None
     return round((distance_mi / 3.0) + (gain_ft / 2000.0), 1)
 
 
-def bailout_distance_mi(bailout_text: str) -> Optional[float]:
-    if not bailout_text:
-        return None
-    matches = re.findall(r"(~?\s*\d+(?:\.\d+)?)\s*miles?", bailout_text.lower())
-    values: List[float] = []
-    for m in matches:
-        cleaned = m.replace("~", "").strip()
-        try:
-            values.append(float(cleaned))
-        except Exception:
-            continue
-    return max(values) if values else None
-
-
 def assign_risk_factors(peak: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
-    factors: Set[str] = set()
-    triggers: List[Dict[str, Any]] = []
-
-    exposure_level = _to_str(peak.get("Exposure Level"))
-    weather_rating = _to_str(peak.get("Weather Exposure Rating"))
-    water_avail = _to_str(peak.get("Water Availability"))
-    cell = _to_str(peak.get("Cell Reception Quality"))
-    bailout = _to_str(peak.get("Emergency Bailout Options"))
-    scramble = _to_str(peak.get("Scramble Sections"))
-    terrain = _to_str(peak.get("Terrain Character"))
-
-    if _contains_any(exposure_level, ["high", "very high"]) or _contains_any(
-        terrain, ["above treeline", "alpine", "fully exposed"]
-    ):
-        factors.add("AboveTreelineExposure")
-        triggers.append({"field": "Exposure Level", "value": exposure_level})
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    if _contains_any(weather_rating, ["high", "very high", "hurricane", "dangerous"]):
-        factors.add("SevereWeather")
-        triggers.append({"field": "Weather Exposure Rating", "value": weather_rating})
-
-    if _contains_any(bailout, ["none", "no short", "must retreat", "long", "miles"]):
-        factors.add("LongBailout")
-        triggers.append({"field": "Emergency Bailout Options", "value": bailout})
-
-    if _contains_any(water_avail, ["limited", "none", "carry", "no reliable", "filter"]):
-        factors.add("LimitedWater")
-        triggers.append({"field": "Water Availability", "value": water_avail})
-
-    if _contains_any(cell, ["none", "poor", "spotty", "limited"]):
-        factors.add("NoCellService")
-        triggers.append({"field": "Cell Reception Quality", "value": cell})
-
-    if _contains_any(scramble, ["scramble", "chimney", "ladder", "slide", "steep"]) or _contains_any(
-        terrain, ["slide", "ledg", "scrambl"]
-    ):
-        factors.add("ScrambleSteep")
-        triggers.append({"field": "Scramble Sections", "value": scramble})
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    if _contains_any(terrain, ["stream crossing", "river crossing", "ford", "wade"]) or _contains_any(
-        water_avail, ["brook crossing", "stream crossing", "ford"]
-    ):
-        factors.add("UnbridgedRiverCrossings")
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    if "AboveTreelineExposure" in factors or ("NoCellService" in factors and "LongBailout" in factors):
-        factors.add("Navigation")
-        triggers.append(
-            {"field": "Derived", "value": "Navigation added due to AboveTreelineExposure or (NoCellService+LongBailout)"}
-        )
-
-    ordered = [f for f in RISK_FACTOR_ENUM if f in factors]
-    return ordered, triggers
+    return OVERLAY_RISK_ENGINE.evaluate(peak)
 
 
 def build_prep_notes(peak: Dict[str, Any], risk_factors: List[str]) -> str:
@@ -223,36 +116,31 @@ def build_prep_notes(peak: Dict[str, Any], risk_factors: List[str]) -> str:
     return _norm(" ".join(parts))[:420]
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Build NH48 enrichment overlay JSON")
-    parser.add_argument("--input", "-i", default=DEFAULT_SOURCE, help="Input JSON path or URL")
-    parser.add_argument("--output", "-o", default="nh48_enriched_overlay.json", help="Output JSON filename")
-    args = parser.parse_args()
-
-    dataset = load_dataset(args.input)
-    today = date.today().isoformat()
+def build_overlay(
+    peaks: PeakIndex, source_url: str, today: str, source_title: str = "NH48 JSON dataset"
+) -> Dict[str, Any]:
     overlay: Dict[str, Any] = {}
 
-    for slug, peak in dataset.items():
+    for record in peaks:
+        slug, peak = record.key, record.raw
         peak_name = peak.get("peakName") or peak.get("Peak Name") or slug
-        coords = _to_str(peak.get("Coordinates"))
-        lat, lon = parse_coords(coords)
+        lat, lon = record.latitude, record.longitude
 
-        range_raw = _to_str(peak.get("Range / Subrange"))
+        range_raw = record.range_raw
         range_group = normalize_range_group(range_raw)
 
         primary = extract_first_route(peak) or {}
-        dist = parse_number(primary.get("Distance (mi)"))
-        gain = parse_number(primary.get("Elevation Gain (ft)"))
+        dist = parse_float(primary.get("Distance (mi)"))
+        gain = parse_float(primary.get("Elevation Gain (ft)"))
 
-        typical_time = parse_typical_time(_to_str(peak.get("Typical Completion Time")))
+        typical_time = parse_hours(peak.get("Typical Completion Time"))
         estimated_time = typical_time if typical_time is not None else naismith_hours(dist, gain)
 
         factors, triggers = assign_risk_factors(peak)
         prep = build_prep_notes(peak, factors)
 
         bailout_text = _to_str(peak.get("Emergency Bailout Options"))
-        bailout_mi = bailout_distance_mi(bailout_text)
+        bailout_mi = parse_max_miles(bailout_text)
 
         overlay[slug] = {
             "peak_id": slug,
@@ -276,8 +164,8 @@ def main() -> int:
                     "type": "dataset_field",
                     "field": t.get("field"),
                     "value": t.get("value"),
-                    "source_title": "NH48 JSON dataset",
-                    "source_url": args.input,
+                    "source_title": source_title,
+                    "source_url": source_url,
                 }
                 for t in triggers
             ],
@@ -286,11 +174,88 @@ def main() -> int:
             "finish_strategy_suggestions": [],
             "trailhead_coordinates": None,
         }
+    return overlay
+
 
-    with open(args.output, "w", encoding="utf-8") as f:
+def write_overlay(path: Path, overlay: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
         json.dump(overlay, f, indent=2, ensure_ascii=True)
         f.write("\n")
 
+
+def build_dataset_job(job: Tuple[str, str, str]) -> Dict[str, Any]:
+    """Build and write the overlay for one list file; returns its index entry."""
+    source, output_dir, today = job
+    name = Path(source).stem
+    title = "NH48 JSON dataset" if name == "nh48" else f"{name} JSON dataset"
+    overlay = build_overlay(load_peaks(source), f"{CANONICAL_DATA_URL}{Path(source).name}", today, title)
+    output = Path(output_dir) / f"{name}.json"
+    write_overlay(output, overlay)
+    factor_counts: Dict[str, int] = {}
+    for entry in overlay.values():
+        for factor in entry["risk_factors"]:
+            factor_counts[factor] = factor_counts.get(factor, 0) + 1
+    return {
+        "dataset": name,
+        "source": Path(source).name,
+        "file": output.name,
+        "peak_count": len(overlay),
+        "with_coordinates": sum(1 for entry in overlay.values() if entry["latitude"] is not None),
+        "risk_factor_counts": factor_counts,
+        "slugs": list(overlay),
+    }
+
+
+def build_all(data_dir: Path, output_dir: Path, workers: Optional[int], today: str) -> Dict[str, Any]:
+    sources = [data_dir / name for name in LIST_DATASETS if (data_dir / name).exists()]
+    if not sources:
+        raise RuntimeError(f"No peak list datasets found in {data_dir}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(str(source), str(output_dir), today) for source in sources]
+    workers = max(1, min(len(jobs), workers or os.cpu_count() or 1))
+    if workers == 1:
+        entries = list(map(build_dataset_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(build_dataset_job, jobs))
+
+    peak_lists: Dict[str, List[str]] = {}
+    for entry in entries:
+        for slug in entry.pop("slugs"):
+            peak_lists.setdefault(slug, []).append(entry["dataset"])
+    index = {
+        "generated": today,
+        "datasets": entries,
+        "peak_count": sum(entry["peak_count"] for entry in entries),
+        "peaks": {slug: peak_lists[slug] for slug in sorted(peak_lists)},
+    }
+    write_overlay(output_dir / "index.json", index)
+    return index
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build NH48 enrichment overlay JSON")
+    parser.add_argument("--input", "-i", default=DEFAULT_SOURCE, help="Input JSON path or URL")
+    parser.add_argument("--output", "-o", default="nh48_enriched_overlay.json", help="Output JSON filename")
+    parser.add_argument("--all", action="store_true", help="Build overlays for every peak list in --data-dir")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR, help="Directory holding the list datasets")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR, help="Per-list overlay directory (--all)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --all (default: CPU count)")
+    args = parser.parse_args()
+
+    today = date.today().isoformat()
+
+    if args.all:
+        index = build_all(args.data_dir.resolve(), args.output_dir.resolve(), args.workers, today)
+        print(
+            f"Wrote overlays for {len(index['datasets'])} lists ({index['peak_count']} peaks) -> "
+            f"{args.output_dir}/ (index.json)"
+        )
+        return 0
+
+    overlay = build_overlay(load_peaks(args.input), args.input, today)
+    write_overlay(Path(args.output), overlay)
+
     print(f"Wrote overlay for {len(overlay)} peaks -> {args.output}")
     return 0
 
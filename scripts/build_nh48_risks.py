@@ -19,7 +19,10 @@ import json
 import re
 import sys
 from datetime import date
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, Dict, List, Tuple
+
+from nh48data import PeakIndex, is_url, load_peaks
+from nh48data.risk import SCHEMA_RISK_ENGINE
 
 NH48_DEFAULT = "data/nh48.json"
 NH48_CANONICAL_URL = "https://nh48.info/data/nh48.json"
@@ -121,127 +124,23 @@ NAME_ALIASES = {
     "Tecumseh": ["Mount Tecumseh", "Tecumseh"],
 }
 
-# Risk factors exposed to UI as filter chips
-RISK_FACTOR_ENUM = [
-    "AboveTreelineExposure",
-    "SevereWeather",
-    "LongBailout",
-    "LimitedWater",
-    "Navigation",
-    "ScrambleSteep",
-    "UnbridgedRiverCrossings",
-    "NoCellService",
-]
-
 _ws_re = re.compile(r"\s+")
 
 def _to_str(v: Any) -> str:
     return "" if v is None else str(v)
 
-def _contains_any(haystack: str, needles: List[str]) -> bool:
-    h = haystack.lower()
-    return any(n.lower() in h for n in needles)
-
 def _normalize_spaces(s: str) -> str:
     return _ws_re.sub(" ", s).strip()
 
 
-def _normalize_name(s: str) -> str:
-    return _normalize_spaces(s).rstrip(".")
-
-def load_dataset(source: str) -> Dict[str, Any]:
-    # Accept local path or URL
-    if source.startswith("http://") or source.startswith("https://"):
-        import urllib.request
-
-        with urllib.request.urlopen(source) as resp:
-            return json.loads(resp.read().decode("utf-8"))
-    else:
-        with open(source, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-def build_name_index(dataset: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
-    idx: Dict[str, Dict[str, Any]] = {}
-    for slug, obj in dataset.items():
-        # try a few common name fields
-        peak_name = obj.get("peakName") or obj.get("Peak Name") or obj.get("peak_name") or obj.get("name") or obj.get("title")
-        if peak_name:
-            idx[_normalize_name(str(peak_name))] = obj
-        # also index slug and other visible keys
-        if slug:
-            idx[_normalize_name(str(slug))] = obj
-    return idx
-
-def get_peak_obj(name_index: Dict[str, Dict[str, Any]], user_name: str) -> Dict[str, Any]:
-    candidates = NAME_ALIASES.get(user_name, [user_name])
-    for cand in candidates:
-        cand_norm = _normalize_name(cand)
-        if cand_norm in name_index:
-            return name_index[cand_norm]
-    # fallback: fuzzy contains
-    key_lower = _normalize_name(user_name).lower()
-    for k, v in name_index.items():
-        if key_lower in k.lower():
-            return v
-    raise KeyError(f"Could not locate peak in dataset for '{user_name}'")
+def get_peak_obj(peaks: PeakIndex, user_name: str) -> Dict[str, Any]:
+    record = peaks.find(*NAME_ALIASES.get(user_name, [user_name]))
+    if record is None:
+        raise KeyError(f"Could not locate peak in dataset for '{user_name}'")
+    return record.raw
 
 def assign_risk_factors(peak: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
-    factors: Set[str] = set()
-    triggers: List[Dict[str, Any]] = []
-
-    exposure_level = _to_str(peak.get("Exposure Level") or peak.get("Exposure") or peak.get("exposure"))
-    weather_rating = _to_str(peak.get("Weather Exposure Rating") or peak.get("Weather") or peak.get("weather_exposure"))
-    water_avail = _to_str(peak.get("Water Availability") or peak.get("Water Availability (notes)") or peak.get("water"))
-    cell = _to_str(peak.get("Cell Reception Quality") or peak.get("Cell Reception") or peak.get("cell"))
-    bailout = _to_str(peak.get("Emergency Bailout Options") or peak.get("Emergency Bailout") or peak.get("bailout"))
-    scramble = _to_str(peak.get("Scramble Sections") or peak.get("Scramble") or peak.get("scramble"))
-    terrain = _to_str(peak.get("Terrain Character") or peak.get("Terrain") or peak.get("terrain"))
-
-    # Above treeline / high exposure
-    if _contains_any(exposure_level, ["high", "very high"]) or _contains_any(terrain, ["above treeline", "alpine", "fully exposed"]):
-        factors.add("AboveTreelineExposure")
-        triggers.append({"field": "Exposure Level", "value": exposure_level})
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    # Severe weather
-    if _contains_any(weather_rating, ["high", "very high", "hurricane-force", "dangerous"]):
-        factors.add("SevereWeather")
-        triggers.append({"field": "Weather Exposure Rating", "value": weather_rating})
-
-    # Long bailout
-    if _contains_any(bailout, ["none", "no short", "must retreat", "long", "miles"]) or _contains_any(cell, ["none"]):
-        if _contains_any(bailout, ["none", "no short", "must retreat", "long", "miles"]):
-            factors.add("LongBailout")
-            triggers.append({"field": "Emergency Bailout Options", "value": bailout})
-
-    # Limited water
-    if _contains_any(water_avail, ["limited", "none", "carry", "no reliable", "filter"]):
-        factors.add("LimitedWater")
-        triggers.append({"field": "Water Availability", "value": water_avail})
-
-    # No cell service
-    if _contains_any(cell, ["none", "no", "poor", "spotty", "limited"]):
-        factors.add("NoCellService")
-        triggers.append({"field": "Cell Reception Quality", "value": cell})
-
-    # Scramble / steep
-    if _contains_any(scramble, ["scramble", "chimney", "ladder", "slide", "steep"]) or _contains_any(terrain, ["slide", "ledg", "scrambl"]):
-        factors.add("ScrambleSteep")
-        triggers.append({"field": "Scramble Sections", "value": scramble})
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    # Unbridged crossings
-    if _contains_any(terrain, ["stream crossing", "river crossing", "ford", "wade"]) or _contains_any(water_avail, ["brook crossing", "stream crossing", "ford"]):
-        factors.add("UnbridgedRiverCrossings")
-        triggers.append({"field": "Terrain Character", "value": terrain})
-
-    # Navigation: above-treeline or (no cell + long bailout)
-    if "AboveTreelineExposure" in factors or ("NoCellService" in factors and "LongBailout" in factors):
-        factors.add("Navigation")
-        triggers.append({"field": "Derived", "value": "Navigation added due to AboveTreelineExposure or (NoCellService+LongBailout)"})
-
-    ordered = [f for f in RISK_FACTOR_ENUM if f in factors]
-    return ordered, triggers
+    return SCHEMA_RISK_ENGINE.evaluate(peak)
 
 def build_prep_notes(peak: Dict[str, Any], risk_factors: List[str]) -> str:
     parts: List[str] = []
@@ -296,9 +195,8 @@ def main(argv: List[str] | None = None) -> int:
     parser.add_argument("--output", "-o", help="Write JSON output to file (default: stdout)")
     args = parser.parse_args(argv)
 
-    dataset = load_dataset(args.input)
-    name_index = build_name_index(dataset)
-    dataset_source = args.input if args.input.startswith("http://") or args.input.startswith("https://") else NH48_CANONICAL_URL
+    peaks = load_peaks(args.input)
+    dataset_source = args.input if is_url(args.input) else NH48_CANONICAL_URL
 
     # canonical order provided by user (48 peaks); use a best-effort list
     requested = [
@@ -314,7 +212,7 @@ def main(argv: List[str] | None = None) -> int:
 
     for nm in requested:
         try:
-            peak = get_peak_obj(name_index, nm)
+            peak = get_peak_obj(peaks, nm)
         except KeyError:
             out.append({
                 "mountain": nm,
@@ -30,6 +30,7 @@ except ImportError as exc:  # pragma: no cover - explicit runtime guidance
         "Pillow is required. Install with `python -m pip install pillow` and re-run."
     ) from exc
 
+from nh48data import load_dataset
 
 ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_BASE_URL = "https://nh48.info"
@@ -142,7 +143,8 @@ class OgCardGenerator:
             return json.load(handle)
 
     def _load_peak_data(self) -> None:
-        raw = self._load_json(ROOT / "data" / "nh48.json", {})
+        path = ROOT / "data" / "nh48.json"
+        raw = load_dataset(path) if path.exists() else {}
         entries: list[dict[str, Any]] = []
         if isinstance(raw, dict):
             for key, value in raw.items():
@@ -0,0 +1,46 @@
+"""
+Helpers for the long-trail data under data/long-trails/.
+
+``build_compact`` writes simplified, polyline6/delta-encoded copies of the
+generated section LineStrings (one level per zoom) next to the
+full-resolution files; ``longtrails.simplify`` holds the Douglas-Peucker /
+Visvalingam ranking and the encoders. ``LongTrailsFull`` reads single trails
+from data/long-trails-full.json through its byte offset index, and
+``SectionIndex`` answers which sections intersect a viewport.
+"""
+
+from .compact import COMPACT_DIR, GENERATED_DIR, build_compact, compact_section, iter_section_files
+from .full import LongTrailsFull, build_offset_index, load_trail, write_offset_index
+from .sections import SECTION_INDEX_PATH, SectionIndex, build_section_index, write_section_index
+from .simplify import (
+    DEFAULT_ZOOMS,
+    decode_polyline6,
+    douglas_peucker_ranks,
+    encode_delta,
+    encode_polyline6,
+    simplify_levels,
+    visvalingam_ranks,
+)
+
+__all__ = [
+    "COMPACT_DIR",
+    "DEFAULT_ZOOMS",
+    "GENERATED_DIR",
+    "LongTrailsFull",
+    "SECTION_INDEX_PATH",
+    "SectionIndex",
+    "build_compact",
+    "build_offset_index",
+    "build_section_index",
+    "compact_section",
+    "decode_polyline6",
+    "douglas_peucker_ranks",
+    "encode_delta",
+    "encode_polyline6",
+    "iter_section_files",
+    "load_trail",
+    "simplify_levels",
+    "visvalingam_ranks",
+    "write_offset_index",
+    "write_section_index",
+]
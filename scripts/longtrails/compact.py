@@ -0,0 +1,110 @@
+"""
+Compact copies of the generated long-trail section files.
+
+Reads every ``data/long-trails/generated/<trail>/<section>.json`` and writes
+``data/long-trails/compact/<trail>/<section>.json`` with the section's
+metadata, bbox and one simplified, encoded line per zoom level (see
+``longtrails.simplify``). The generated files are left untouched as the
+full-resolution source; each compact file names its source. Sections
+without a geometry (failed generation) are carried over with empty levels.
+"""
+
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .simplify import DEFAULT_TOLERANCE_PX, DEFAULT_ZOOMS, simplify_levels
+
+ROOT = Path(__file__).resolve().parents[2]
+GENERATED_DIR = ROOT / "data" / "long-trails" / "generated"
+COMPACT_DIR = ROOT / "data" / "long-trails" / "compact"
+CARRIED_FIELDS = ("trailSlug", "sectionSlug", "provider", "generatedAt", "distance_mi", "time_min", "status")
+
+
+def iter_section_files(generated_dir: Path = GENERATED_DIR) -> Iterator[Path]:
+    """Section files in trail, then section order (the per-trail ``*.sections.generated.json`` are skipped)."""
+    for trail_dir in sorted(path for path in generated_dir.iterdir() if path.is_dir()):
+        yield from sorted(trail_dir.glob("*.json"))
+
+
+def line_bbox(coordinates: Sequence[Sequence[float]]) -> Optional[List[float]]:
+    if not coordinates:
+        return None
+    lons = [point[0] for point in coordinates]
+    lats = [point[1] for point in coordinates]
+    return [round(min(lons), 6), round(min(lats), 6), round(max(lons), 6), round(max(lats), 6)]
+
+
+def compact_section(
+    payload: Dict[str, Any],
+    source: str,
+    zooms: Sequence[int] = DEFAULT_ZOOMS,
+    tolerance_px: float = DEFAULT_TOLERANCE_PX,
+    method: str = "dp",
+    encoding: str = "polyline6",
+) -> Dict[str, Any]:
+    geometry = payload.get("geometry") or {}
+    coordinates = geometry.get("coordinates") if geometry.get("type") == "LineString" else None
+    coordinates = coordinates or []
+    compact: Dict[str, Any] = {field: payload.get(field) for field in CARRIED_FIELDS if field in payload}
+    compact.update({
+        "source": source,
+        "sourcePoints": len(coordinates),
+        "bbox": line_bbox(coordinates),
+        "method": method,
+        "encoding": encoding,
+        "precision": 6,
+        "levels": simplify_levels(coordinates, zooms, tolerance_px, method, encoding),
+    })
+    return compact
+
+
+def compact_file(job: Tuple[Path, Path, Path, Sequence[int], float, str, str]) -> Tuple[str, int, int]:
+    """Write the compact copy of one section file; returns (trail, source bytes, output bytes)."""
+    path, generated_dir, output_dir, zooms, tolerance_px, method, encoding = job
+    relative = path.relative_to(generated_dir)
+    raw = path.read_bytes()
+    compact = compact_section(
+        json.loads(raw.decode("utf-8-sig")),
+        (Path("data") / "long-trails" / "generated" / relative).as_posix(),
+        zooms,
+        tolerance_px,
+        method,
+        encoding,
+    )
+    target = output_dir / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    body = (json.dumps(compact, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    target.write_bytes(body)
+    return relative.parts[0], len(raw), len(body)
+
+
+def build_compact(
+    generated_dir: Path = GENERATED_DIR,
+    output_dir: Path = COMPACT_DIR,
+    zooms: Sequence[int] = DEFAULT_ZOOMS,
+    tolerance_px: float = DEFAULT_TOLERANCE_PX,
+    method: str = "dp",
+    encoding: str = "polyline6",
+    workers: int = 1,
+) -> Dict[str, Dict[str, int]]:
+    """Compact every section file; returns {trail: {"sections", "source_bytes", "output_bytes"}}."""
+    jobs = [
+        (path, generated_dir, output_dir, tuple(zooms), tolerance_px, method, encoding)
+        for path in iter_section_files(generated_dir)
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(compact_file, jobs, chunksize=8))
+    else:
+        results = [compact_file(job) for job in jobs]
+    report: Dict[str, Dict[str, int]] = {}
+    for trail, source_bytes, output_bytes in results:
+        entry = report.setdefault(trail, {"sections": 0, "source_bytes": 0, "output_bytes": 0})
+        entry["sections"] += 1
+        entry["source_bytes"] += source_bytes
+        entry["output_bytes"] += output_bytes
+    return report
@@ -0,0 +1,211 @@
+"""
+Per-trail random access into data/long-trails-full.json.
+
+The full document is one JSON object ({"generatedAt", "bounds", "colors",
+"trails": [...]}) that every consumer used to parse whole to read a single
+trail. ``build_offset_index`` scans the file's bytes once (strings and
+brackets only, via one regex) and records the byte span of every element of
+``trails`` plus its slug, id and name; the small top-level values are stored
+in the index as-is. ``LongTrailsFull.trail(slug)`` then seeks to the span
+and decodes only that trail.
+
+Decoding is BOM-safe: the file may start with a UTF-8 BOM (offsets are byte
+positions, so it is simply skipped), and every slice is decoded as UTF-8.
+The index records the source size and sha256; a size change, or a slice
+that does not decode to the expected trail, falls back to re-scanning the
+file in memory, so a stale index costs one parse instead of returning the
+wrong trail.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[2]
+FULL_PATH = ROOT / "data" / "long-trails-full.json"
+INDEX_PATH = ROOT / "data" / "long-trails-full.index.json"
+INDEX_VERSION = 1
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# A JSON string (escapes included) or one structural character.
+_TOKEN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|[\[\]{}:,]', re.DOTALL)
+
+
+def read_json(path: Path) -> Any:
+    """``json.loads`` of a whole file, tolerating a UTF-8 BOM."""
+    return json.loads(Path(path).read_bytes().decode("utf-8-sig"))
+
+
+def scan_array_spans(raw: bytes, key: str = "trails") -> List[Tuple[int, int]]:
+    """Byte spans [start, end) of the elements of the top-level array ``key``."""
+    wanted = json.dumps(key).encode("utf-8")
+    spans: List[Tuple[int, int]] = []
+    depth = 0
+    last_string = b""
+    pending_key = None
+    in_array = False
+    element_start = None
+    for match in _TOKEN_RE.finditer(raw):
+        token = match.group()
+        if token[:1] == b'"':
+            last_string = token
+            if in_array and depth == 2 and element_start is None:
+                element_start = match.start()
+            continue
+        if token == b":":
+            if depth == 1:
+                pending_key = last_string
+            continue
+        if token in (b"{", b"["):
+            if depth == 1 and token == b"[" and pending_key == wanted:
+                in_array = True
+            elif in_array and depth == 2 and element_start is None:
+                element_start = match.start()
+            depth += 1
+        elif token in (b"}", b"]"):
+            depth -= 1
+            if in_array and depth == 1:
+                in_array = False
+                if element_start is not None:
+                    spans.append((element_start, _value_end(raw, element_start, match.start())))
+                    element_start = None
+            elif in_array and depth == 2 and element_start is not None:
+                spans.append((element_start, match.end()))
+                element_start = None
+        elif token == b"," and in_array and depth == 2 and element_start is not None:
+            spans.append((element_start, _value_end(raw, element_start, match.start())))
+            element_start = None
+    return spans
+
+
+def _value_end(raw: bytes, start: int, stop: int) -> int:
+    """End of a scalar element between ``start`` and the next separator (whitespace trimmed)."""
+    return start + len(raw[start:stop].rstrip())
+
+
+def source_fingerprint(raw: bytes) -> Dict[str, Any]:
+    return {"size": len(raw), "sha256": hashlib.sha256(raw).hexdigest()}
+
+
+def build_offset_index(raw: bytes, source: str = "data/long-trails-full.json") -> Dict[str, Any]:
+    """Offset index for the full document ``raw`` (decodes each trail once to read its keys)."""
+    document = json.loads(raw.decode("utf-8-sig"))
+    if not isinstance(document, dict) or not isinstance(document.get("trails"), list):
+        raise RuntimeError(f"{source} is not an object with a 'trails' array.")
+    spans = scan_array_spans(raw)
+    if len(spans) != len(document["trails"]):
+        raise RuntimeError(f"Found {len(spans)} trail span(s) in {source} but the document has {len(document['trails'])}.")
+    trails = []
+    for (start, end), trail in zip(spans, document["trails"]):
+        if json.loads(raw[start:end].decode("utf-8")) != trail:
+            raise RuntimeError(f"Trail span {start}:{end} in {source} does not match the parsed document.")
+        trails.append({
+            "slug": trail.get("slug"),
+            "id": trail.get("id"),
+            "name": trail.get("name"),
+            "offset": start,
+            "length": end - start,
+        })
+    return {
+        "version": INDEX_VERSION,
+        "source": source,
+        **source_fingerprint(raw),
+        "bom": raw.startswith(UTF8_BOM),
+        "meta": {key: value for key, value in document.items() if key != "trails"},
+        "trails": trails,
+    }
+
+
+def write_offset_index(path: Path = FULL_PATH, index_path: Path = INDEX_PATH) -> Dict[str, Any]:
+    raw = Path(path).read_bytes()
+    try:
+        source = Path(path).resolve().relative_to(ROOT).as_posix()
+    except ValueError:
+        source = str(path)
+    index = build_offset_index(raw, source)
+    Path(index_path).write_text(json.dumps(index, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return index
+
+
+class LongTrailsFull:
+    """Seek-and-decode reader for one trail at a time, by slug or id."""
+
+    def __init__(self, path: Path = FULL_PATH, index_path: Path = INDEX_PATH) -> None:
+        self.path = Path(path)
+        self.index_path = Path(index_path)
+        self._use(self._load_index())
+
+    def _use(self, index: Dict[str, Any]) -> None:
+        self.index = index
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in index["trails"]:
+            for key in {entry.get("id"), entry.get("slug")} - {None, ""}:
+                self._by_key.setdefault(str(key), []).append(entry)
+
+    def _load_index(self) -> Dict[str, Any]:
+        size = self.path.stat().st_size
+        if self.index_path.exists():
+            index = read_json(self.index_path)
+            if index.get("version") == INDEX_VERSION and index.get("size") == size:
+                return index
+        return self._rescan()
+
+    def _rescan(self) -> Dict[str, Any]:
+        return build_offset_index(self.path.read_bytes(), str(self.path))
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """Top-level values other than ``trails`` (generatedAt, bounds, colors)."""
+        return self.index["meta"]
+
+    @property
+    def slugs(self) -> List[str]:
+        return [entry["slug"] for entry in self.index["trails"]]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._by_key
+
+    def __len__(self) -> int:
+        return len(self.index["trails"])
+
+    def _read(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self.path.open("rb") as handle:
+            handle.seek(entry["offset"])
+            chunk = handle.read(entry["length"])
+        try:
+            trail = json.loads(chunk.decode("utf-8"))
+        except ValueError:
+            return None
+        if not isinstance(trail, dict) or trail.get("slug") != entry.get("slug") or trail.get("id") != entry.get("id"):
+            return None
+        return trail
+
+    def trails(self, key: str) -> List[Dict[str, Any]]:
+        """Every trail whose slug or id is ``key``, in file order (some slugs repeat)."""
+        entries = self._by_key.get(key)
+        if not entries:
+            raise KeyError(key)
+        trails = [self._read(entry) for entry in entries]
+        if any(trail is None for trail in trails):
+            # Same size but different content: the index is stale.
+            self._use(self._rescan())
+            trails = [self._read(entry) for entry in self._by_key.get(key, [])]
+            if not trails or any(trail is None for trail in trails):
+                raise KeyError(key)
+        return trails
+
+    def trail(self, key: str) -> Dict[str, Any]:
+        """The first trail whose slug or id is ``key``."""
+        entries = self._by_key.get(key)
+        if not entries:
+            raise KeyError(key)
+        trail = self._read(entries[0])
+        return trail if trail is not None else self.trails(key)[0]
+
+
+def load_trail(key: str, path: Path = FULL_PATH, index_path: Path = INDEX_PATH) -> Dict[str, Any]:
+    return LongTrailsFull(path, index_path).trail(key)
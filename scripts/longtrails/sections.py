@@ -0,0 +1,200 @@
+"""
+Quadkey tile index over the generated long-trail section geometries.
+
+``build_section_index`` reads every ``data/long-trails/generated/<trail>/
+<section>.json`` once and records its bounding box plus the Web Mercator
+tiles, at ``INDEX_ZOOM``, that its line actually passes through (segments
+are densified to half a tile, so long straight fallback segments still
+cover every tile they cross). The result is a compact JSON file:
+
+  sections  [trailSlug, sectionSlug, west, south, east, north, points]
+  tiles     {quadkey: [section row, ...]}
+
+``SectionIndex.query(bbox, zoom)`` turns the viewport into the quadkeys it
+covers, unions their sections and keeps those whose bbox intersects the
+viewport, so the map (or a local API) fetches only those section files.
+With a ``zoom`` each hit also names the compact level to load
+(``longtrails.compact``): the most detailed level not finer than the zoom.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .compact import GENERATED_DIR, iter_section_files, line_bbox
+from .simplify import DEFAULT_ZOOMS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when an index is built
+    np = None
+
+ROOT = Path(__file__).resolve().parents[2]
+SECTION_INDEX_PATH = ROOT / "data" / "long-trails" / "sections-index.json"
+INDEX_VERSION = 1
+INDEX_ZOOM = 7
+MAX_MERCATOR_LAT = 85.05112878
+
+BBox = Tuple[float, float, float, float]  # west, south, east, north
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for the section index. Install with `python -m pip install numpy`.")
+
+
+def tile_xy(lon: Any, lat: Any, zoom: int) -> Tuple[Any, Any]:
+    """Fractional Web Mercator tile coordinates (NumPy arrays or scalars)."""
+    scale = 2 ** zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * scale
+    rad = np.radians(lat)
+    y = (1.0 - np.log(np.tan(rad) + 1.0 / np.cos(rad)) / math.pi) / 2.0 * scale
+    return np.clip(x, 0, scale - 1e-9), np.clip(y, 0, scale - 1e-9)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return "".join(digits)
+
+
+def line_tiles(coordinates: Sequence[Sequence[float]], zoom: int = INDEX_ZOOM) -> Set[str]:
+    """Quadkeys of the tiles the line passes through."""
+    coords = np.asarray([point[:2] for point in coordinates], dtype=np.float64).reshape(-1, 2)
+    if not len(coords):
+        return set()
+    x, y = tile_xy(coords[:, 0], coords[:, 1], zoom)
+    if len(coords) > 1:
+        steps = np.maximum(1, np.ceil(np.maximum(np.abs(np.diff(x)), np.abs(np.diff(y))) * 2)).astype(np.int64)
+        starts = np.repeat(np.arange(len(steps)), steps)
+        fractions = np.arange(int(steps.sum())) - np.repeat(np.cumsum(steps) - steps, steps)
+        t = fractions / np.repeat(steps, steps)
+        x = np.concatenate((x[starts] + (x[starts + 1] - x[starts]) * t, x[-1:]))
+        y = np.concatenate((y[starts] + (y[starts + 1] - y[starts]) * t, y[-1:]))
+    cells = np.unique(np.column_stack((x.astype(np.int64), y.astype(np.int64))), axis=0)
+    return {quadkey(int(cx), int(cy), zoom) for cx, cy in cells}
+
+
+def bbox_tiles(bbox: BBox, zoom: int = INDEX_ZOOM) -> List[str]:
+    """Quadkeys of every tile overlapping ``bbox`` (west > east wraps the antimeridian)."""
+    west, south, east, north = bbox
+    if west > east:
+        return bbox_tiles((west, south, 180.0, north), zoom) + bbox_tiles((-180.0, south, east, north), zoom)
+    x0, y0 = tile_xy(west, north, zoom)
+    x1, y1 = tile_xy(east, south, zoom)
+    return [
+        quadkey(x, y, zoom)
+        for x in range(int(x0), int(x1) + 1)
+        for y in range(int(y0), int(y1) + 1)
+    ]
+
+
+def bbox_intersects(a: Sequence[float], b: BBox) -> bool:
+    west, south, east, north = b
+    if west > east:
+        return bbox_intersects(a, (west, south, 180.0, north)) or bbox_intersects(a, (-180.0, south, east, north))
+    return a[0] <= east and a[2] >= west and a[1] <= north and a[3] >= south
+
+
+def build_section_index(
+    generated_dir: Path = GENERATED_DIR,
+    zoom: int = INDEX_ZOOM,
+    levels: Sequence[int] = DEFAULT_ZOOMS,
+) -> Dict[str, Any]:
+    require_numpy()
+    sections: List[List[Any]] = []
+    tiles: Dict[str, List[int]] = {}
+    skipped = 0
+    for path in iter_section_files(generated_dir):
+        payload = json.loads(path.read_bytes().decode("utf-8-sig"))
+        geometry = payload.get("geometry") or {}
+        coordinates = geometry.get("coordinates") if geometry.get("type") == "LineString" else None
+        bbox = line_bbox(coordinates or [])
+        if bbox is None:
+            skipped += 1
+            continue
+        row = len(sections)
+        sections.append([path.parent.name, path.stem, *bbox, len(coordinates)])
+        for key in line_tiles(coordinates, zoom):
+            tiles.setdefault(key, []).append(row)
+    return {
+        "version": INDEX_VERSION,
+        "indexZoom": zoom,
+        "levels": sorted(levels),
+        "generatedDir": "data/long-trails/generated",
+        "compactDir": "data/long-trails/compact",
+        "skipped": skipped,
+        "sections": sections,
+        "tiles": {key: tiles[key] for key in sorted(tiles)},
+    }
+
+
+def write_section_index(index: Dict[str, Any], path: Path = SECTION_INDEX_PATH) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(index, separators=(",", ":")) + "\n", encoding="utf-8")
+
+
+class SectionIndex:
+    """Viewport queries over a section index written by ``write_section_index``."""
+
+    def __init__(self, index: Dict[str, Any]) -> None:
+        if index.get("version") != INDEX_VERSION:
+            raise RuntimeError(f"Unsupported section index version: {index.get('version')}")
+        self.zoom = int(index["indexZoom"])
+        self.levels = list(index.get("levels") or [])
+        self.generated_dir = index.get("generatedDir", "data/long-trails/generated")
+        self.compact_dir = index.get("compactDir", "data/long-trails/compact")
+        self.sections = index["sections"]
+        self.tiles: Dict[str, List[int]] = index["tiles"]
+
+    @classmethod
+    def load(cls, path: Path = SECTION_INDEX_PATH) -> "SectionIndex":
+        if not Path(path).exists():
+            raise RuntimeError(f"Missing {path}. Run scripts/build-long-trail-section-index.py first.")
+        return cls(json.loads(Path(path).read_bytes().decode("utf-8-sig")))
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def level_for(self, zoom: float) -> Optional[int]:
+        """Most detailed compact level not finer than ``zoom`` (the coarsest below every level)."""
+        if not self.levels:
+            return None
+        eligible = [level for level in self.levels if level <= zoom]
+        return max(eligible) if eligible else min(self.levels)
+
+    def candidates(self, bbox: BBox) -> List[int]:
+        rows: Set[int] = set()
+        for key in bbox_tiles(bbox, self.zoom):
+            rows.update(self.tiles.get(key, ()))
+        return sorted(rows)
+
+    def query(self, bbox: BBox, zoom: Optional[float] = None, trails: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Sections whose line tiles and bbox intersect ``bbox`` (west, south, east, north)."""
+        wanted = set(trails) if trails else None
+        level = self.level_for(zoom) if zoom is not None else None
+        hits = []
+        for row in self.candidates(bbox):
+            trail, section, west, south, east, north, points = self.sections[row]
+            if wanted is not None and trail not in wanted:
+                continue
+            if not bbox_intersects((west, south, east, north), bbox):
+                continue
+            hit = {
+                "trail": trail,
+                "section": section,
+                "bbox": [west, south, east, north],
+                "points": points,
+                "source": f"{self.generated_dir}/{trail}/{section}.json",
+                "compact": f"{self.compact_dir}/{trail}/{section}.json",
+            }
+            if level is not None:
+                hit["level"] = level
+            hits.append(hit)
+        return hits
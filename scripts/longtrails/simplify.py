@@ -0,0 +1,227 @@
+"""
+Zoom-aware simplification and compact encoding of long-trail section lines.
+
+A section file (``data/long-trails/generated/<trail>/<section>.json``) holds
+a Valhalla LineString with every vertex pretty-printed. Simplification runs
+once per line and ranks every vertex by the tolerance (metres) at which it
+would be dropped:
+
+  dp  Douglas-Peucker: the vertex's distance from the chord it split, capped
+      by its parent's rank so filtering by tolerance ``t`` gives exactly the
+      Douglas-Peucker result for ``t``.
+  vw  Visvalingam-Whyatt: sqrt of the effective triangle area, made
+      monotone in removal order.
+
+Each zoom level then keeps the vertices ranked at or above one pixel's ground
+size at that zoom (``tolerance_px`` * metres per pixel at the line's mean
+latitude), so every level is a threshold on the same ranking. Distances use
+a local equirectangular projection, which is accurate to well under a pixel
+over one section.
+
+Levels are encoded as polyline6 (lat, lon order, as decoded by
+scripts/routing/polyline6.mjs) or as a flat int32 delta array
+[lon0, lat0, dlon1, dlat1, ...] in 1e-6 degrees.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Any, Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when a line is simplified
+    np = None
+
+EARTH_RADIUS_M = 6371008.8
+# Ground metres per pixel at zoom 0 on the equator for 256 px Web Mercator tiles.
+EQUATOR_M_PER_PX = 2 * math.pi * 6378137.0 / 256
+DEFAULT_ZOOMS = (8, 11, 14)
+DEFAULT_TOLERANCE_PX = 1.0
+PRECISION = 6
+METHODS = ("dp", "vw")
+FORMATS = ("polyline6", "delta")
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for line simplification. Install with `python -m pip install numpy`.")
+
+
+def metres_per_pixel(zoom: float, latitude: float) -> float:
+    return EQUATOR_M_PER_PX * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+
+def project(coords: "np.ndarray") -> "np.ndarray":
+    """[lon, lat] degrees -> local x/y metres (equirectangular about the mean latitude)."""
+    lat0 = math.radians(float(np.mean(coords[:, 1])))
+    rad = np.radians(coords)
+    return np.column_stack((rad[:, 0] * math.cos(lat0) * EARTH_RADIUS_M, rad[:, 1] * EARTH_RADIUS_M))
+
+
+def _segment_distances(xy: "np.ndarray", start: int, end: int) -> "np.ndarray":
+    """Distance of xy[start + 1:end] from the segment xy[start] -> xy[end]."""
+    a, b = xy[start], xy[end]
+    points = xy[start + 1:end]
+    ab = b - a
+    length2 = float(ab @ ab)
+    if length2 == 0.0:
+        return np.hypot(points[:, 0] - a[0], points[:, 1] - a[1])
+    t = np.clip(((points - a) @ ab) / length2, 0.0, 1.0)
+    nearest = a + t[:, None] * ab
+    return np.hypot(points[:, 0] - nearest[:, 0], points[:, 1] - nearest[:, 1])
+
+
+def douglas_peucker_ranks(xy: "np.ndarray") -> "np.ndarray":
+    """Per-vertex Douglas-Peucker tolerance (metres); endpoints are ``inf``."""
+    n = len(xy)
+    ranks = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return ranks
+    ranks[0] = ranks[-1] = np.inf
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        start, end, ceiling = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(xy, start, end)
+        offset = int(np.argmax(distances))
+        split = start + 1 + offset
+        rank = min(float(distances[offset]), ceiling)
+        ranks[split] = rank
+        stack.append((start, split, rank))
+        stack.append((split, end, rank))
+    return ranks
+
+
+def _triangle_area(xy: "np.ndarray", a: int, b: int, c: int) -> float:
+    return abs((xy[b, 0] - xy[a, 0]) * (xy[c, 1] - xy[a, 1]) - (xy[c, 0] - xy[a, 0]) * (xy[b, 1] - xy[a, 1])) / 2.0
+
+
+def visvalingam_ranks(xy: "np.ndarray") -> "np.ndarray":
+    """Per-vertex sqrt(effective area) (metres), monotone in removal order; endpoints are ``inf``."""
+    n = len(xy)
+    ranks = np.full(n, np.inf, dtype=np.float64)
+    if n < 3:
+        return ranks
+    previous = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    current = [np.inf] * n
+    heap = []
+    for index in range(1, n - 1):
+        current[index] = _triangle_area(xy, index - 1, index, index + 1)
+        heap.append((current[index], index))
+    heapq.heapify(heap)
+    floor = 0.0
+    removed = [False] * n
+    while heap:
+        area, index = heapq.heappop(heap)
+        if removed[index] or area != current[index]:
+            continue
+        floor = max(floor, area)
+        ranks[index] = math.sqrt(floor)
+        removed[index] = True
+        before, after = previous[index], following[index]
+        following[before], previous[after] = after, before
+        for neighbour in (before, after):
+            if 0 < neighbour < n - 1:
+                current[neighbour] = _triangle_area(xy, previous[neighbour], neighbour, following[neighbour])
+                heapq.heappush(heap, (current[neighbour], neighbour))
+    return ranks
+
+
+def vertex_ranks(coords: "np.ndarray", method: str = "dp") -> "np.ndarray":
+    require_numpy()
+    if method not in METHODS:
+        raise RuntimeError(f"Unknown simplification method: {method} (use one of {', '.join(METHODS)})")
+    xy = project(coords)
+    return douglas_peucker_ranks(xy) if method == "dp" else visvalingam_ranks(xy)
+
+
+def quantize(coords: "np.ndarray") -> "np.ndarray":
+    """[lon, lat] degrees -> int64 1e-6 degree units, consecutive duplicates dropped."""
+    fixed = np.round(coords * 10 ** PRECISION).astype(np.int64)
+    if len(fixed) > 1:
+        keep = np.ones(len(fixed), dtype=bool)
+        keep[1:] = np.any(fixed[1:] != fixed[:-1], axis=1)
+        fixed = fixed[keep]
+    return fixed
+
+
+def _encode_value(value: int, out: List[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline6(fixed: "np.ndarray") -> str:
+    """Google polyline encoding of quantized [lon, lat] rows, written lat first."""
+    out: List[str] = []
+    last_lat = last_lon = 0
+    for lon, lat in fixed.tolist():
+        _encode_value(lat - last_lat, out)
+        _encode_value(lon - last_lon, out)
+        last_lat, last_lon = lat, lon
+    return "".join(out)
+
+
+def encode_delta(fixed: "np.ndarray") -> List[int]:
+    if not len(fixed):
+        return []
+    deltas = np.diff(fixed, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return deltas.astype(np.int32).ravel().tolist()
+
+
+def decode_polyline6(encoded: str) -> List[List[float]]:
+    """[lon, lat] pairs from a polyline6 string (mirror of scripts/routing/polyline6.mjs)."""
+    values: List[int] = []
+    index = 0
+    while index < len(encoded):
+        result = shift = 0
+        while True:
+            byte = ord(encoded[index]) - 63
+            index += 1
+            result |= (byte & 0x1F) << shift
+            shift += 5
+            if byte < 0x20:
+                break
+        values.append(~(result >> 1) if result & 1 else result >> 1)
+    coords: List[List[float]] = []
+    lat = lon = 0
+    for lat_delta, lon_delta in zip(values[0::2], values[1::2]):
+        lat += lat_delta
+        lon += lon_delta
+        coords.append([lon / 10 ** PRECISION, lat / 10 ** PRECISION])
+    return coords
+
+
+def simplify_levels(
+    coordinates: Sequence[Sequence[float]],
+    zooms: Sequence[int] = DEFAULT_ZOOMS,
+    tolerance_px: float = DEFAULT_TOLERANCE_PX,
+    method: str = "dp",
+    encoding: str = "polyline6",
+) -> List[Dict[str, Any]]:
+    """One encoded level per zoom, coarsest first."""
+    require_numpy()
+    if encoding not in FORMATS:
+        raise RuntimeError(f"Unknown encoding: {encoding} (use one of {', '.join(FORMATS)})")
+    coords = np.asarray([point[:2] for point in coordinates], dtype=np.float64).reshape(-1, 2)
+    if not len(coords):
+        return []
+    ranks = vertex_ranks(coords, method)
+    latitude = float(np.mean(coords[:, 1]))
+    levels = []
+    for zoom in sorted(zooms):
+        tolerance = tolerance_px * metres_per_pixel(zoom, latitude)
+        fixed = quantize(coords[ranks >= tolerance])
+        level: Dict[str, Any] = {"zoom": int(zoom), "tolerance_m": round(tolerance, 2), "points": int(len(fixed))}
+        if encoding == "polyline6":
+            level["polyline6"] = encode_polyline6(fixed)
+        else:
+            level["delta"] = encode_delta(fixed)
+        levels.append(level)
+    return levels
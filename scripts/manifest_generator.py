@@ -27,6 +27,8 @@ from typing import Dict, List, Optional
 
 from PIL import ExifTags, Image
 
+from nh48data import load_dataset
+
 DEFAULT_PHOTO_BASE_URL = os.getenv(
     "PHOTO_BASE_URL",
     "https://photos.nh48.info",
@@ -883,8 +885,8 @@ def generate_manifest(
       * Augments the tags list with season, time of day and orientation
         descriptors derived from the photo metadata.
     """
-    with open(api_json_path, 'r') as f:
-        data = json.load(f)
+    # Mutable copy: the cached payload stays pristine for other readers in this process.
+    data = load_dataset(api_json_path, mutable=True)
     bridge_counts = {"headline": 0, "description": 0, "altText": 0, "extendedDescription": 0}
     generated_counts = {"headline": 0, "description": 0, "altText": 0, "extendedDescription": 0}
     total_photos = 0
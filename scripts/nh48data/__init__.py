@@ -0,0 +1,74 @@
+"""
+Shared loading and lookup for the peak datasets used by the Python scripts.
+
+    from nh48data import load_peaks
+
+    peaks = load_peaks()                  # data/nh48.json, parsed once per process
+    peaks.get("mount-washington")         # by slug
+    peaks.find("Washington")              # by name / alias
+
+``load_dataset`` returns the raw (cached, read-only) JSON payload for scripts
+that need the file as-is. ``open_snapshot`` memory-maps the columnar snapshot
+of every peak list (built by scripts/build-peak-list-snapshot.py) and
+``load_spatial_index`` answers nearest / radius queries over peaks, trailhead
+parking and POIs. ``peak_distances`` builds a list's peak-to-peak distance
+matrix and nearest-neighbour lists (scripts/build-peak-distances.py), and
+``load_trail_graph`` routes between snapped peaks and trailheads over the
+WMNF OSM trail extracts.
+``nh48data.risk`` holds the compiled risk-chip rules shared
+by the overlay and risk schema builders.
+"""
+
+from .distances import PeakDistances, peak_distances
+from .loader import DEFAULT_DATASET, clear_cache, is_url, load_dataset
+from .peaks import (
+    PeakIndex,
+    PeakRecord,
+    alias_key,
+    load_peaks,
+    name_key,
+    normalize_name,
+    normalize_slug,
+    parse_coordinates,
+)
+from .parsing import parse_column, parse_float, parse_hours, parse_max_miles, parse_number, parse_route_columns
+from .risk import RISK_FACTOR_ENUM, RiskEngine
+from .snapshot import DEFAULT_SNAPSHOT, LIST_DATASETS, PeakListSnapshot, build_snapshot, open_snapshot
+from .spatial import SpatialIndex, SpatialPoint, haversine_km, load_spatial_index
+from .trails import TrailGraph, load_trail_graph
+
+__all__ = [
+    "DEFAULT_DATASET",
+    "DEFAULT_SNAPSHOT",
+    "LIST_DATASETS",
+    "PeakDistances",
+    "PeakIndex",
+    "PeakListSnapshot",
+    "PeakRecord",
+    "RISK_FACTOR_ENUM",
+    "RiskEngine",
+    "SpatialIndex",
+    "SpatialPoint",
+    "TrailGraph",
+    "alias_key",
+    "build_snapshot",
+    "clear_cache",
+    "haversine_km",
+    "is_url",
+    "load_dataset",
+    "load_peaks",
+    "load_spatial_index",
+    "load_trail_graph",
+    "name_key",
+    "normalize_name",
+    "normalize_slug",
+    "open_snapshot",
+    "parse_column",
+    "parse_coordinates",
+    "parse_float",
+    "parse_hours",
+    "parse_max_miles",
+    "parse_number",
+    "parse_route_columns",
+    "peak_distances",
+]
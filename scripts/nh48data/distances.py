@@ -0,0 +1,184 @@
+"""
+Precomputed peak-to-peak distances and nearest-neighbour lists per peak list.
+
+Each list's coordinates are parsed once into latitude/longitude arrays and
+the full great-circle distance matrix is computed in one broadcast
+``haversine_km`` call. It is stored compactly as the condensed upper
+triangle (pairs i < j, row-major) of little-endian float32 kilometres, so a
+page or the worker can read it into a ``Float32Array`` and look up
+
+    km(i, j) = data[i * n - i * (i + 1) / 2 + (j - i - 1)]    (i < j)
+
+Alongside it a JSON index carries the slug order, the k nearest peaks of
+every peak and, for the NH48, the straight-line legs of each planner
+day-trip group (data/nh48-planner-templates.json).
+
+    from nh48data.distances import peak_distances
+
+    distances = peak_distances("data/ADK46.json")
+    distances.km("marcy", "algonquin")
+    distances.neighbors(k=5)
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .loader import ROOT, Source, load_dataset
+from .peaks import PeakRecord, load_peaks
+from .spatial import haversine_km
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when a matrix is built
+    np = None
+
+DEFAULT_OUTPUT_DIR = ROOT / "data" / "peak-distances"
+PLANNER_TEMPLATES = ROOT / "data" / "nh48-planner-templates.json"
+DEFAULT_NEIGHBORS = 8
+MATRIX_DTYPE = "<f4"
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for peak distance matrices. Install with `python -m pip install numpy`.")
+
+
+def condensed_index(i: int, j: int, n: int) -> int:
+    """Position of pair (i, j), i != j, in the condensed upper triangle of an n x n matrix."""
+    if i > j:
+        i, j = j, i
+    return i * n - i * (i + 1) // 2 + (j - i - 1)
+
+
+def condense(matrix: "np.ndarray") -> "np.ndarray":
+    rows, cols = np.triu_indices(matrix.shape[0], k=1)
+    return np.ascontiguousarray(matrix[rows, cols], dtype=MATRIX_DTYPE)
+
+
+def expand(condensed: "np.ndarray", n: int) -> "np.ndarray":
+    """Square float32 matrix (zero diagonal) from a condensed upper triangle."""
+    require_numpy()
+    if condensed.shape != (n * (n - 1) // 2,):
+        raise RuntimeError(f"Condensed matrix has {condensed.size} value(s); expected {n * (n - 1) // 2} for {n} peaks.")
+    matrix = np.zeros((n, n), dtype=np.float32)
+    rows, cols = np.triu_indices(n, k=1)
+    matrix[rows, cols] = condensed
+    matrix[cols, rows] = condensed
+    return matrix
+
+
+class PeakDistances:
+    """Distance matrix (km) over the peaks of one list that have coordinates, in file order."""
+
+    def __init__(self, list_name: str, records: Sequence[PeakRecord], matrix: "np.ndarray", missing: Sequence[str] = ()) -> None:
+        self.list_name = list_name
+        self.records = list(records)
+        self.matrix = matrix
+        self.missing = list(missing)
+        self.position = {record.key: index for index, record in enumerate(self.records)}
+
+    @classmethod
+    def from_records(cls, list_name: str, records: Sequence[PeakRecord]) -> "PeakDistances":
+        require_numpy()
+        located = [record for record in records if record.coordinates is not None]
+        lat = np.array([record.latitude for record in located], dtype=np.float64)
+        lon = np.array([record.longitude for record in located], dtype=np.float64)
+        matrix = haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]).astype(np.float32)
+        missing = [record.key for record in records if record.coordinates is None]
+        return cls(list_name, located, matrix, missing)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def slugs(self) -> List[str]:
+        return [record.key for record in self.records]
+
+    def km(self, a: str, b: str) -> Optional[float]:
+        i, j = self.position.get(a), self.position.get(b)
+        if i is None or j is None:
+            return None
+        return float(self.matrix[i, j])
+
+    def neighbors(self, k: int = DEFAULT_NEIGHBORS) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(indices, km) of each peak's ``k`` nearest other peaks, nearest first; both n x k."""
+        n = len(self.records)
+        k = max(0, min(int(k), n - 1))
+        if k == 0:
+            return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+        work = self.matrix.copy()
+        np.fill_diagonal(work, np.inf)
+        nearest = np.argpartition(work, k - 1, axis=1)[:, :k]
+        ranked = np.take_along_axis(work, nearest, axis=1)
+        order = np.lexsort((nearest, ranked), axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        return nearest, np.take_along_axis(work, nearest, axis=1)
+
+    def traverse(self, slugs: Sequence[str]) -> Dict[str, Any]:
+        """Straight-line legs along ``slugs`` in order (peaks without coordinates are skipped)."""
+        path = [slug for slug in slugs if slug in self.position]
+        legs = [round(float(self.matrix[self.position[a], self.position[b]]), 2) for a, b in zip(path, path[1:])]
+        return {"peaks": path, "legs_km": legs, "total_km": round(sum(legs), 2)}
+
+
+def peak_distances(source: Source) -> PeakDistances:
+    return PeakDistances.from_records(Path(str(source)).stem, list(load_peaks(source)))
+
+
+def planner_traverses(distances: PeakDistances, templates: Source = PLANNER_TEMPLATES) -> List[Dict[str, Any]]:
+    if not Path(str(templates)).exists():
+        return []
+    groups = load_dataset(templates).get("dayTripGroups") or []
+    return [
+        {"id": group.get("id"), "name": group.get("name"), **distances.traverse(group.get("peaks") or [])}
+        for group in groups
+        if isinstance(group, dict)
+    ]
+
+
+def neighbor_index(distances: PeakDistances, k: int = DEFAULT_NEIGHBORS) -> Dict[str, Any]:
+    nearest, km = distances.neighbors(k)
+    slugs = distances.slugs
+    return {
+        "list": distances.list_name,
+        "count": len(distances),
+        "k": int(nearest.shape[1]),
+        "slugs": slugs,
+        "names": [record.name for record in distances.records],
+        "missingCoordinates": distances.missing,
+        "matrix": {
+            "file": f"{distances.list_name}.f32",
+            "dtype": "float32",
+            "byteOrder": "little",
+            "layout": "condensed-upper",
+            "unit": "km",
+        },
+        "neighbors": {
+            slug: [[slugs[j], round(float(d), 2)] for j, d in zip(nearest[i], km[i])]
+            for i, slug in enumerate(slugs)
+        },
+    }
+
+
+def write_distances(distances: PeakDistances, output_dir: Path = DEFAULT_OUTPUT_DIR, k: int = DEFAULT_NEIGHBORS) -> Dict[str, Any]:
+    """Write ``<list>.f32`` and ``<list>.neighbors.json``; returns the neighbour index."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    condense(distances.matrix).tofile(output_dir / f"{distances.list_name}.f32")
+    index = neighbor_index(distances, k)
+    if distances.list_name == "nh48":
+        index["traverses"] = planner_traverses(distances)
+    (output_dir / f"{distances.list_name}.neighbors.json").write_text(
+        json.dumps(index, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8"
+    )
+    return index
+
+
+def read_matrix(output_dir: Path, list_name: str) -> Tuple[List[str], "np.ndarray"]:
+    """(slugs, square km matrix) as written by ``write_distances``."""
+    require_numpy()
+    index = load_dataset(output_dir / f"{list_name}.neighbors.json")
+    condensed = np.fromfile(output_dir / f"{list_name}.f32", dtype=MATRIX_DTYPE)
+    return list(index["slugs"]), expand(condensed, int(index["count"]))
@@ -0,0 +1,70 @@
+"""
+Cached JSON dataset loading shared by the Python build scripts.
+
+Local files are parsed once per process and re-read only when their mtime or
+size changes, so a combined build run that touches ``data/nh48.json`` from
+several scripts pays for one parse. URL sources are fetched once per process.
+The cached payload is shared: treat it as read-only, or pass
+``mutable=True`` to get a private deep copy to edit.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_DATASET = ROOT / "data" / "nh48.json"
+USER_AGENT = "nh48-data-loader/1 (https://nh48.info)"
+
+Source = Union[str, Path]
+
+# source key -> (stamp, payload); stamp is (mtime_ns, size) or None for URLs.
+_CACHE: Dict[str, Tuple[Any, Any]] = {}
+
+
+def is_url(source: Source) -> bool:
+    text = str(source)
+    return text.startswith("http://") or text.startswith("https://")
+
+
+def source_key(source: Source) -> str:
+    return str(source) if is_url(source) else str(Path(source).expanduser().resolve())
+
+
+def source_stamp(source: Source) -> Any:
+    """Cache validator for ``source``: (mtime_ns, size) for files, None for URLs."""
+    if is_url(source):
+        return None
+    stat = Path(source).expanduser().stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read(source: Source) -> Any:
+    if is_url(source):
+        request = urllib.request.Request(str(source), headers={"User-Agent": USER_AGENT})
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read().decode("utf-8"))
+    with Path(source).expanduser().open("r", encoding="utf-8-sig") as handle:
+        return json.load(handle)
+
+
+def load_dataset(source: Source = DEFAULT_DATASET, mutable: bool = False) -> Any:
+    """Parsed JSON for a path or URL, memoized per process (keyed by file mtime and size)."""
+    key = source_key(source)
+    try:
+        stamp = source_stamp(source)
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"Dataset not found: {source}") from exc
+    cached = _CACHE.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, _read(source))
+        _CACHE[key] = cached
+    return copy.deepcopy(cached[1]) if mutable else cached[1]
+
+
+def clear_cache() -> None:
+    _CACHE.clear()
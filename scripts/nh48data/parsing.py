@@ -0,0 +1,123 @@
+"""
+Numeric parsers for the free-text fields of the peak datasets.
+
+Elevations, route stats and times arrive as ints or as text ("4,698",
+"14.8", "6-8 hours", "~3 miles back to the trailhead"). The parsers here use
+precompiled patterns and memoize on the raw string, since the same strings
+repeat across peaks and list files. The ``parse_*_column`` helpers parse
+whole columns (e.g. every "Distance (mi)" of a list's Standard Routes) at once.
+
+  parse_number    first number in the text, thousands separators ignored
+  parse_float     the whole field as a number ("3,000" yes, "~16.0" no)
+  parse_hours     hours from "9.5 hours" (ranges like "6-8 hours" average)
+  parse_max_miles largest "<n> mile(s)" figure in a sentence
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+MEMO_SIZE = 8192
+
+ROUTE_NUMBER_FIELDS: Dict[str, str] = {
+    "distance_mi": "Distance (mi)",
+    "gain_ft": "Elevation Gain (ft)",
+}
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_UNSIGNED_RE = re.compile(r"\d+(?:\.\d+)?")
+_MILES_RE = re.compile(r"(~?\s*\d+(?:\.\d+)?)\s*miles?")
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _number_from_text(text: str) -> Optional[float]:
+    match = _NUMBER_RE.search(text.replace(",", ""))
+    return float(match.group(0)) if match else None
+
+
+def parse_number(value: Any) -> Optional[float]:
+    """First number in a field such as 5344, "3,000", "14.8" or "9.5 hours"; None when absent."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if value is None:
+        return None
+    return _number_from_text(str(value))
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _float_from_text(text: str) -> Optional[float]:
+    try:
+        return float(text.replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def parse_float(value: Any) -> Optional[float]:
+    """Strict cast of a field such as 5344 or "3,000"; None for annotated text like "~16.0" or "0.7 - spur"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if value is None:
+        return None
+    return _float_from_text(str(value))
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _hours_from_text(text: str) -> Optional[float]:
+    values = [float(n) for n in _UNSIGNED_RE.findall(text)]
+    if not values:
+        return None
+    if len(values) >= 2:
+        return round((values[0] + values[1]) / 2.0, 1)
+    return round(values[0], 1)
+
+
+def parse_hours(value: Any) -> Optional[float]:
+    """Hours from "Typical Completion Time" text; the first two numbers of a range are averaged."""
+    text = "" if value is None else str(value)
+    return _hours_from_text(text) if text else None
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def _max_miles_from_text(text: str) -> Optional[float]:
+    values: List[float] = []
+    for match in _MILES_RE.findall(text.lower()):
+        try:
+            values.append(float(match.replace("~", "").strip()))
+        except ValueError:
+            continue
+    return max(values) if values else None
+
+
+def parse_max_miles(value: Any) -> Optional[float]:
+    """Largest "<n> mile(s)" distance mentioned in free text (e.g. bailout notes)."""
+    text = "" if value is None else str(value)
+    return _max_miles_from_text(text) if text else None
+
+
+def parse_column(values: Iterable[Any], parser: Callable[[Any], Optional[float]] = parse_number) -> List[Optional[float]]:
+    """``parser`` over a whole column; repeated strings are parsed once."""
+    seen: Dict[Any, Optional[float]] = {}
+    out: List[Optional[float]] = []
+    for value in values:
+        key = (type(value), value) if isinstance(value, (str, int, float)) else None
+        if key is None:
+            out.append(parser(value))
+            continue
+        if key not in seen:
+            seen[key] = parser(value)
+        out.append(seen[key])
+    return out
+
+
+def parse_route_columns(
+    routes: Sequence[Mapping[str, Any]], fields: Mapping[str, str] = ROUTE_NUMBER_FIELDS
+) -> Dict[str, List[Optional[float]]]:
+    """Numeric columns (distance_mi, gain_ft, ...) for a sequence of Standard Routes entries."""
+    return {name: parse_column(route.get(field) for route in routes) for name, field in fields.items()}
+
+
+def clear_memo() -> None:
+    for memoized in (_number_from_text, _float_from_text, _hours_from_text, _max_miles_from_text):
+        memoized.cache_clear()
@@ -0,0 +1,189 @@
+"""
+Typed peak records and precomputed lookup indexes over a peak dataset.
+
+Peak datasets (``data/nh48.json`` and the other list files) are objects
+keyed by slug whose entries spell the same facts several ways ("peakName" /
+"Peak Name", "Coordinates" as "lat, lon" text, ...). ``PeakRecord`` resolves
+those once; ``PeakIndex`` builds the slug, name and alias maps up front so
+lookups are dictionary hits instead of a scan per query.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .loader import DEFAULT_DATASET, Source, load_dataset, source_key
+from .parsing import parse_number
+
+NAME_FIELDS = ("peakName", "Peak Name", "peak_name", "name", "title")
+SLUG_FIELDS = ("slug", "slug_en", "Slug")
+GENERIC_NAME_WORDS = frozenset({"mount", "mt", "mountain", "peak"})
+
+_WS_RE = re.compile(r"\s+")
+_SLUG_RE = re.compile(r"[^a-z0-9-]+")
+_DASHES_RE = re.compile(r"-{2,}")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(value: Any) -> str:
+    """Collapse whitespace and drop a trailing period ("Mount Hancock - North Peak.")."""
+    return _WS_RE.sub(" ", "" if value is None else str(value)).strip().rstrip(".")
+
+
+def name_key(value: Any) -> str:
+    """Case-insensitive exact-match key for a peak name or slug."""
+    return normalize_name(value).lower()
+
+
+def alias_key(value: Any) -> str:
+    """Loose key: lowercase word tokens without apostrophes or generic words (mount, mountain, ...)."""
+    tokens = _TOKEN_RE.findall(normalize_name(value).lower().replace("'", "").replace("’", ""))
+    return " ".join(token for token in tokens if token not in GENERIC_NAME_WORDS)
+
+
+def normalize_slug(value: Any) -> str:
+    text = _SLUG_RE.sub("-", ("" if value is None else str(value)).strip().lower())
+    return _DASHES_RE.sub("-", text).strip("-")
+
+
+def parse_coordinates(text: Any) -> Tuple[Optional[float], Optional[float]]:
+    """(lat, lon) from "lat, lon" text, or (None, None)."""
+    if not text:
+        return None, None
+    parts = [part.strip() for part in str(text).split(",")]
+    if len(parts) != 2:
+        return None, None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None, None
+
+
+@dataclass(frozen=True)
+class PeakRecord:
+    """One dataset entry with its commonly used fields resolved; ``raw`` is the untouched entry."""
+
+    key: str
+    slug: str
+    name: str
+    elevation_ft: Optional[float]
+    prominence_ft: Optional[float]
+    range_raw: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    raw: Dict[str, Any] = field(repr=False, compare=False)
+
+    @classmethod
+    def from_entry(cls, key: str, entry: Dict[str, Any]) -> "PeakRecord":
+        slug = next((entry[name] for name in SLUG_FIELDS if entry.get(name)), None) or key
+        name = next((entry[name] for name in NAME_FIELDS if entry.get(name)), None) or slug
+        latitude, longitude = parse_coordinates(entry.get("Coordinates"))
+        if latitude is None:
+            latitude, longitude = parse_number(entry.get("latitude")), parse_number(entry.get("longitude"))
+        return cls(
+            key=str(key),
+            slug=str(slug),
+            name=str(name),
+            elevation_ft=parse_number(entry.get("Elevation (ft)")),
+            prominence_ft=parse_number(entry.get("Prominence (ft)")),
+            range_raw="" if entry.get("Range / Subrange") is None else str(entry.get("Range / Subrange")),
+            latitude=latitude,
+            longitude=longitude,
+            raw=entry,
+        )
+
+    @property
+    def coordinates(self) -> Optional[Tuple[float, float]]:
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    def get(self, *fields: str, default: Any = None) -> Any:
+        """First non-empty value among ``fields`` in the raw entry."""
+        for name in fields:
+            value = self.raw.get(name)
+            if value not in (None, ""):
+                return value
+        return default
+
+
+class PeakIndex:
+    """Records of one dataset in file order with slug, name and alias lookups."""
+
+    def __init__(self, records: List[PeakRecord]) -> None:
+        self.records = records
+        self.by_key: Dict[str, PeakRecord] = {}
+        self.by_slug: Dict[str, PeakRecord] = {}
+        self.by_name: Dict[str, PeakRecord] = {}
+        self.by_alias: Dict[str, PeakRecord] = {}
+        for record in records:
+            self.by_key.setdefault(record.key, record)
+            self.by_slug.setdefault(normalize_slug(record.slug), record)
+            for value in (record.name, record.slug, record.key):
+                self.by_name.setdefault(name_key(value), record)
+                alias = alias_key(value.replace("-", " "))
+                if alias:
+                    self.by_alias.setdefault(alias, record)
+        # Name keys in first-seen order for the substring fallback.
+        self._search_keys = list(self.by_name.items())
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "PeakIndex":
+        records: List[PeakRecord] = []
+        if isinstance(payload, dict):
+            items = payload.items()
+        elif isinstance(payload, list):
+            items = ((str(index), entry) for index, entry in enumerate(payload))
+        else:
+            raise RuntimeError("Peak dataset must be a JSON object keyed by slug or a list of peaks.")
+        for key, entry in items:
+            if isinstance(entry, dict):
+                records.append(PeakRecord.from_entry(key, entry))
+        return cls(records)
+
+    def __iter__(self) -> Iterator[PeakRecord]:
+        return iter(self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, slug: str) -> Optional[PeakRecord]:
+        return self.by_key.get(slug) or self.by_slug.get(normalize_slug(slug))
+
+    def find(self, *names: str, fuzzy: bool = True) -> Optional[PeakRecord]:
+        """
+        Resolve the first matching name: exact slug/name for every candidate,
+        then their alias keys, then (``fuzzy``) the first indexed name that
+        contains the first candidate.
+        """
+        for name in names:
+            record = self.by_name.get(name_key(name)) or self.by_slug.get(normalize_slug(name))
+            if record is not None:
+                return record
+        for name in names:
+            record = self.by_alias.get(alias_key(name))
+            if record is not None:
+                return record
+        if fuzzy and names:
+            needle = name_key(names[0])
+            for key, record in self._search_keys:
+                if needle and needle in key:
+                    return record
+        return None
+
+
+# source key -> (payload, index); reused while the loader returns the same payload object.
+_INDEXES: Dict[str, Tuple[Any, PeakIndex]] = {}
+
+
+def load_peaks(source: Source = DEFAULT_DATASET) -> PeakIndex:
+    """Indexed records for a peak dataset, rebuilt only when the file changes."""
+    key = source_key(source)
+    payload = load_dataset(source)
+    cached = _INDEXES.get(key)
+    if cached is None or cached[0] is not payload:
+        cached = (payload, PeakIndex.from_payload(payload))
+        _INDEXES[key] = cached
+    return cached[1]
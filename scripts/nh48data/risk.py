@@ -0,0 +1,219 @@
+"""
+Declarative risk-chip rules compiled into per-field matchers.
+
+Each ``RiskRule`` fires when any of its (field, needles) conditions finds a
+needle as a case-insensitive substring of the field's text, and records the
+listed fields as trigger evidence. Derived rules (Navigation) fire from other
+factors. ``RiskEngine`` compiles every condition into one alternation regex,
+lowercases each field once, and memoizes per field value and per peak
+signature, so evaluating thousands of peaks across all list datasets mostly
+reduces to dictionary hits:
+
+    from nh48data.risk import OVERLAY_RISK_ENGINE
+
+    factors, triggers = OVERLAY_RISK_ENGINE.evaluate(peak)
+    results = OVERLAY_RISK_ENGINE.evaluate_many(entries)
+
+The enriched overlay and the risk schema generator share ``RISK_RULES``; the
+schema variant keeps its historical differences (field fallbacks,
+"hurricane-force", "no" as a cell needle) via ``SCHEMA_RISK_ENGINE``.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+RISK_FACTOR_ENUM = [
+    "AboveTreelineExposure",
+    "SevereWeather",
+    "LongBailout",
+    "LimitedWater",
+    "Navigation",
+    "ScrambleSteep",
+    "UnbridgedRiverCrossings",
+    "NoCellService",
+]
+
+EXPOSURE = "Exposure Level"
+WEATHER = "Weather Exposure Rating"
+WATER = "Water Availability"
+CELL = "Cell Reception Quality"
+BAILOUT = "Emergency Bailout Options"
+SCRAMBLE = "Scramble Sections"
+TERRAIN = "Terrain Character"
+
+# Extra keys the schema generator falls back to, in order, when a field is empty.
+SCHEMA_FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    EXPOSURE: (EXPOSURE, "Exposure", "exposure"),
+    WEATHER: (WEATHER, "Weather", "weather_exposure"),
+    WATER: (WATER, "Water Availability (notes)", "water"),
+    CELL: (CELL, "Cell Reception", "cell"),
+    BAILOUT: (BAILOUT, "Emergency Bailout", "bailout"),
+    SCRAMBLE: (SCRAMBLE, "Scramble", "scramble"),
+    TERRAIN: (TERRAIN, "Terrain", "terrain"),
+}
+
+Trigger = Dict[str, Any]
+
+SIGNATURE_CACHE_SIZE = 65536
+
+
+@dataclass(frozen=True)
+class RiskRule:
+    """``factor`` fires if any (field, needles) condition matches; ``evidence`` fields become triggers."""
+
+    factor: str
+    conditions: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    evidence: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class DerivedRule:
+    """``factor`` fires if every factor of any group in ``requires`` fired."""
+
+    factor: str
+    requires: Tuple[Tuple[str, ...], ...]
+    note: str
+
+
+RISK_RULES: Tuple[RiskRule, ...] = (
+    RiskRule(
+        "AboveTreelineExposure",
+        ((EXPOSURE, ("high", "very high")), (TERRAIN, ("above treeline", "alpine", "fully exposed"))),
+        (EXPOSURE, TERRAIN),
+    ),
+    RiskRule("SevereWeather", ((WEATHER, ("high", "very high", "hurricane", "dangerous")),), (WEATHER,)),
+    RiskRule("LongBailout", ((BAILOUT, ("none", "no short", "must retreat", "long", "miles")),), (BAILOUT,)),
+    RiskRule("LimitedWater", ((WATER, ("limited", "none", "carry", "no reliable", "filter")),), (WATER,)),
+    RiskRule("NoCellService", ((CELL, ("none", "poor", "spotty", "limited")),), (CELL,)),
+    RiskRule(
+        "ScrambleSteep",
+        ((SCRAMBLE, ("scramble", "chimney", "ladder", "slide", "steep")), (TERRAIN, ("slide", "ledg", "scrambl"))),
+        (SCRAMBLE, TERRAIN),
+    ),
+    RiskRule(
+        "UnbridgedRiverCrossings",
+        (
+            (TERRAIN, ("stream crossing", "river crossing", "ford", "wade")),
+            (WATER, ("brook crossing", "stream crossing", "ford")),
+        ),
+        (TERRAIN,),
+    ),
+)
+
+DERIVED_RULES: Tuple[DerivedRule, ...] = (
+    DerivedRule(
+        "Navigation",
+        (("AboveTreelineExposure",), ("NoCellService", "LongBailout")),
+        "Navigation added due to AboveTreelineExposure or (NoCellService+LongBailout)",
+    ),
+)
+
+
+def override_conditions(
+    rules: Sequence[RiskRule], overrides: Mapping[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]
+) -> Tuple[RiskRule, ...]:
+    return tuple(replace(rule, conditions=overrides[rule.factor]) if rule.factor in overrides else rule for rule in rules)
+
+
+SCHEMA_RISK_RULES = override_conditions(
+    RISK_RULES,
+    {
+        "SevereWeather": ((WEATHER, ("high", "very high", "hurricane-force", "dangerous")),),
+        "NoCellService": ((CELL, ("none", "no", "poor", "spotty", "limited")),),
+    },
+)
+
+
+class RiskEngine:
+    """Compiled rule table; ``evaluate`` returns (factors in RISK_FACTOR_ENUM order, triggers)."""
+
+    def __init__(
+        self,
+        rules: Sequence[RiskRule] = RISK_RULES,
+        derived: Sequence[DerivedRule] = DERIVED_RULES,
+        field_aliases: Optional[Mapping[str, Tuple[str, ...]]] = None,
+        order: Sequence[str] = RISK_FACTOR_ENUM,
+    ) -> None:
+        self.rules = tuple(rules)
+        self.derived = tuple(derived)
+        self.order = list(order)
+        self.fields = tuple(dict.fromkeys(
+            [field for rule in self.rules for field, _ in rule.conditions]
+            + [field for rule in self.rules for field in rule.evidence]
+        ))
+        self.field_aliases = {field: tuple((field_aliases or {}).get(field, (field,))) for field in self.fields}
+        # field -> [(condition bit, compiled alternation of lowercased needles)]
+        self._matchers: Dict[str, List[Tuple[int, "re.Pattern[str]"]]] = {field: [] for field in self.fields}
+        # rule index -> bitmask of its conditions
+        self._rule_bits: List[int] = []
+        bit = 0
+        for rule in self.rules:
+            mask = 0
+            for field, needles in rule.conditions:
+                pattern = re.compile("|".join(re.escape(needle.lower()) for needle in needles))
+                self._matchers[field].append((1 << bit, pattern))
+                mask |= 1 << bit
+                bit += 1
+            self._rule_bits.append(mask)
+        self._field_bits = lru_cache(maxsize=4096)(self._match_field)
+        self._signatures: Dict[Tuple[str, ...], Tuple[List[str], List[Trigger]]] = {}
+
+    def _match_field(self, field: str, value: str) -> int:
+        text = value.lower()
+        bits = 0
+        for condition_bit, pattern in self._matchers[field]:
+            if pattern.search(text):
+                bits |= condition_bit
+        return bits
+
+    def field_values(self, peak: Mapping[str, Any]) -> Tuple[str, ...]:
+        """The text of every rule field, taking the first non-empty alias."""
+        values: List[str] = []
+        for field in self.fields:
+            first, *fallbacks = self.field_aliases[field]
+            value = peak.get(first)
+            for key in fallbacks:
+                value = value or peak.get(key)
+            values.append("" if value is None else str(value))
+        return tuple(values)
+
+    def _evaluate_values(self, values: Tuple[str, ...]) -> Tuple[List[str], List[Trigger]]:
+        bits = 0
+        for field, value in zip(self.fields, values):
+            if self._matchers[field]:
+                bits |= self._field_bits(field, value)
+        by_field = dict(zip(self.fields, values))
+        fired: List[str] = []
+        triggers: List[Trigger] = []
+        for rule, mask in zip(self.rules, self._rule_bits):
+            if bits & mask:
+                fired.append(rule.factor)
+                triggers.extend({"field": field, "value": by_field[field]} for field in rule.evidence)
+        for rule in self.derived:
+            if any(all(factor in fired for factor in group) for group in rule.requires):
+                fired.append(rule.factor)
+                triggers.append({"field": "Derived", "value": rule.note})
+        return [factor for factor in self.order if factor in fired], triggers
+
+    def evaluate(self, peak: Mapping[str, Any]) -> Tuple[List[str], List[Trigger]]:
+        values = self.field_values(peak)
+        cached = self._signatures.get(values)
+        if cached is None:
+            if len(self._signatures) >= SIGNATURE_CACHE_SIZE:
+                self._signatures.clear()
+            cached = self._evaluate_values(values)
+            self._signatures[values] = cached
+        # Fresh containers: callers may mutate what they get back.
+        return list(cached[0]), [dict(trigger) for trigger in cached[1]]
+
+    def evaluate_many(self, peaks: Iterable[Mapping[str, Any]]) -> List[Tuple[List[str], List[Trigger]]]:
+        """``evaluate`` over many peaks; peaks with identical rule fields are evaluated once."""
+        return [self.evaluate(peak) for peak in peaks]
+
+
+OVERLAY_RISK_ENGINE = RiskEngine(RISK_RULES)
+SCHEMA_RISK_ENGINE = RiskEngine(SCHEMA_RISK_RULES, field_aliases=SCHEMA_FIELD_ALIASES)
@@ -0,0 +1,304 @@
+"""
+Columnar binary snapshot of the peak list datasets.
+
+The list files (``data/ADK46.json`` ... ``data/nh48.json``) are pretty-printed
+JSON whose numbers are partly stored as text ("Elevation (ft)": "4,698",
+route "Distance (mi)": "14.8"). ``build_snapshot`` parses and cleans them once
+into an uncompressed ``.npz`` of plain NumPy columns:
+
+  peaks.*   one row per (list, peak): list id, key/slug/name/range/state string
+            ids, elevation_ft, prominence_ft, latitude, longitude,
+            completion_hours, and the row's slice of the routes table
+  routes.*  one row per standard route: peak row, name/difficulty/trail type
+            string ids, distance_mi, gain_ft
+  strings.* every distinct string once, as a UTF-8 blob plus offsets
+  meta      JSON (format version, list names, source sha256s)
+
+Missing numbers are NaN and missing strings are string id 0 (""). Because
+the archive members are stored uncompressed, ``open_snapshot`` memory-maps
+every column in place instead of reading it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from .loader import ROOT, Source, load_dataset
+from .parsing import parse_number, parse_route_columns
+from .peaks import PeakIndex
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when a snapshot is built or opened
+    np = None
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT = ROOT / "data" / "peak-lists.npz"
+LIST_DATASETS = (
+    "nh48.json",
+    "NE67.json",
+    "NE115.json",
+    "NH52WAV.json",
+    "NH200.json",
+    "NH300.json",
+    "NH500.json",
+    "ME4000.json",
+    "VT4000.json",
+    "ADK46.json",
+    "Catskill3500.json",
+    "SouthernSixers.json",
+    "CO14.json",
+    "ColoradoCentennials.json",
+    "CA14ers.json",
+    "WABulgers.json",
+    "Montana53.json",
+    "AZ2020Peaks.json",
+    "USStateHighpoints.json",
+    "Ultras.json",
+)
+
+PEAK_STRING_COLUMNS = ("key", "slug", "name", "range", "state")
+PEAK_NUMBER_COLUMNS = ("elevation_ft", "prominence_ft", "latitude", "longitude", "completion_hours")
+ROUTE_STRING_COLUMNS = ("name", "difficulty", "trail_type")
+ROUTE_NUMBER_COLUMNS = ("distance_mi", "gain_ft")
+
+_LOCAL_HEADER = struct.Struct("<4s5HL2L2H")
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for peak list snapshots. Install with `python -m pip install numpy`.")
+
+
+def default_sources(data_dir: Path = ROOT / "data") -> List[Path]:
+    return [data_dir / name for name in LIST_DATASETS]
+
+
+def list_name(source: Source) -> str:
+    """List id used in the snapshot: the file stem ("ADK46", "nh48")."""
+    return Path(str(source)).stem
+
+
+def source_digests(sources: Iterable[Source]) -> Dict[str, str]:
+    return {list_name(source): hashlib.sha256(Path(source).read_bytes()).hexdigest() for source in sources}
+
+
+class _StringPool:
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {"": 0}
+        self.values: List[str] = [""]
+
+    def add(self, value: Any) -> int:
+        text = "" if value is None else str(value).strip()
+        index = self.ids.get(text)
+        if index is None:
+            index = len(self.values)
+            self.ids[text] = index
+            self.values.append(text)
+        return index
+
+    def arrays(self) -> Dict[str, "np.ndarray"]:
+        encoded = [value.encode("utf-8") for value in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        return {
+            "strings.data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "strings.offsets": offsets,
+        }
+
+
+def snapshot_columns(sources: Sequence[Source]) -> Dict[str, "np.ndarray"]:
+    """Parse ``sources`` into the snapshot's column arrays (without ``meta``)."""
+    require_numpy()
+    pool = _StringPool()
+    peaks: Dict[str, List[Any]] = {name: [] for name in ("list", "route_start", "route_count")}
+    peaks.update({name: [] for name in PEAK_STRING_COLUMNS + PEAK_NUMBER_COLUMNS})
+    routes: Dict[str, List[Any]] = {"peak": []}
+    routes.update({name: [] for name in ROUTE_STRING_COLUMNS + ROUTE_NUMBER_COLUMNS})
+
+    for list_id, source in enumerate(sources):
+        for record in PeakIndex.from_payload(load_dataset(source)):
+            row = len(peaks["list"])
+            peaks["list"].append(list_id)
+            peaks["key"].append(pool.add(record.key))
+            peaks["slug"].append(pool.add(record.slug))
+            peaks["name"].append(pool.add(record.name))
+            peaks["range"].append(pool.add(record.range_raw))
+            peaks["state"].append(pool.add(record.get("State", "state")))
+            peaks["elevation_ft"].append(record.elevation_ft)
+            peaks["prominence_ft"].append(record.prominence_ft)
+            peaks["latitude"].append(record.latitude)
+            peaks["longitude"].append(record.longitude)
+            peaks["completion_hours"].append(parse_number(record.get("Typical Completion Time")))
+            peaks["route_start"].append(len(routes["peak"]))
+            standard_routes = [item for item in record.get("Standard Routes", default=[]) if isinstance(item, dict)]
+            peaks["route_count"].append(len(standard_routes))
+            for route in standard_routes:
+                routes["peak"].append(row)
+                routes["name"].append(pool.add(route.get("Route Name")))
+                routes["difficulty"].append(pool.add(route.get("Difficulty")))
+                routes["trail_type"].append(pool.add(route.get("Trail Type")))
+            for name, values in parse_route_columns(standard_routes).items():
+                routes[name].extend(values)
+
+    def numbers(values: List[Optional[float]]) -> "np.ndarray":
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    columns: Dict[str, "np.ndarray"] = {
+        "peaks.list": np.array(peaks["list"], dtype=np.int16),
+        "peaks.route_start": np.array(peaks["route_start"], dtype=np.int32),
+        "peaks.route_count": np.array(peaks["route_count"], dtype=np.int16),
+        "routes.peak": np.array(routes["peak"], dtype=np.int32),
+    }
+    for name in PEAK_STRING_COLUMNS:
+        columns[f"peaks.{name}"] = np.array(peaks[name], dtype=np.int32)
+    for name in PEAK_NUMBER_COLUMNS:
+        columns[f"peaks.{name}"] = numbers(peaks[name])
+    for name in ROUTE_STRING_COLUMNS:
+        columns[f"routes.{name}"] = np.array(routes[name], dtype=np.int32)
+    for name in ROUTE_NUMBER_COLUMNS:
+        columns[f"routes.{name}"] = numbers(routes[name])
+    columns.update(pool.arrays())
+    return columns
+
+
+def build_snapshot(output: Path = DEFAULT_SNAPSHOT, sources: Optional[Sequence[Source]] = None) -> Dict[str, Any]:
+    """Write the snapshot for ``sources`` (default: all list datasets) and return its meta."""
+    require_numpy()
+    sources = list(sources) if sources is not None else default_sources()
+    missing = [str(source) for source in sources if not Path(source).exists()]
+    if missing:
+        raise RuntimeError(f"List dataset(s) not found: {', '.join(missing)}")
+    columns = snapshot_columns(sources)
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "lists": [list_name(source) for source in sources],
+        "sources": source_digests(sources),
+        "peak_count": int(columns["peaks.list"].size),
+        "route_count": int(columns["routes.peak"].size),
+        "string_count": int(columns["strings.offsets"].size - 1),
+    }
+    columns["meta"] = np.frombuffer(json.dumps(meta, sort_keys=True).encode("utf-8"), dtype=np.uint8)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + ".part")
+    with partial.open("wb") as handle:
+        # Uncompressed on purpose: stored members can be memory-mapped in place.
+        np.savez(handle, **columns)
+    partial.replace(output)
+    return meta
+
+
+def _member_array(handle, path: Path, info: zipfile.ZipInfo) -> "np.ndarray":
+    handle.seek(info.header_offset)
+    fields = _LOCAL_HEADER.unpack(handle.read(_LOCAL_HEADER.size))
+    handle.seek(info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1])
+    version = np.lib.format.read_magic(handle)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(handle)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(handle)
+    if not shape or 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    order = "F" if fortran_order else "C"
+    return np.memmap(path, dtype=dtype, mode="r", offset=handle.tell(), shape=shape, order=order)
+
+
+def _read_columns(path: Path) -> Dict[str, "np.ndarray"]:
+    columns: Dict[str, "np.ndarray"] = {}
+    with zipfile.ZipFile(path) as archive, path.open("rb") as handle:
+        for info in archive.infolist():
+            if not info.filename.endswith(".npy"):
+                continue
+            name = info.filename[: -len(".npy")]
+            if info.compress_type == zipfile.ZIP_STORED:
+                columns[name] = _member_array(handle, path, info)
+            else:
+                with archive.open(info) as member:
+                    columns[name] = np.lib.format.read_array(member, allow_pickle=False)
+    return columns
+
+
+class StringTable:
+    """Read-only view of the snapshot string pool; ids index into it."""
+
+    def __init__(self, data: "np.ndarray", offsets: "np.ndarray") -> None:
+        self.data = data
+        self.offsets = offsets
+        self._ids: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return int(self.offsets.size - 1)
+
+    def __getitem__(self, index: int) -> str:
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return bytes(self.data[start:end]).decode("utf-8")
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self[int(index)] for index in ids]
+
+    def id(self, text: str) -> Optional[int]:
+        """String id for ``text`` (exact match), or None if it never occurs."""
+        if self._ids is None:
+            self._ids = {self[index]: index for index in range(len(self))}
+        return self._ids.get(text)
+
+
+class PeakListSnapshot:
+    """Columns of an opened snapshot; ``peaks``/``routes`` map column name -> array."""
+
+    def __init__(self, path: Path, columns: Dict[str, "np.ndarray"]) -> None:
+        self.path = path
+        self.meta: Dict[str, Any] = json.loads(bytes(columns.pop("meta")).decode("utf-8"))
+        if self.meta.get("version") != SNAPSHOT_VERSION:
+            raise RuntimeError(
+                f"Unsupported peak list snapshot version {self.meta.get('version')} in {path}; rebuild it."
+            )
+        self.strings = StringTable(columns.pop("strings.data"), columns.pop("strings.offsets"))
+        self.peaks = {name.split(".", 1)[1]: array for name, array in columns.items() if name.startswith("peaks.")}
+        self.routes = {name.split(".", 1)[1]: array for name, array in columns.items() if name.startswith("routes.")}
+
+    @property
+    def lists(self) -> List[str]:
+        return list(self.meta["lists"])
+
+    def __len__(self) -> int:
+        return int(self.peaks["list"].size)
+
+    def list_mask(self, name: str) -> "np.ndarray":
+        """Boolean mask over peak rows belonging to list ``name`` ("ADK46", "nh48", ...)."""
+        try:
+            list_id = self.meta["lists"].index(name)
+        except ValueError as exc:
+            raise RuntimeError(f"Unknown peak list {name!r}; snapshot has {', '.join(self.meta['lists'])}.") from exc
+        return self.peaks["list"] == list_id
+
+    def text(self, column: str, rows: Any = None, table: str = "peaks") -> List[str]:
+        """Decoded strings of a string column, optionally for selected rows (mask or indices)."""
+        ids = (self.peaks if table == "peaks" else self.routes)[column]
+        return self.strings.decode(ids if rows is None else ids[rows])
+
+    def route_rows(self, row: int) -> slice:
+        """Slice of the routes table holding the standard routes of peak row ``row``."""
+        start = int(self.peaks["route_start"][row])
+        return slice(start, start + int(self.peaks["route_count"][row]))
+
+    def is_current(self, sources: Optional[Sequence[Source]] = None) -> bool:
+        """True when the snapshot was built from exactly these source files as they are now."""
+        sources = list(sources) if sources is not None else default_sources()
+        if not all(Path(source).exists() for source in sources):
+            return False
+        return self.meta.get("sources") == source_digests(sources)
+
+
+def open_snapshot(path: Path = DEFAULT_SNAPSHOT) -> PeakListSnapshot:
+    """Memory-map a snapshot written by :func:`build_snapshot`."""
+    require_numpy()
+    path = Path(path)
+    if not path.exists():
+        raise RuntimeError(f"Peak list snapshot not found: {path}. Build it with scripts/build-peak-list-snapshot.py.")
+    return PeakListSnapshot(path, _read_columns(path))
@@ -0,0 +1,288 @@
+"""
+Grid-bucketed spatial index over peaks, trailhead parking and POIs.
+
+Points from the peak lists ("Coordinates" text), ``data/parking-data.json``
+(parkingLat/parkingLng) and GeoJSON Point files are parsed once into
+latitude/longitude arrays and bucketed into fixed-size lat/lon cells, stored
+CSR-style (points sorted by cell, one start/end pair per occupied cell).
+Radius queries scan only the cells overlapping the query's bounding box;
+k-nearest queries widen the radius until k points fall inside it. Distances
+are great-circle (haversine) kilometres computed over NumPy arrays.
+
+    from nh48data.spatial import load_spatial_index
+
+    index = load_spatial_index()
+    index.nearest(44.2706, -71.3033, k=3, kinds=("parking",))
+    index.within(44.2706, -71.3033, radius_km=5)
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .loader import ROOT, Source, load_dataset
+from .peaks import PeakIndex, normalize_name
+from .snapshot import LIST_DATASETS
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when an index is built
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+DEFAULT_CELL_DEG = 0.05
+# Below this many points one vectorized pass over all of them beats walking cells.
+BRUTE_FORCE_POINTS = 2048
+PARKING_DATASET = ROOT / "data" / "parking-data.json"
+POI_DATASETS = (ROOT / "data" / "howker-ridge-pois.geojson",)
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for the spatial index. Install with `python -m pip install numpy`.")
+
+
+def haversine_km(lat1: Any, lon1: Any, lat2: Any, lon2: Any) -> Any:
+    """Great-circle distance in km; arguments broadcast as NumPy arrays (degrees)."""
+    require_numpy()
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    x = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(x, 0.0, 1.0)))
+
+
+@dataclass(frozen=True)
+class SpatialPoint:
+    """One indexed location; ``sources`` lists every dataset it was found in."""
+
+    id: str
+    kind: str
+    name: str
+    latitude: float
+    longitude: float
+    sources: Tuple[str, ...]
+
+
+def peak_points(source: Source) -> List[SpatialPoint]:
+    list_name = Path(str(source)).stem
+    return [
+        SpatialPoint(record.slug, "peak", normalize_name(record.name), record.latitude, record.longitude, (list_name,))
+        for record in PeakIndex.from_payload(load_dataset(source))
+        if record.coordinates is not None
+    ]
+
+
+def parking_points(source: Source = PARKING_DATASET) -> List[SpatialPoint]:
+    points: List[SpatialPoint] = []
+    for entry in load_dataset(source):
+        if not isinstance(entry, dict) or entry.get("parkingLat") is None or entry.get("parkingLng") is None:
+            continue
+        points.append(
+            SpatialPoint(
+                f"parking:{entry.get('slug')}",
+                "parking",
+                normalize_name(entry.get("trailheadName") or entry.get("slug")),
+                float(entry["parkingLat"]),
+                float(entry["parkingLng"]),
+                (Path(str(source)).stem,),
+            )
+        )
+    return points
+
+
+def geojson_points(source: Source, kind: str = "poi") -> List[SpatialPoint]:
+    """Point features of a GeoJSON FeatureCollection (other geometry types are skipped)."""
+    name = Path(str(source)).stem
+    points: List[SpatialPoint] = []
+    for position, feature in enumerate(load_dataset(source).get("features") or []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            continue
+        lon, lat = geometry["coordinates"][:2]
+        label = normalize_name((feature.get("properties") or {}).get("name")) or f"{name}-{position}"
+        points.append(SpatialPoint(f"{name}:{label}", kind, label, float(lat), float(lon), (name,)))
+    return points
+
+
+def merge_duplicates(points: Iterable[SpatialPoint]) -> List[SpatialPoint]:
+    """Fold the same peak listed by several datasets (same id, ~100 m apart) into one point."""
+    merged: Dict[Tuple[str, str, float, float], SpatialPoint] = {}
+    for point in points:
+        key = (point.kind, point.id, round(point.latitude, 3), round(point.longitude, 3))
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = point
+        elif not set(point.sources) <= set(existing.sources):
+            merged[key] = SpatialPoint(
+                existing.id,
+                existing.kind,
+                existing.name,
+                existing.latitude,
+                existing.longitude,
+                existing.sources + tuple(source for source in point.sources if source not in existing.sources),
+            )
+    return list(merged.values())
+
+
+def default_sources(data_dir: Path = ROOT / "data") -> List[Tuple[str, Path]]:
+    """(kind, path) for every peak list, trailhead parking and POI GeoJSON file present."""
+    sources = [("peak", data_dir / name) for name in LIST_DATASETS]
+    sources.append(("parking", data_dir / PARKING_DATASET.name))
+    sources.extend(("poi", data_dir / path.name) for path in POI_DATASETS)
+    return [(kind, path) for kind, path in sources if path.exists()]
+
+
+def load_points(sources: Sequence[Tuple[str, Source]]) -> List[SpatialPoint]:
+    points: List[SpatialPoint] = []
+    for kind, source in sources:
+        if kind == "peak":
+            points.extend(peak_points(source))
+        elif kind == "parking":
+            points.extend(parking_points(source))
+        else:
+            points.extend(geojson_points(source, kind))
+    return merge_duplicates(points)
+
+
+class SpatialIndex:
+    """Lat/lon cell grid over ``points`` answering radius and k-nearest queries."""
+
+    def __init__(self, points: Sequence[SpatialPoint], cell_deg: float = DEFAULT_CELL_DEG) -> None:
+        require_numpy()
+        if cell_deg <= 0:
+            raise RuntimeError("cell_deg must be positive.")
+        self.points = list(points)
+        self.cell_deg = float(cell_deg)
+        self.latitudes = np.array([point.latitude for point in self.points], dtype=np.float64)
+        self.longitudes = np.array([point.longitude for point in self.points], dtype=np.float64)
+        self.kind_names = sorted({point.kind for point in self.points})
+        kind_codes = {kind: code for code, kind in enumerate(self.kind_names)}
+        self.kinds = np.array([kind_codes[point.kind] for point in self.points], dtype=np.int16)
+        self.columns = int(math.ceil(360.0 / self.cell_deg))
+        rows, cols = self._cells(self.latitudes, self.longitudes)
+        keys = rows * self.columns + cols
+        self.order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[self.order]
+        unique, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self._cell_ranges: Dict[int, Tuple[int, int]] = {
+            int(key): (int(start), int(start + count)) for key, start, count in zip(unique, starts, counts)
+        }
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cells(self, lat: Any, lon: Any) -> Tuple[Any, Any]:
+        """Grid cell of each point; longitudes are normalised to [-180, 180) first.
+
+        When ``cell_deg`` does not divide 360 the last column is narrower, so
+        columns never wrap: the antimeridian is always a column boundary.
+        """
+        rows = np.floor((np.asarray(lat) + 90.0) / self.cell_deg).astype(np.int64)
+        lon = (np.asarray(lon, dtype=np.float64) + 180.0) % 360.0
+        cols = np.minimum(np.floor(lon / self.cell_deg).astype(np.int64), self.columns - 1)
+        return rows, cols
+
+    def _columns_between(self, lon_lo: float, lon_hi: float) -> List[int]:
+        """Columns overlapping [lon_lo, lon_hi] (a span under 360 degrees, split at the antimeridian)."""
+        if lon_lo < -180.0:
+            return self._columns_between(lon_lo + 360.0, 180.0) + self._columns_between(-180.0, lon_hi)
+        if lon_hi > 180.0:
+            return self._columns_between(lon_lo, 180.0) + self._columns_between(-180.0, lon_hi - 360.0)
+        col_lo = min(int(math.floor((lon_lo + 180.0) / self.cell_deg)), self.columns - 1)
+        col_hi = min(int(math.floor((lon_hi + 180.0) / self.cell_deg)), self.columns - 1)
+        return list(range(col_lo, col_hi + 1))
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> "np.ndarray":
+        """Indices of points in cells overlapping the bounding box of the radius."""
+        if len(self.points) <= BRUTE_FORCE_POINTS:
+            return np.arange(len(self.points))
+        dlat = radius_km / KM_PER_DEGREE
+        lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        widest = math.cos(math.radians(max(abs(lat_lo), abs(lat_hi))))
+        dlon = 180.0 if widest <= 1e-9 else min(180.0, dlat / widest)
+        row_lo, row_hi = (int(value) for value in self._cells(np.array([lat_lo, lat_hi]), np.array([lon, lon]))[0])
+        if dlon >= 180.0:
+            columns = list(range(self.columns))
+        else:
+            lon = (lon + 180.0) % 360.0 - 180.0
+            columns = sorted(set(self._columns_between(lon - dlon, lon + dlon)))
+        if (row_hi - row_lo + 1) * len(columns) >= len(self._cell_ranges):
+            return np.arange(len(self.points))
+        chunks = []
+        for row in range(row_lo, row_hi + 1):
+            for col in columns:
+                span = self._cell_ranges.get(row * self.columns + col)
+                if span is not None:
+                    chunks.append(self.order[span[0]:span[1]])
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+
+    def _filter_kinds(self, indices: "np.ndarray", kinds: Optional[Iterable[str]]) -> "np.ndarray":
+        if kinds is None:
+            return indices
+        codes = [self.kind_names.index(kind) for kind in kinds if kind in self.kind_names]
+        return indices[np.isin(self.kinds[indices], codes)]
+
+    def distances(self, lat: float, lon: float) -> "np.ndarray":
+        """Distance in km from (lat, lon) to every point, in ``points`` order."""
+        return haversine_km(lat, lon, self.latitudes, self.longitudes)
+
+    def within(
+        self, lat: float, lon: float, radius_km: float, kinds: Optional[Iterable[str]] = None
+    ) -> List[Tuple[SpatialPoint, float]]:
+        """Points within ``radius_km`` of (lat, lon), nearest first."""
+        indices, distances = self._within(lat, lon, radius_km, kinds)
+        return [(self.points[int(index)], float(distance)) for index, distance in zip(indices, distances)]
+
+    def _within(
+        self, lat: float, lon: float, radius_km: float, kinds: Optional[Iterable[str]]
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        indices = self._filter_kinds(self._candidates(lat, lon, radius_km), kinds)
+        distances = haversine_km(lat, lon, self.latitudes[indices], self.longitudes[indices])
+        keep = distances <= radius_km
+        indices, distances = indices[keep], distances[keep]
+        order = np.lexsort((indices, distances))
+        return indices[order], distances[order]
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 1,
+        max_km: Optional[float] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> List[Tuple[SpatialPoint, float]]:
+        """The ``k`` closest points (optionally within ``max_km``), nearest first."""
+        kinds = None if kinds is None else tuple(kinds)
+        if len(self.points) <= BRUTE_FORCE_POINTS:
+            indices, distances = self._within(lat, lon, HALF_CIRCUMFERENCE_KM if max_km is None else max_km, kinds)
+            return [(self.points[int(index)], float(distance)) for index, distance in zip(indices[:k], distances[:k])]
+        limit = HALF_CIRCUMFERENCE_KM if max_km is None else min(float(max_km), HALF_CIRCUMFERENCE_KM)
+        # Every point closer than the search radius is a candidate, so once k
+        # of them are inside it they are exactly the k nearest.
+        radius = min(limit, self.cell_deg * KM_PER_DEGREE)
+        while True:
+            indices, distances = self._within(lat, lon, radius, kinds)
+            if len(indices) >= k or radius >= limit:
+                break
+            radius = min(limit, radius * 4.0)
+        return [(self.points[int(index)], float(distance)) for index, distance in zip(indices[:k], distances[:k])]
+
+
+# data dir + cell size -> (source payloads, index); reused while the loader returns the same payloads.
+_INDEXES: Dict[Tuple[str, float], Tuple[Tuple[Any, ...], SpatialIndex]] = {}
+
+
+def load_spatial_index(data_dir: Path = ROOT / "data", cell_deg: float = DEFAULT_CELL_DEG) -> SpatialIndex:
+    """Index over :func:`default_sources`, rebuilt only when a source dataset changes."""
+    sources = default_sources(Path(data_dir))
+    payloads = tuple(load_dataset(path) for _, path in sources)
+    key = (str(Path(data_dir).resolve()), float(cell_deg))
+    cached = _INDEXES.get(key)
+    if cached is None or len(cached[0]) != len(payloads) or any(a is not b for a, b in zip(cached[0], payloads)):
+        cached = (payloads, SpatialIndex(load_points(sources), cell_deg))
+        _INDEXES[key] = cached
+    return cached[1]
@@ -0,0 +1,326 @@
+"""
+Routable trail graph over the WMNF OSM trail extracts, with A* routing.
+
+``data/wmnf-trails/wmnf-*.json`` are raw Overpass responses: ways carrying
+their node refs and (``out geom``) inline geometry. Every OSM node becomes a
+vertex and every pair of consecutive way nodes an undirected edge weighted by
+its great-circle length; ways that share a node ref are joined there. The
+adjacency is stored CSR-style: ``indptr[v]:indptr[v + 1]`` slices
+``indices`` (neighbour vertex), ``weights`` (km) and ``edge_way`` (index into
+``ways``).
+
+Peaks and trailheads (``nh48data.spatial`` points of kind "peak" and
+"parking") are snapped to their nearest vertex. Shortest paths use A* with
+the straight-line distance to the target as heuristic (admissible, as every
+edge is at least that long), computed for all vertices in one vectorized
+``haversine_km`` call per leg. Loops route start -> via... -> start and
+penalise edges already walked so the way back prefers another trail.
+
+The shipped extracts cover only parts of the forest, so most peaks are
+farther than ``max_snap_km`` from any trail and are left out of ``places``;
+today only Mount Cabot (and its trailhead pin, on the same summit node)
+snaps. Other points can be routed as (lat, lon) pairs:
+
+    from nh48data.trails import load_trail_graph
+
+    graph = load_trail_graph()
+    graph.route([(44.4793, -71.4481), "mount-cabot"])    # Mt Cabot Trail, ~5.2 km
+    graph.loop((44.4968, -71.3589), ["mount-cabot"])     # from York Pond Trail, ~17.7 km
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .loader import ROOT, Source, load_dataset
+from .spatial import SpatialPoint, default_sources as spatial_sources, haversine_km, load_points
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when a graph is built
+    np = None
+
+TRAIL_DIR = ROOT / "data" / "wmnf-trails"
+TRAIL_DATASETS = ("wmnf-main.json", "wmnf-maine.json", "wmnf-pliney.json")
+SNAP_KINDS = ("peak", "parking")
+DEFAULT_MAX_SNAP_KM = 1.0
+DEFAULT_LOOP_PENALTY = 3.0
+KM_PER_MILE = 1.609344
+
+Waypoint = Union[str, Tuple[float, float]]
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for the trail graph. Install with `python -m pip install numpy`.")
+
+
+def default_sources(trail_dir: Path = TRAIL_DIR) -> List[Path]:
+    return [path for path in (trail_dir / name for name in TRAIL_DATASETS) if path.exists()]
+
+
+@dataclass(frozen=True)
+class TrailWay:
+    id: int
+    name: str
+    highway: str
+
+
+@dataclass(frozen=True)
+class Snap:
+    """A waypoint attached to the graph: ``vertex`` lies ``offset_km`` from the requested point."""
+
+    label: str
+    latitude: float
+    longitude: float
+    vertex: int
+    offset_km: float
+
+
+@dataclass
+class Route:
+    snaps: List[Snap]
+    vertices: List[int]
+    edges: List[int]
+    distance_km: float
+
+    @property
+    def distance_mi(self) -> float:
+        return self.distance_km / KM_PER_MILE
+
+
+def _way_nodes(way: Dict[str, Any], node_coords: Dict[int, Tuple[float, float]]) -> List[Tuple[int, float, float]]:
+    refs = way.get("nodes") or []
+    geometry = way.get("geometry") or []
+    if len(geometry) == len(refs):
+        return [
+            (int(ref), float(point["lat"]), float(point["lon"]))
+            for ref, point in zip(refs, geometry)
+            if point and point.get("lat") is not None
+        ]
+    return [(int(ref), *node_coords[int(ref)]) for ref in refs if int(ref) in node_coords]
+
+
+class TrailGraph:
+    """CSR adjacency over OSM trail nodes with snapping and A* routing."""
+
+    def __init__(self, payloads: Sequence[Any], places: Sequence[SpatialPoint] = (), max_snap_km: float = DEFAULT_MAX_SNAP_KM) -> None:
+        require_numpy()
+        node_coords: Dict[int, Tuple[float, float]] = {}
+        raw_ways: List[Dict[str, Any]] = []
+        for payload in payloads:
+            for element in (payload or {}).get("elements") or []:
+                if element.get("type") == "node" and element.get("lat") is not None:
+                    node_coords[int(element["id"])] = (float(element["lat"]), float(element["lon"]))
+                elif element.get("type") == "way":
+                    raw_ways.append(element)
+
+        vertex_of: Dict[int, int] = {}
+        node_ids: List[int] = []
+        lats: List[float] = []
+        lons: List[float] = []
+        sources: List[int] = []
+        targets: List[int] = []
+        edge_way: List[int] = []
+        self.ways: List[TrailWay] = []
+        seen_ways = set()
+        for way in raw_ways:
+            if way.get("id") in seen_ways:
+                continue
+            seen_ways.add(way.get("id"))
+            tags = way.get("tags") or {}
+            way_index = len(self.ways)
+            self.ways.append(TrailWay(int(way["id"]), str(tags.get("name") or ""), str(tags.get("highway") or "")))
+            previous = None
+            for ref, lat, lon in _way_nodes(way, node_coords):
+                vertex = vertex_of.get(ref)
+                if vertex is None:
+                    vertex = vertex_of[ref] = len(node_ids)
+                    node_ids.append(ref)
+                    lats.append(lat)
+                    lons.append(lon)
+                if previous is not None and previous != vertex:
+                    sources.extend((previous, vertex))
+                    targets.extend((vertex, previous))
+                    edge_way.extend((way_index, way_index))
+                previous = vertex
+
+        self.node_ids = np.array(node_ids, dtype=np.int64)
+        self.latitudes = np.array(lats, dtype=np.float64)
+        self.longitudes = np.array(lons, dtype=np.float64)
+        self.vertex_of = vertex_of
+        src = np.array(sources, dtype=np.int64)
+        dst = np.array(targets, dtype=np.int64)
+        order = np.argsort(src, kind="stable")
+        src, dst = src[order], dst[order]
+        self.indices = dst.astype(np.int32)
+        self.edge_way = np.array(edge_way, dtype=np.int32)[order]
+        self.weights = haversine_km(self.latitudes[src], self.longitudes[src], self.latitudes[dst], self.longitudes[dst])
+        self.indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=self.indptr[1:])
+
+        self.places: Dict[str, Snap] = {}
+        for point in places:
+            snap = self.snap(point.latitude, point.longitude, label=point.id)
+            if snap.offset_km <= max_snap_km:
+                self.places.setdefault(point.id, snap)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices) // 2
+
+    def snap(self, lat: float, lon: float, label: str = "") -> Snap:
+        """Nearest vertex to (lat, lon)."""
+        if not len(self.node_ids):
+            raise RuntimeError("The trail graph is empty.")
+        distances = haversine_km(lat, lon, self.latitudes, self.longitudes)
+        vertex = int(np.argmin(distances))
+        return Snap(label or f"{lat:.5f},{lon:.5f}", float(lat), float(lon), vertex, float(distances[vertex]))
+
+    def resolve(self, waypoint: Waypoint, max_snap_km: float = DEFAULT_MAX_SNAP_KM) -> Snap:
+        """Snap a place id ("mount-adams", "parking:mount-adams") or a (lat, lon) pair."""
+        if isinstance(waypoint, str):
+            snap = self.places.get(waypoint)
+            if snap is None:
+                raise RuntimeError(f"Unknown or unsnapped place: {waypoint} (not within {max_snap_km} km of a trail)")
+            return snap
+        snap = self.snap(float(waypoint[0]), float(waypoint[1]))
+        if snap.offset_km > max_snap_km:
+            raise RuntimeError(f"No trail within {max_snap_km} km of {snap.label} (nearest is {snap.offset_km:.2f} km away).")
+        return snap
+
+    def shortest_path(
+        self, start: int, goal: int, penalized: Optional[Iterable[int]] = None, penalty: float = 1.0
+    ) -> Tuple[List[int], List[int], float]:
+        """(vertices, edges, km) of the shortest path; edges in ``penalized`` cost ``penalty`` times more."""
+        if start == goal:
+            return [start], [], 0.0
+        heuristic = haversine_km(self.latitudes[goal], self.longitudes[goal], self.latitudes, self.longitudes)
+        if penalty > 1.0:
+            # Edges are stored in both directions; penalise the reverse slot as well.
+            penalized = set(penalized or ())
+            penalized |= {self._reverse_edge(edge) for edge in penalized}
+        else:
+            penalized = set()
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        cost = {start: 0.0}
+        via: Dict[int, int] = {}
+        frontier = [(float(heuristic[start]), start)]
+        closed = set()
+        while frontier:
+            _, vertex = heapq.heappop(frontier)
+            if vertex == goal:
+                break
+            if vertex in closed:
+                continue
+            closed.add(vertex)
+            base = cost[vertex]
+            for edge in range(int(indptr[vertex]), int(indptr[vertex + 1])):
+                neighbour = int(indices[edge])
+                if neighbour in closed:
+                    continue
+                step = float(weights[edge])
+                candidate = base + (step * penalty if edge in penalized else step)
+                if candidate < cost.get(neighbour, float("inf")):
+                    cost[neighbour] = candidate
+                    via[neighbour] = edge
+                    heapq.heappush(frontier, (candidate + float(heuristic[neighbour]), neighbour))
+        if goal not in via:
+            raise RuntimeError(f"No trail connection between OSM nodes {self.node_ids[start]} and {self.node_ids[goal]}.")
+        vertices, edges = [goal], []
+        while vertices[-1] != start:
+            edge = via[vertices[-1]]
+            edges.append(edge)
+            vertices.append(self._edge_source(edge))
+        vertices.reverse()
+        edges.reverse()
+        return vertices, edges, float(sum(self.weights[edge] for edge in edges))
+
+    def _edge_source(self, edge: int) -> int:
+        return int(np.searchsorted(self.indptr, edge, side="right") - 1)
+
+    def _reverse_edge(self, edge: int) -> int:
+        source, target = self._edge_source(edge), int(self.indices[edge])
+        for candidate in range(int(self.indptr[target]), int(self.indptr[target + 1])):
+            if int(self.indices[candidate]) == source and self.edge_way[candidate] == self.edge_way[edge]:
+                return candidate
+        return edge
+
+    def route(self, waypoints: Sequence[Waypoint], max_snap_km: float = DEFAULT_MAX_SNAP_KM, loop_penalty: float = 1.0) -> Route:
+        """Shortest route through ``waypoints`` in order (``loop_penalty`` > 1 discourages retracing)."""
+        if len(waypoints) < 2:
+            raise RuntimeError("A route needs at least two waypoints.")
+        snaps = [self.resolve(waypoint, max_snap_km) for waypoint in waypoints]
+        vertices: List[int] = [snaps[0].vertex]
+        edges: List[int] = []
+        distance = 0.0
+        for origin, target in zip(snaps, snaps[1:]):
+            leg_vertices, leg_edges, leg_km = self.shortest_path(origin.vertex, target.vertex, edges, loop_penalty)
+            vertices.extend(leg_vertices[1:])
+            edges.extend(leg_edges)
+            distance += leg_km
+        return Route(snaps, vertices, edges, distance)
+
+    def loop(
+        self, start: Waypoint, via: Sequence[Waypoint], max_snap_km: float = DEFAULT_MAX_SNAP_KM, penalty: float = DEFAULT_LOOP_PENALTY
+    ) -> Route:
+        """Route from ``start`` through ``via`` and back, preferring not to retrace walked edges."""
+        return self.route([start, *via, start], max_snap_km, loop_penalty=penalty)
+
+    def trail_names(self, route: Route) -> List[str]:
+        """Named trails along ``route`` in walking order (consecutive repeats folded)."""
+        names: List[str] = []
+        for edge in route.edges:
+            name = self.ways[int(self.edge_way[edge])].name
+            if name and (not names or names[-1] != name):
+                names.append(name)
+        return names
+
+    def geometry(self, route: Route) -> Dict[str, Any]:
+        """GeoJSON LineString ([lon, lat]) of ``route``."""
+        return {
+            "type": "LineString",
+            "coordinates": [[float(self.longitudes[v]), float(self.latitudes[v])] for v in route.vertices],
+        }
+
+    def summary(self, route: Route) -> Dict[str, Any]:
+        return {
+            "distanceKm": round(route.distance_km, 3),
+            "distanceMi": round(route.distance_mi, 2),
+            "trails": self.trail_names(route),
+            "waypoints": [
+                {"label": snap.label, "osmNode": int(self.node_ids[snap.vertex]), "snapKm": round(snap.offset_km, 3)}
+                for snap in route.snaps
+            ],
+            "geometry": self.geometry(route),
+        }
+
+
+# (trail sources, max snap km) -> (payloads, graph); reused while the loader returns the same payloads.
+_GRAPHS: Dict[Tuple[Tuple[str, ...], float], Tuple[Tuple[Any, ...], TrailGraph]] = {}
+
+
+def load_trail_graph(
+    sources: Optional[Sequence[Source]] = None,
+    data_dir: Path = ROOT / "data",
+    max_snap_km: float = DEFAULT_MAX_SNAP_KM,
+) -> TrailGraph:
+    """Graph over the WMNF trail extracts with peaks and trailheads snapped, rebuilt only when inputs change."""
+    sources = list(sources) if sources is not None else default_sources(Path(data_dir) / "wmnf-trails")
+    if not sources:
+        raise RuntimeError(f"No trail datasets found in {Path(data_dir) / 'wmnf-trails'}.")
+    place_sources = [(kind, path) for kind, path in spatial_sources(Path(data_dir)) if kind in SNAP_KINDS]
+    payloads = tuple(load_dataset(source) for source in sources) + tuple(load_dataset(path) for _, path in place_sources)
+    key = (tuple(str(source) for source in sources), float(max_snap_km))
+    cached = _GRAPHS.get(key)
+    if cached is None or len(cached[0]) != len(payloads) or any(a is not b for a, b in zip(cached[0], payloads)):
+        graph = TrailGraph(payloads[: len(sources)], load_points(place_sources), max_snap_km)
+        cached = (payloads, graph)
+        _GRAPHS[key] = cached
+    return cached[1]
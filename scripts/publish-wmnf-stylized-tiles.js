@@ -43,11 +43,13 @@ function contentTypeForFile(filePath) {
   if (lower.endsWith('.png')) return 'image/png';
   if (lower.endsWith('.pbf')) return 'application/x-protobuf';
   if (lower.endsWith('.json')) return 'application/json; charset=utf-8';
+  if (lower.endsWith('.pmtiles')) return 'application/vnd.pmtiles';
   return 'application/octet-stream';
 }
 
 function cacheControlForRelativePath(relativePath) {
-  if (normalizePosix(relativePath) === 'metadata.json') {
+  const normalized = normalizePosix(relativePath);
+  if (normalized === 'metadata.json' || normalized.endsWith('.pmtiles')) {
     return 'public, max-age=300';
   }
   return 'public, max-age=31536000, immutable';
@@ -58,12 +60,26 @@ function main() {
   const bucket = getArgValue('--bucket', process.env.R2_BUCKET_NAME || process.env.R2_BUCKET || 'nh48-photos');
   const prefix = normalizePosix(getArgValue('--prefix', 'tiles/wmnf-stylized/v1'));
   const dryRun = hasFlag('--dry-run');
+  const changedOnly = hasFlag('--changed-only');
 
   const sourceDir = path.isAbsolute(sourceDirArg) ? sourceDirArg : path.join(ROOT, sourceDirArg);
   if (!fs.existsSync(sourceDir)) {
     throw new Error(`Source directory not found: ${sourceDir}`);
   }
 
+  // build-manifest.json lists the tile files the last (incremental) build
+  // rewrote or deleted; --changed-only uploads just those plus the
+  // small top-level files.
+  let lastBuild = null;
+  if (changedOnly) {
+    const manifestPath = path.join(sourceDir, 'build-manifest.json');
+    if (!fs.existsSync(manifestPath)) {
+      throw new Error(`--changed-only requires ${manifestPath}. Run a build first.`);
+    }
+    lastBuild = JSON.parse(fs.readFileSync(manifestPath, 'utf8')).last_build || { changed: [], deleted: [] };
+  }
+  const changedSet = lastBuild ? new Set(lastBuild.changed.map(normalizePosix)) : null;
+
   const files = collectFilesRecursive(sourceDir)
     .map((absolutePath) => ({
       absolutePath,
@@ -72,13 +88,21 @@ function main() {
     .filter((entry) => (
       entry.relativePath.startsWith('hillshade/')
       || entry.relativePath.startsWith('contours/')
+      || entry.relativePath.startsWith('terrain/')
       || entry.relativePath === 'metadata.json'
+      || /^[^/]+\.pmtiles$/.test(entry.relativePath)
+    ))
+    .filter((entry) => (
+      !changedSet
+      || changedSet.has(entry.relativePath)
+      || !entry.relativePath.includes('/')
     ));
+  const deletions = lastBuild ? lastBuild.deleted.map(normalizePosix) : [];
 
   if (!files.length) {
     throw new Error(
       `No WMNF stylized assets found in ${sourceDir}. `
-      + 'Expected hillshade/**, contours/**, and metadata.json.'
+      + 'Expected hillshade/**, contours/**, terrain/** or *.pmtiles, and metadata.json.'
     );
   }
 
@@ -112,12 +136,32 @@ function main() {
     uploadedCount += 1;
   });
 
+  let deletedCount = 0;
+  deletions.forEach((relativePath, index) => {
+    const objectTarget = `${bucket}/${normalizePosix(`${prefix}/${relativePath}`)}`;
+    console.log(`[publish-wmnf-stylized] delete ${index + 1}/${deletions.length} ${objectTarget}`);
+    if (dryRun) return;
+
+    const result = spawnSync(wranglerBin, ['r2', 'object', 'delete', objectTarget], {
+      cwd: ROOT,
+      stdio: 'inherit'
+    });
+    if (result.status !== 0) {
+      throw new Error(`Wrangler delete failed for ${relativePath} (exit ${result.status}).`);
+    }
+    deletedCount += 1;
+  });
+
   if (dryRun) {
-    console.log(`[publish-wmnf-stylized] Dry run complete. ${files.length} file(s) discovered.`);
+    console.log(
+      `[publish-wmnf-stylized] Dry run complete. ${files.length} file(s) discovered, ${deletions.length} deletion(s).`
+    );
     return;
   }
 
-  console.log(`[publish-wmnf-stylized] Upload complete. ${uploadedCount} file(s) published.`);
+  console.log(
+    `[publish-wmnf-stylized] Upload complete. ${uploadedCount} file(s) published, ${deletedCount} deleted.`
+  );
 }
 
 try {
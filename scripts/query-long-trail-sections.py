@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Find the long-trail sections that intersect a viewport, once or as a local JSON API.
+
+One-shot:
+  python scripts/query-long-trail-sections.py --bbox=-71.9,43.9,-71.0,44.5 --zoom 12
+  python scripts/query-long-trail-sections.py --bbox=-125,32,-114,42 --trail pacific-crest-trail
+
+Local API (--serve):
+  GET /sections?bbox=west,south,east,north[&zoom=10][&trail=appalachian-trail]
+
+Answers come from data/long-trails/sections-index.json (built by
+scripts/build-long-trail-section-index.py); each hit names the section's
+source file, its compact copy and, with a zoom, the compact level to load.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from longtrails.sections import SECTION_INDEX_PATH, BBox, SectionIndex
+
+
+def parse_bbox(text: str) -> BBox:
+    parts = [float(part) for part in text.split(",")]
+    if len(parts) != 4 or parts[1] > parts[3]:
+        raise ValueError(f"bbox must be west,south,east,north: {text}")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Viewport queries over the long-trail section index.")
+    parser.add_argument("--index", type=Path, default=SECTION_INDEX_PATH)
+    parser.add_argument("--bbox", type=parse_bbox, help="west,south,east,north in degrees (use --bbox=... when west is negative).")
+    parser.add_argument("--zoom", type=float, help="Map zoom; selects the compact level in each hit.")
+    parser.add_argument("--trail", action="append", help="Restrict to trail slug(s).")
+    parser.add_argument("--serve", action="store_true", help="Serve the index as a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    return parser.parse_args()
+
+
+def run_query(index: SectionIndex, bbox: BBox, zoom: Optional[float] = None, trails: Optional[List[str]] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    hits = index.query(bbox, zoom, trails)
+    return {"count": len(hits), "elapsed_us": round((time.perf_counter() - started) * 1e6, 1), "sections": hits}
+
+
+def make_handler(index: SectionIndex):
+    class SectionHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path != "/sections":
+                self.send_json(404, {"error": "Use /sections."})
+                return
+            try:
+                bbox = parse_bbox(params["bbox"][0])
+                zoom = float(params["zoom"][0]) if "zoom" in params else None
+                payload = run_query(index, bbox, zoom, params.get("trail"))
+            except (KeyError, ValueError) as exc:
+                self.send_json(400, {"error": f"Bad query: {exc}"})
+                return
+            self.send_json(200, payload)
+
+        def send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+            print(f"[query-long-trail-sections] {self.address_string()} {format % args}")
+
+    return SectionHandler
+
+
+def main() -> int:
+    args = parse_args()
+    index = SectionIndex.load(args.index)
+    print(f"[query-long-trail-sections] Indexed {len(index)} section(s) in {len(index.tiles)} z{index.zoom} tile(s)", file=sys.stderr)
+
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        print(f"[query-long-trail-sections] Serving on http://{args.host}:{args.port}/ (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    if args.bbox is None:
+        raise RuntimeError("--bbox is required unless --serve is passed.")
+    print(json.dumps(run_query(index, args.bbox, args.zoom, args.trail), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[query-long-trail-sections] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
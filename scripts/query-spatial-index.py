@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Query the peak / trailhead / POI spatial index, once or as a local JSON API.
+
+One-shot:
+  python scripts/query-spatial-index.py --lat 44.2706 --lon -71.3033 --k 5
+  python scripts/query-spatial-index.py --lat 44.2706 --lon -71.3033 --radius-km 3 --kind parking
+
+Local API (--serve):
+  GET /nearest?lat=44.27&lon=-71.30&k=5[&max_km=10][&kind=peak]
+  GET /within?lat=44.27&lon=-71.30&radius_km=3[&kind=parking&kind=poi]
+
+The index is built once at startup from every peak list with coordinates,
+data/parking-data.json and the POI GeoJSON files (see nh48data.spatial).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from nh48data.spatial import SpatialIndex, SpatialPoint, load_spatial_index
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Nearest-neighbour and radius queries over peaks, parking and POIs.")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lon", type=float)
+    parser.add_argument("--k", type=int, default=5, help="Number of nearest points (ignored with --radius-km).")
+    parser.add_argument("--radius-km", type=float, help="Return every point within this distance instead of k nearest.")
+    parser.add_argument("--max-km", type=float, help="Upper distance bound for k-nearest queries.")
+    parser.add_argument("--kind", action="append", choices=["peak", "parking", "poi"], help="Restrict to kind(s).")
+    parser.add_argument("--serve", action="store_true", help="Serve the index as a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    return parser.parse_args()
+
+
+def serialize(results: List[Tuple[SpatialPoint, float]], started: float) -> Dict[str, Any]:
+    return {
+        "count": len(results),
+        "elapsed_us": round((time.perf_counter() - started) * 1e6, 1),
+        "results": [
+            {
+                "id": point.id,
+                "kind": point.kind,
+                "name": point.name,
+                "lat": point.latitude,
+                "lon": point.longitude,
+                "distance_km": round(distance, 4),
+                "sources": list(point.sources),
+            }
+            for point, distance in results
+        ],
+    }
+
+
+def run_query(
+    index: SpatialIndex,
+    lat: float,
+    lon: float,
+    k: int = 5,
+    radius_km: Optional[float] = None,
+    max_km: Optional[float] = None,
+    kinds: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    if radius_km is not None:
+        results = index.within(lat, lon, radius_km, kinds=kinds)
+    else:
+        results = index.nearest(lat, lon, k=k, max_km=max_km, kinds=kinds)
+    return serialize(results, started)
+
+
+def make_handler(index: SpatialIndex):
+    class SpatialHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server naming
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            try:
+                lat = float(params["lat"][0])
+                lon = float(params["lon"][0])
+                kinds = params.get("kind")
+                if url.path == "/nearest":
+                    max_km = float(params["max_km"][0]) if "max_km" in params else None
+                    payload = run_query(index, lat, lon, k=int(params.get("k", ["5"])[0]), max_km=max_km, kinds=kinds)
+                elif url.path == "/within":
+                    payload = run_query(index, lat, lon, radius_km=float(params["radius_km"][0]), kinds=kinds)
+                else:
+                    self.send_json(404, {"error": "Use /nearest or /within."})
+                    return
+            except (KeyError, ValueError) as exc:
+                self.send_json(400, {"error": f"Bad query: {exc}"})
+                return
+            self.send_json(200, payload)
+
+        def send_json(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - http.server signature
+            print(f"[query-spatial-index] {self.address_string()} {format % args}")
+
+    return SpatialHandler
+
+
+def main() -> int:
+    args = parse_args()
+    index = load_spatial_index()
+    print(f"[query-spatial-index] Indexed {len(index)} point(s) ({', '.join(index.kind_names)})", file=sys.stderr)
+
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(index))
+        print(f"[query-spatial-index] Serving on http://{args.host}:{args.port}/ (Ctrl+C to stop)", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return 0
+
+    if args.lat is None or args.lon is None:
+        raise RuntimeError("--lat and --lon are required unless --serve is passed.")
+    payload = run_query(index, args.lat, args.lon, args.k, args.radius_km, args.max_km, args.kind)
+    print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[query-spatial-index] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
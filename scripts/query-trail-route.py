@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Route between peaks, trailheads and coordinates on the local WMNF trail graph.
+
+  python scripts/query-trail-route.py --from 44.4793,-71.4481 --to mount-cabot
+  python scripts/query-trail-route.py --from 44.4968,-71.3589 --via mount-cabot --loop
+  python scripts/query-trail-route.py --places
+
+Waypoints are place ids from the spatial index (a peak slug, or
+"parking:<slug>" for its trailhead) or "lat,lon". The graph is built from
+data/wmnf-trails/wmnf-*.json (see nh48data.trails); distances are computed
+locally instead of through the external routing providers. Only places
+within --max-snap-km of a trail in those extracts can be used by id (--places
+lists them; currently just Mount Cabot), so routes elsewhere need "lat,lon"
+waypoints on a mapped trail.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+from nh48data.trails import DEFAULT_LOOP_PENALTY, DEFAULT_MAX_SNAP_KM, Waypoint, load_trail_graph
+
+
+def parse_waypoint(text: str) -> Waypoint:
+    parts = text.split(",")
+    if len(parts) == 2:
+        try:
+            return float(parts[0]), float(parts[1])
+        except ValueError:
+            pass
+    return text
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Shortest-path and loop queries over the WMNF trail graph.")
+    parser.add_argument("--from", dest="start", type=parse_waypoint, help="Start place id or lat,lon.")
+    parser.add_argument("--to", dest="end", type=parse_waypoint, help="End place id or lat,lon (omit with --loop).")
+    parser.add_argument("--via", action="append", default=[], type=parse_waypoint, help="Intermediate waypoint (repeatable).")
+    parser.add_argument("--loop", action="store_true", help="Return to --from, avoiding trail already walked where possible.")
+    parser.add_argument("--loop-penalty", type=float, default=DEFAULT_LOOP_PENALTY, help="Cost multiplier for retraced trail.")
+    parser.add_argument("--max-snap-km", type=float, default=DEFAULT_MAX_SNAP_KM, help="Farthest a waypoint may be from a trail.")
+    parser.add_argument("--geometry", action="store_true", help="Include the GeoJSON LineString.")
+    parser.add_argument("--places", action="store_true", help="List the peaks and trailheads snapped to the graph.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    graph = load_trail_graph(max_snap_km=args.max_snap_km)
+    print(
+        f"[query-trail-route] Graph: {len(graph)} node(s), {graph.edge_count} edge(s), {len(graph.ways)} way(s), "
+        f"{len(graph.places)} snapped place(s) in {time.perf_counter() - started:.2f}s",
+        file=sys.stderr,
+    )
+
+    if args.places:
+        places = {
+            place: {"osmNode": int(graph.node_ids[snap.vertex]), "snapKm": round(snap.offset_km, 3)}
+            for place, snap in sorted(graph.places.items())
+        }
+        print(json.dumps(places, indent=2))
+        return 0
+    if args.start is None or (args.end is None and not args.loop):
+        raise RuntimeError("--from and --to (or --from with --loop) are required.")
+
+    started = time.perf_counter()
+    if args.loop:
+        via: List[Waypoint] = args.via + ([args.end] if args.end is not None else [])
+        route = graph.loop(args.start, via, args.max_snap_km, args.loop_penalty)
+    else:
+        route = graph.route([args.start, *args.via, args.end], args.max_snap_km)
+    payload = graph.summary(route)
+    payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if not args.geometry:
+        payload.pop("geometry")
+    print(json.dumps(payload, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except Exception as exc:  # noqa: BLE001
+        print(f"[query-trail-route] ERROR: {exc}", file=sys.stderr)
+        raise SystemExit(1)
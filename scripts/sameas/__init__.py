@@ -0,0 +1,47 @@
+"""
+Network helpers for scripts/build-peak-sameas.py.
+
+``JsonClient`` rate-limits requests per host and keeps responses in a
+persistent TTL cache (``ResponseCache``); ``nominatim_search`` and
+``WikidataBatcher`` build the Nominatim and batched ``wbgetentities`` calls
+on top of it. Re-runs inside the TTL, and ``--offline`` runs, are served
+from the cache. ``CandidatePool`` blocks search results by geohash cell and
+name token and scores each peak's candidates in one vectorized pass;
+``EntityIndex`` (sameas.dump) serves the same rows and entities offline from
+ingested Wikidata/OSM dumps.
+"""
+
+from .blocking import CandidatePool, geohash_block, geohash_encode, name_tokens
+from .cache import ResponseCache
+from .client import HostLimit, JsonClient, OfflineMiss
+from .dump import NORTHEAST_BBOX, EntityIndex, build_entity_index
+from .resolver import (
+    NOMINATIM_URL,
+    WBGETENTITIES_MAX_IDS,
+    WIKIDATA_API,
+    WikidataBatcher,
+    nominatim_search,
+    nominatim_search_url,
+    wbgetentities_url,
+)
+
+__all__ = [
+    "CandidatePool",
+    "EntityIndex",
+    "HostLimit",
+    "JsonClient",
+    "NOMINATIM_URL",
+    "NORTHEAST_BBOX",
+    "OfflineMiss",
+    "ResponseCache",
+    "WBGETENTITIES_MAX_IDS",
+    "WIKIDATA_API",
+    "WikidataBatcher",
+    "build_entity_index",
+    "geohash_block",
+    "geohash_encode",
+    "name_tokens",
+    "nominatim_search",
+    "nominatim_search_url",
+    "wbgetentities_url",
+]
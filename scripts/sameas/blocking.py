@@ -0,0 +1,240 @@
+"""
+Candidate blocking and vectorized scoring for matching peaks to Nominatim rows.
+
+Every row returned by any search goes into one ``CandidatePool`` (deduplicated
+by OSM object), indexed two ways:
+
+  geohash  precision-4 cell (~39 x 20 km) of the row's position
+  tokens   normalized name tokens ("mount", "mt", "mountain", "peak" dropped)
+
+A peak is scored against its own search rows plus the pooled rows that share
+a name token and sit in its geohash cell or one of the 8 neighbours. Peaks
+without coordinates only add pooled rows whose Nominatim address is in the
+peak's own state; without a known state they keep their own rows alone.
+Scores keep the original formula, 4 * token-Jaccard (x0.7 unless
+natural=peak/mountain) minus 0.25 per km, but are computed for all
+candidates at once: Jaccard from integer token bitsets, distance from one
+haversine call. A candidate must reach ``MIN_SIMILARITY`` (and, for a peak
+with coordinates, ``MIN_SCORE``), otherwise the peak is left unmatched.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from nh48data.spatial import haversine_km
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when a pool is built
+    np = None
+
+GEOHASH_PRECISION = 4
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+NO_COORDS_DISTANCE_KM = 20.0
+# Weighted Jaccard floor: "Lincoln Gap" (0.35) or "Bald Mountain" for "Bald Knob" (0.5) never match.
+MIN_SIMILARITY = 0.6
+# With coordinates: an exact name may sit up to 16 km away, a 0.6 match up to 9.6 km.
+MIN_SCORE = 0.0
+PEAK_TYPES = frozenset({"peak", "mountain"})
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+_GENERIC_RE = re.compile(r"\b(mount|mt|mountain|peak)\b")
+
+
+def name_tokens(text: Any) -> Set[str]:
+    """Token set behind the name similarity (lowercase, punctuation and generic words dropped)."""
+    lowered = _NON_ALNUM_RE.sub(" ", str(text or "").lower())
+    return set(_GENERIC_RE.sub(" ", lowered).split())
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for candidate scoring. Install with `python -m pip install numpy`.")
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars: List[str] = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        span, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (span[0] + span[1]) / 2.0
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            span[0] = mid
+        else:
+            span[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_block(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> Set[str]:
+    """The cell containing (lat, lon) and its 8 neighbours."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    dlat, dlon = 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+    cells = set()
+    for row in (-1, 0, 1):
+        for col in (-1, 0, 1):
+            neighbour_lat = min(89.999999, max(-89.999999, lat + row * dlat))
+            neighbour_lon = (lon + col * dlon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(neighbour_lat, neighbour_lon, precision))
+    return cells
+
+
+def row_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    if row.get("osm_type") and row.get("osm_id"):
+        return str(row["osm_type"]), str(row["osm_id"])
+    return "place", str(row.get("place_id") or id(row))
+
+
+def row_title(row: Dict[str, Any]) -> str:
+    return (row.get("namedetails") or {}).get("name") or row.get("display_name", "")
+
+
+def row_state(row: Dict[str, Any]) -> str:
+    """The row's ``address.state`` (Nominatim ``addressdetails``), lowercased; "" when absent."""
+    return str((row.get("address") or {}).get("state") or "").strip().lower()
+
+
+class CandidatePool:
+    """Deduplicated Nominatim rows with geohash and name-token block indexes."""
+
+    def __init__(self) -> None:
+        require_numpy()
+        self.rows: List[Dict[str, Any]] = []
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._vocabulary: Dict[str, int] = {}
+        self._bits: List[int] = []
+        self._sizes: List[int] = []
+        self._natural: List[bool] = []
+        self._state: List[str] = []
+        self._lat: List[float] = []
+        self._lon: List[float] = []
+        self.by_cell: Dict[str, List[int]] = {}
+        self.by_token: Dict[str, List[int]] = {}
+        self._arrays: Optional[Tuple[Any, ...]] = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _token_bits(self, tokens: Iterable[str], grow: bool) -> int:
+        bits = 0
+        for token in tokens:
+            index = self._vocabulary.get(token)
+            if index is None:
+                if not grow:
+                    continue
+                index = len(self._vocabulary)
+                self._vocabulary[token] = index
+            bits |= 1 << index
+        return bits
+
+    def add(self, row: Dict[str, Any]) -> int:
+        """Pool index of ``row`` (existing index if the same OSM object was seen before)."""
+        key = row_key(row)
+        index = self._index.get(key)
+        if index is not None:
+            return index
+        index = len(self.rows)
+        self._index[key] = index
+        tokens = name_tokens(row_title(row))
+        lat, lon = float(row.get("lat", 0)), float(row.get("lon", 0))
+        self.rows.append(row)
+        self._bits.append(self._token_bits(tokens, grow=True))
+        self._sizes.append(len(tokens))
+        self._natural.append(row.get("class") == "natural" and row.get("type") in PEAK_TYPES)
+        self._state.append(row_state(row))
+        self._lat.append(lat)
+        self._lon.append(lon)
+        self.by_cell.setdefault(geohash_encode(lat, lon), []).append(index)
+        for token in tokens:
+            self.by_token.setdefault(token, []).append(index)
+        self._arrays = None
+        return index
+
+    def add_all(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        return [self.add(row) for row in rows]
+
+    def candidates(
+        self,
+        tokens: Set[str],
+        coords: Optional[Tuple[float, float]],
+        own: Sequence[int],
+        state: Optional[str] = None,
+    ) -> List[int]:
+        """``own`` rows first (in search order), then pooled rows from the peak's blocks.
+
+        Without ``coords`` the only block is the peak's ``state`` (full name, as
+        Nominatim writes it); with neither, only ``own`` rows are candidates.
+        """
+        blocked: Set[int] = set()
+        if coords is not None:
+            nearby = {index for cell in geohash_block(*coords) for index in self.by_cell.get(cell, ())}
+            blocked = {index for token in tokens for index in self.by_token.get(token, ()) if index in nearby}
+        elif state:
+            wanted = state.strip().lower()
+            blocked = {index for token in tokens for index in self.by_token.get(token, ()) if self._state[index] == wanted}
+        seen = set(own)
+        return list(own) + sorted(index for index in blocked if index not in seen)
+
+    def _columns(self) -> Tuple[Any, ...]:
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self._lat, dtype=np.float64),
+                np.array(self._lon, dtype=np.float64),
+                np.array(self._sizes, dtype=np.float64),
+                np.array(self._natural, dtype=bool),
+            )
+        return self._arrays
+
+    def similarities(self, name: str, indices: Sequence[int]) -> "np.ndarray":
+        """Token Jaccard of ``name`` against each row, x0.7 for rows that are not peaks."""
+        _, _, sizes, natural = self._columns()
+        tokens = name_tokens(name)
+        bits = self._token_bits(tokens, grow=False)
+        idx = np.asarray(indices, dtype=np.int64)
+        shared = np.array([(self._bits[i] & bits).bit_count() for i in indices], dtype=np.float64)
+        union = sizes[idx] + len(tokens) - shared
+        with np.errstate(invalid="ignore", divide="ignore"):
+            similarity = np.where((sizes[idx] > 0) & (len(tokens) > 0), shared / union, 0.0)
+        return np.where(natural[idx], similarity, similarity * 0.7)
+
+    def scores(self, name: str, coords: Optional[Tuple[float, float]], indices: Sequence[int]) -> "np.ndarray":
+        return self._scores(self.similarities(name, indices), coords, indices)
+
+    def _scores(self, similarity: "np.ndarray", coords: Optional[Tuple[float, float]], indices: Sequence[int]) -> "np.ndarray":
+        lat, lon, _, _ = self._columns()
+        idx = np.asarray(indices, dtype=np.int64)
+        if coords is not None:
+            distance = haversine_km(coords[0], coords[1], lat[idx], lon[idx])
+        else:
+            distance = np.full(len(idx), NO_COORDS_DISTANCE_KM)
+        return similarity * 4 - distance * 0.25
+
+    def best(
+        self,
+        name: str,
+        coords: Optional[Tuple[float, float]],
+        own: Sequence[int],
+        state: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Highest-scoring acceptable candidate row (first wins ties), or None."""
+        indices = self.candidates(name_tokens(name), coords, own, state)
+        if not indices:
+            return None
+        similarity = self.similarities(name, indices)
+        scores = self._scores(similarity, coords, indices)
+        acceptable = similarity >= MIN_SIMILARITY
+        if coords is not None:
+            acceptable &= scores >= MIN_SCORE
+        if not acceptable.any():
+            return None
+        return self.rows[indices[int(np.argmax(np.where(acceptable, scores, -np.inf)))]]
@@ -0,0 +1,67 @@
+"""
+Persistent JSON response cache (SQLite, one row per key) with a TTL.
+
+Keys are request URLs for plain lookups and ``wikidata:<QID>`` for entities
+fetched in ``wbgetentities`` batches, so a cached entity is reused whatever
+batch it first arrived in. Expired rows are kept: ``get(..., allow_stale=True)``
+serves them when running offline.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    body TEXT NOT NULL
+)
+"""
+
+
+class ResponseCache:
+    """``get``/``put`` JSON payloads by key; entries older than ``ttl_s`` count as missing."""
+
+    def __init__(self, path: Path, ttl_s: float) -> None:
+        self.path = Path(path)
+        self.ttl_s = float(ttl_s)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _row(self, key: str) -> Optional[Tuple[float, str]]:
+        return self._db.execute("SELECT fetched_at, body FROM responses WHERE key = ?", (key,)).fetchone()
+
+    def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        row = self._row(key)
+        if row is None or (not allow_stale and time.time() - row[0] > self.ttl_s):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, key: str, payload: Any) -> None:
+        self.put_many([(key, payload)])
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO responses (key, fetched_at, body) VALUES (?, ?, ?)",
+            [(key, now, json.dumps(payload, separators=(",", ":"))) for key, payload in items],
+        )
+        self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        (rows,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "rows": int(rows)}
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,115 @@
+"""
+Asyncio JSON client with per-host rate limits, retries and a response cache.
+
+Requests run on worker threads (``asyncio.to_thread`` over urllib) so the
+build needs no extra HTTP dependency; the event loop only schedules them.
+Each host gets a ``HostLimit``: at most ``concurrency`` requests in flight
+and at least ``interval_s`` between request starts (Nominatim's usage policy
+is one request per second).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from .cache import ResponseCache
+
+USER_AGENT = "nh48-sameas-builder/1.3 (https://nh48.info)"
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    interval_s: float = 0.0
+    concurrency: int = 4
+
+
+class _HostGate:
+    def __init__(self, limit: HostLimit) -> None:
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(max(1, limit.concurrency))
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+    async def wait_turn(self) -> None:
+        async with self.lock:
+            delay = self.next_start - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_start = time.monotonic() + self.limit.interval_s
+
+
+class OfflineMiss(RuntimeError):
+    """Raised for an uncached request while the client is offline."""
+
+
+class JsonClient:
+    """``await client.get_json(url)``: cached, rate limited per host, retried on failure."""
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        limits: Optional[Dict[str, HostLimit]] = None,
+        offline: bool = False,
+        refresh: bool = False,
+        timeout: float = 15.0,
+        retries: int = 2,
+    ) -> None:
+        self.cache = cache
+        self.limits = dict(limits or {})
+        self.offline = offline
+        self.refresh = refresh
+        self.timeout = timeout
+        self.retries = retries
+        self.requests = 0
+        self._gates: Dict[str, _HostGate] = {}
+
+    def _gate(self, url: str) -> _HostGate:
+        host = urlparse(url).netloc
+        gate = self._gates.get(host)
+        if gate is None:
+            gate = _HostGate(self.limits.get(host, HostLimit()))
+            self._gates[host] = gate
+        return gate
+
+    def cached(self, key: str) -> Optional[Any]:
+        if self.refresh and not self.offline:
+            return None
+        return self.cache.get(key, allow_stale=self.offline)
+
+    def _fetch(self, url: str) -> Any:
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, "Accept": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    async def fetch_json(self, url: str) -> Any:
+        """Network fetch (no cache lookup) under the host's rate limit, with retries."""
+        if self.offline:
+            raise OfflineMiss(f"Not cached (offline): {url}")
+        gate = self._gate(url)
+        async with gate.semaphore:
+            for attempt in range(self.retries + 1):
+                await gate.wait_turn()
+                self.requests += 1
+                try:
+                    return await asyncio.to_thread(self._fetch, url)
+                except (urllib.error.URLError, TimeoutError, ValueError) as exc:
+                    if attempt == self.retries:
+                        raise RuntimeError(f"GET {url} failed: {exc}") from exc
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+        raise AssertionError("unreachable")
+
+    async def get_json(self, url: str, key: Optional[str] = None) -> Any:
+        key = key or url
+        payload = self.cached(key)
+        if payload is not None:
+            return payload
+        payload = await self.fetch_json(url)
+        self.cache.put(key, payload)
+        return payload
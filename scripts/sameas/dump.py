@@ -0,0 +1,319 @@
+"""
+Offline entity index built from a Wikidata JSON dump and/or an OSM PBF extract.
+
+Both inputs are streamed, never loaded whole:
+
+  Wikidata  the official ``latest-all.json`` layout (a JSON array with one
+            entity per line), or JSON lines from a filtered dump; plain,
+            ``.gz`` or ``.bz2``. Each line is decoded on its own and kept
+            when its P625 coordinate falls in the bbox and it is a mountain,
+            hill, summit or volcano (or carries a Peakbagger ID, P3109).
+  OSM       ``natural=peak``/``volcano`` nodes read with pyosmium (optional
+            dependency, only needed for ``--osm-pbf``).
+
+Kept entities are written to SQLite in a compact form: label, position and
+only the claims and sitelinks the sameAs builder reads (P3109, P402, P10689,
+P11693, enwiki, frwiki). ``EntityIndex.rows()`` serves them back as
+Nominatim-shaped rows and ``EntityIndex.entity(qid)`` as ``wbgetentities``
+entities, so the builder scores and links them exactly like live responses.
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import osmium
+except ImportError:  # pragma: no cover - surfaced when a PBF is ingested
+    osmium = None
+
+BBox = Tuple[float, float, float, float]  # south, west, north, east
+
+NORTHEAST_BBOX: BBox = (40.4, -80.6, 47.5, -66.9)
+MOUNTAIN_CLASSES = frozenset({8502, 54050, 207326, 8072, 169358})  # mountain, hill, summit, volcano, stratovolcano
+KEPT_CLAIMS = ("P3109", "P402", "P10689", "P11693")
+KEPT_SITELINKS = ("enwiki", "frwiki")
+OSM_CLAIMS = (("P402", "relation"), ("P10689", "way"), ("P11693", "node"))
+OSM_NATURAL = frozenset({"peak", "volcano"})
+INSERT_BATCH = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    qid TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    mountain INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS osm (
+    osm_type TEXT NOT NULL,
+    osm_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    natural TEXT NOT NULL,
+    wikidata TEXT,
+    wikipedia TEXT,
+    PRIMARY KEY (osm_type, osm_id)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def require_osmium() -> None:
+    if osmium is None:
+        raise RuntimeError("pyosmium is required to read OSM PBF extracts. Install with `python -m pip install osmium`.")
+
+
+def parse_bbox(text: str) -> BBox:
+    parts = [float(part) for part in str(text).split(",")]
+    if len(parts) != 4 or parts[0] >= parts[2] or parts[1] >= parts[3]:
+        raise RuntimeError(f"Invalid bbox (expected south,west,north,east): {text}")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+def in_bbox(lat: float, lon: float, bbox: BBox) -> bool:
+    return bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]
+
+
+def open_text(path: Path):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def iter_dump_entities(path: Path) -> Iterator[Dict[str, Any]]:
+    """Decode one entity per line (array brackets and trailing commas skipped)."""
+    with open_text(path) as handle:
+        for line in handle:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _snak_value(claim: Dict[str, Any]) -> Any:
+    return ((claim.get("mainsnak") or {}).get("datavalue") or {}).get("value")
+
+
+def compact_entity(entity: Dict[str, Any], bbox: BBox) -> Optional[Dict[str, Any]]:
+    """Index record for a dump entity, or None when it is out of the bbox or not a peak."""
+    claims = entity.get("claims") or {}
+    position = next((_snak_value(c) for c in claims.get("P625", ()) if isinstance(_snak_value(c), dict)), None)
+    if not position or position.get("latitude") is None or position.get("longitude") is None:
+        return None
+    lat, lon = float(position["latitude"]), float(position["longitude"])
+    if not in_bbox(lat, lon, bbox):
+        return None
+    classes = {(_snak_value(c) or {}).get("numeric-id") for c in claims.get("P31", ()) if isinstance(_snak_value(c), dict)}
+    mountain = bool(classes & MOUNTAIN_CLASSES)
+    if not mountain and "P3109" not in claims:
+        return None
+    labels = entity.get("labels") or {}
+    label = (labels.get("en") or labels.get("fr") or next(iter(labels.values()), {}) or {}).get("value", "")
+    kept_claims = {
+        pid: [{"mainsnak": {"datavalue": {"value": _snak_value(claims[pid][0])}}}]
+        for pid in KEPT_CLAIMS
+        if claims.get(pid) and _snak_value(claims[pid][0]) is not None
+    }
+    sitelinks = {
+        site: {"title": link["title"]}
+        for site, link in (entity.get("sitelinks") or {}).items()
+        if site in KEPT_SITELINKS and isinstance(link, dict) and link.get("title")
+    }
+    return {
+        "qid": entity.get("id", ""),
+        "label": label,
+        "lat": lat,
+        "lon": lon,
+        "mountain": mountain,
+        "entity": {"claims": kept_claims, "sitelinks": sitelinks},
+    }
+
+
+def iter_wikidata_records(path: Path, bbox: BBox = NORTHEAST_BBOX) -> Iterator[Dict[str, Any]]:
+    for entity in iter_dump_entities(path):
+        record = compact_entity(entity, bbox)
+        if record and record["qid"]:
+            yield record
+
+
+def ingest_osm_pbf(path: Path, sink: Callable[[List[Dict[str, Any]]], None], bbox: BBox = NORTHEAST_BBOX) -> int:
+    """Stream named peak nodes from ``path`` into ``sink`` in batches; returns the count."""
+    require_osmium()
+    batch: List[Dict[str, Any]] = []
+    count = [0]
+
+    class PeakHandler(osmium.SimpleHandler):
+        def node(self, node):
+            tags = node.tags
+            if tags.get("natural") not in OSM_NATURAL or not tags.get("name") or not node.location.valid():
+                return
+            lat, lon = node.location.lat, node.location.lon
+            if not in_bbox(lat, lon, bbox):
+                return
+            batch.append({
+                "osm_type": "node",
+                "osm_id": node.id,
+                "name": tags.get("name"),
+                "lat": lat,
+                "lon": lon,
+                "natural": tags.get("natural"),
+                "wikidata": tags.get("wikidata"),
+                "wikipedia": tags.get("wikipedia"),
+            })
+            count[0] += 1
+            if len(batch) >= INSERT_BATCH:
+                sink(list(batch))
+                batch.clear()
+
+    PeakHandler().apply_file(str(path))
+    if batch:
+        sink(batch)
+    return count[0]
+
+
+class EntityIndex:
+    """SQLite store of ingested peaks, read back as Nominatim rows and Wikidata entities."""
+
+    def __init__(self, path: Path, create: bool = False) -> None:
+        self.path = Path(path)
+        if not create and not self.path.exists():
+            raise RuntimeError(f"Entity index not found: {self.path} (build it with scripts/build-sameas-entity-index.py)")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.executescript(SCHEMA)
+
+    def put_entities(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        batch: List[Tuple[Any, ...]] = []
+        for record in records:
+            batch.append((
+                record["qid"], record["label"], record["lat"], record["lon"], int(record["mountain"]),
+                json.dumps(record["entity"], separators=(",", ":")),
+            ))
+            if len(batch) >= INSERT_BATCH:
+                count += self._insert("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+        return count + self._insert("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)", batch)
+
+    def put_osm(self, nodes: Iterable[Dict[str, Any]]) -> int:
+        rows = [
+            (n["osm_type"], n["osm_id"], n["name"], n["lat"], n["lon"], n["natural"], n.get("wikidata"), n.get("wikipedia"))
+            for n in nodes
+        ]
+        return self._insert("INSERT OR REPLACE INTO osm VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _insert(self, sql: str, rows: List[Tuple[Any, ...]]) -> int:
+        if rows:
+            self._db.executemany(sql, rows)
+            self._db.commit()
+        return len(rows)
+
+    def set_meta(self, **values: Any) -> None:
+        self._insert("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in values.items()])
+
+    def meta(self) -> Dict[str, Any]:
+        return {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM meta")}
+
+    def entity(self, qid: str) -> Dict[str, Any]:
+        row = self._db.execute("SELECT body FROM entities WHERE qid = ?", (qid,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Every OSM peak, then every entity no OSM peak already points at, as Nominatim rows."""
+        rows: List[Dict[str, Any]] = []
+        tagged = set()
+        enwiki = {}
+        for qid, body in self._db.execute("SELECT qid, body FROM entities"):
+            title = (json.loads(body).get("sitelinks", {}).get("enwiki") or {}).get("title")
+            if title:
+                enwiki[qid] = title
+        for osm_type, osm_id, name, lat, lon, natural, wikidata, wikipedia in self._db.execute(
+            "SELECT osm_type, osm_id, name, lat, lon, natural, wikidata, wikipedia FROM osm ORDER BY osm_type, osm_id"
+        ):
+            tags = {key: value for key, value in (("wikidata", wikidata), ("wikipedia", wikipedia)) if value}
+            if wikidata:
+                tagged.add(wikidata)
+                if not wikipedia and wikidata in enwiki:
+                    tags["wikipedia"] = "en:" + enwiki[wikidata]
+            rows.append({
+                "osm_type": osm_type, "osm_id": osm_id, "lat": lat, "lon": lon,
+                "class": "natural", "type": natural, "namedetails": {"name": name}, "extratags": tags,
+            })
+        for qid, label, lat, lon, mountain, body in self._db.execute(
+            "SELECT qid, label, lat, lon, mountain, body FROM entities ORDER BY qid"
+        ):
+            if qid in tagged:
+                continue
+            claims = json.loads(body).get("claims", {})
+            row: Dict[str, Any] = {
+                "place_id": qid, "lat": lat, "lon": lon,
+                "class": "natural" if mountain else "place", "type": "peak" if mountain else "locality",
+                "namedetails": {"name": label}, "extratags": {"wikidata": qid},
+            }
+            for pid, kind in OSM_CLAIMS:
+                value = _snak_value((claims.get(pid) or [{}])[0])
+                if value:
+                    row.update(osm_type=kind, osm_id=value)
+                    break
+            if qid in enwiki:
+                row["extratags"]["wikipedia"] = "en:" + enwiki[qid]
+            rows.append(row)
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        (entities,) = self._db.execute("SELECT COUNT(*) FROM entities").fetchone()
+        (nodes,) = self._db.execute("SELECT COUNT(*) FROM osm").fetchone()
+        return {"entities": int(entities), "osm": int(nodes)}
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def build_entity_index(
+    output: Path,
+    wikidata_dump: Optional[Path] = None,
+    osm_pbf: Optional[Path] = None,
+    bbox: BBox = NORTHEAST_BBOX,
+) -> Dict[str, Any]:
+    """(Re)build ``output`` from the given inputs; returns row counts and timing."""
+    if wikidata_dump is None and osm_pbf is None:
+        raise RuntimeError("Nothing to ingest: pass a Wikidata dump and/or an OSM PBF extract.")
+    for source in (wikidata_dump, osm_pbf):
+        if source is not None and not Path(source).exists():
+            raise RuntimeError(f"Input not found: {source}")
+    started = time.perf_counter()
+    output = Path(output)
+    partial = output.with_name(output.name + ".partial")
+    partial.unlink(missing_ok=True)
+    index = EntityIndex(partial, create=True)
+    try:
+        entities = index.put_entities(iter_wikidata_records(wikidata_dump, bbox)) if wikidata_dump else 0
+        nodes = ingest_osm_pbf(osm_pbf, index.put_osm, bbox) if osm_pbf else 0
+        index.set_meta(
+            bbox=list(bbox),
+            wikidata_dump=str(wikidata_dump or ""),
+            osm_pbf=str(osm_pbf or ""),
+            built_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        )
+    finally:
+        index.close()
+    partial.replace(output)
+    return {"entities": entities, "osm": nodes, "seconds": round(time.perf_counter() - started, 2)}
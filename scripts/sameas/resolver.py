@@ -0,0 +1,127 @@
+"""
+Nominatim search and batched Wikidata entity lookups on top of ``JsonClient``.
+
+``WikidataBatcher.entity(qid)`` returns an awaitable entity. Pending QIDs are
+sent together in one ``wbgetentities`` request as soon as ``batch_size`` (the
+API maximum is 50) are queued or ``linger_s`` after the first one, so entity
+lookups overlap the rate-limited Nominatim searches instead of following them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import urllib.parse
+from typing import Any, Dict, List, Optional
+
+from .client import JsonClient
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+WBGETENTITIES_MAX_IDS = 50
+
+
+def nominatim_search_url(query: str, base: str = NOMINATIM_URL, limit: int = 10) -> str:
+    params = urllib.parse.urlencode({
+        "q": query,
+        "format": "jsonv2",
+        "limit": limit,
+        "addressdetails": 1,
+        "extratags": 1,
+        "namedetails": 1,
+    })
+    return f"{base}?{params}"
+
+
+def wbgetentities_url(qids: List[str], api: str = WIKIDATA_API) -> str:
+    params = urllib.parse.urlencode({
+        "action": "wbgetentities",
+        "ids": "|".join(qids),
+        "props": "claims|sitelinks",
+        "languages": "en|fr",
+        "format": "json",
+        "origin": "*",
+    })
+    return f"{api}?{params}"
+
+
+async def nominatim_search(client: JsonClient, query: str, base: str = NOMINATIM_URL) -> List[Dict[str, Any]]:
+    rows = await client.get_json(nominatim_search_url(query, base))
+    return rows if isinstance(rows, list) else []
+
+
+class WikidataBatcher:
+    """Coalesces concurrent entity lookups into ``wbgetentities`` batches (cached per QID)."""
+
+    def __init__(
+        self,
+        client: JsonClient,
+        api: str = WIKIDATA_API,
+        batch_size: int = WBGETENTITIES_MAX_IDS,
+        linger_s: float = 0.25,
+    ) -> None:
+        self.client = client
+        self.api = api
+        self.batch_size = max(1, min(int(batch_size), WBGETENTITIES_MAX_IDS))
+        self.linger_s = linger_s
+        self.batches = 0
+        self._pending: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    def cache_key(qid: str) -> str:
+        return f"wikidata:{qid}"
+
+    async def entity(self, qid: str) -> Dict[str, Any]:
+        if not qid:
+            return {}
+        cached = self.client.cached(self.cache_key(qid))
+        if cached is not None:
+            return cached
+        future = self._pending.get(qid) or self._inflight.get(qid)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[qid] = future
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.linger_s, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Send every queued QID now (in batches of ``batch_size``)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = dict(list(self._pending.items())[: self.batch_size])
+            for qid in batch:
+                del self._pending[qid]
+            self._inflight.update(batch)
+            self._tasks.append(asyncio.ensure_future(self._run(batch)))
+
+    async def _run(self, batch: Dict[str, "asyncio.Future[Dict[str, Any]]"]) -> None:
+        self.batches += 1
+        try:
+            data = await self.client.fetch_json(wbgetentities_url(list(batch), self.api))
+            entities = data.get("entities", {}) if isinstance(data, dict) else {}
+            results = {qid: entities.get(qid, {}) for qid in batch}
+            self.client.cache.put_many((self.cache_key(qid), entity) for qid, entity in results.items())
+            for qid, future in batch.items():
+                if not future.done():
+                    future.set_result(results[qid])
+        except Exception as exc:  # noqa: BLE001 - every waiter of the batch sees the failure
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            for qid in batch:
+                self._inflight.pop(qid, None)
+
+    async def drain(self) -> None:
+        """Send anything still queued and wait for in-flight batches."""
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks.clear()
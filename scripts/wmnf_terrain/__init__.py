@@ -0,0 +1,6 @@
+"""
+Terrain engine helpers for the WMNF stylized tile build.
+
+The CLI entry point is scripts/build-wmnf-stylized-tiles.py; the modules in
+this package hold the tile-level logic so it can be reused and benchmarked.
+"""
@@ -0,0 +1,246 @@
+"""
+Single-file PMTiles (v3) archive writer for the stylized terrain layers.
+
+Tiles are written in Hilbert tile-id order (clustered), identical tile
+contents are stored once and consecutive duplicates collapse into run-length
+directory entries. The archive can be uploaded as one object and read with
+HTTP range requests.
+
+Spec: https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .tiles import iter_tile_files
+
+HEADER_SIZE = 127
+MAX_ROOT_DIRECTORY_BYTES = 16384 - HEADER_SIZE
+
+COMPRESSION_NONE = 1
+COMPRESSION_GZIP = 2
+
+TILE_TYPES = {
+    "mvt": 1,
+    "png": 2,
+    "jpg": 3,
+    "webp": 4,
+}
+
+
+@dataclass
+class Entry:
+    tile_id: int
+    offset: int
+    length: int
+    run_length: int
+
+
+def zxy_to_tile_id(z: int, x: int, y: int) -> int:
+    """Hilbert tile id: all tiles of lower zooms first, then the Hilbert index within z."""
+    acc = ((1 << (2 * z)) - 1) // 3
+    n = 1 << z
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return acc + d
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def serialize_directory(entries: List[Entry]) -> bytes:
+    buffer = bytearray()
+    write_varint(buffer, len(entries))
+    last_id = 0
+    for entry in entries:
+        write_varint(buffer, entry.tile_id - last_id)
+        last_id = entry.tile_id
+    for entry in entries:
+        write_varint(buffer, entry.run_length)
+    for entry in entries:
+        write_varint(buffer, entry.length)
+    for index, entry in enumerate(entries):
+        previous = entries[index - 1] if index else None
+        if previous is not None and entry.offset == previous.offset + previous.length:
+            write_varint(buffer, 0)
+        else:
+            write_varint(buffer, entry.offset + 1)
+    return gzip.compress(bytes(buffer), mtime=0)
+
+
+def _build_leaves(entries: List[Entry], leaf_size: int) -> Tuple[bytes, bytes, int]:
+    root_entries: List[Entry] = []
+    leaves = bytearray()
+    leaf_count = 0
+    for start in range(0, len(entries), leaf_size):
+        chunk = entries[start:start + leaf_size]
+        serialized = serialize_directory(chunk)
+        root_entries.append(Entry(chunk[0].tile_id, len(leaves), len(serialized), 0))
+        leaves.extend(serialized)
+        leaf_count += 1
+    return serialize_directory(root_entries), bytes(leaves), leaf_count
+
+
+def optimize_directories(entries: List[Entry]) -> Tuple[bytes, bytes, int]:
+    """Return (root, leaves, leaf_count); leaves are only used when the root would not fit."""
+    root = serialize_directory(entries)
+    if len(root) <= MAX_ROOT_DIRECTORY_BYTES:
+        return root, b"", 0
+    leaf_size = 4096
+    while True:
+        root, leaves, leaf_count = _build_leaves(entries, leaf_size)
+        if len(root) <= MAX_ROOT_DIRECTORY_BYTES:
+            return root, leaves, leaf_count
+        leaf_size = int(leaf_size * 1.2)
+
+
+def iter_directory_tiles(layer_root: Path, suffix: str, shared_index: Optional[Dict] = None) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Yield (z, x, y, data) for an XYZ directory, expanding any shared-blob tile index."""
+    for tid, path in iter_tile_files(layer_root, suffix):
+        z, x, y = (int(part) for part in tid.split("/"))
+        yield z, x, y, path.read_bytes()
+    if shared_index:
+        shared_root = layer_root / shared_index.get("shared_dir", "_shared")
+        for blob_name, tile_ids in shared_index.get("blobs", {}).items():
+            data = (shared_root / blob_name).read_bytes()
+            for tid in tile_ids:
+                z, x, y = (int(part) for part in tid.split("/"))
+                yield z, x, y, data
+
+
+def write_pmtiles(
+    output_path: Path,
+    tiles: Iterable[Tuple[int, int, int, bytes]],
+    tile_type: str,
+    bounds_wgs84: Dict[str, float],
+    metadata: Dict,
+) -> Dict:
+    """
+    Write a clustered, deduplicated PMTiles v3 archive and return its summary
+    (suitable for the stylized metadata.json "archives" block).
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryFile(dir=output_path.parent) as staged, tempfile.TemporaryFile(dir=output_path.parent) as tile_data:
+        # Pass 1: stage each distinct tile body once, in arrival order, so only
+        # ids and digests stay in memory.
+        staged_offsets: Dict[str, Tuple[int, int]] = {}
+        addressed: List[Tuple[int, str]] = []
+        min_zoom, max_zoom = 255, 0
+        staged_length = 0
+        all_gzip = True
+        for z, x, y, data in tiles:
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in staged_offsets:
+                staged_offsets[digest] = (staged_length, len(data))
+                staged.write(data)
+                staged_length += len(data)
+                all_gzip = all_gzip and data[:2] == b"\x1f\x8b"
+            addressed.append((zxy_to_tile_id(z, x, y), digest))
+            min_zoom, max_zoom = min(min_zoom, z), max(max_zoom, z)
+        if not addressed:
+            raise RuntimeError(f"No tiles to archive for {output_path.name}.")
+        addressed.sort()
+
+        # Pass 2: lay tile bodies out in tile-id order (clustered) and build
+        # run-length directory entries.
+        entries: List[Entry] = []
+        content_offsets: Dict[str, Tuple[int, int]] = {}
+        tile_data_length = 0
+        for tile_id, digest in addressed:
+            known = content_offsets.get(digest)
+            if known is None:
+                staged_offset, length = staged_offsets[digest]
+                staged.seek(staged_offset)
+                tile_data.write(staged.read(length))
+                known = (tile_data_length, length)
+                content_offsets[digest] = known
+                tile_data_length += length
+            offset, length = known
+            last = entries[-1] if entries else None
+            if last is not None and last.offset == offset and last.tile_id + last.run_length == tile_id:
+                last.run_length += 1
+            else:
+                entries.append(Entry(tile_id, offset, length, 1))
+
+        root, leaves, leaf_count = optimize_directories(entries)
+        metadata_bytes = gzip.compress(json.dumps(metadata, sort_keys=True).encode("utf-8"), mtime=0)
+
+        root_offset = HEADER_SIZE
+        metadata_offset = root_offset + len(root)
+        leaves_offset = metadata_offset + len(metadata_bytes)
+        tile_data_offset = leaves_offset + len(leaves)
+
+        header = struct.pack(
+            "<7sBQQQQQQQQQQQBBBBBBiiiiBii",
+            b"PMTiles",
+            3,
+            root_offset,
+            len(root),
+            metadata_offset,
+            len(metadata_bytes),
+            leaves_offset,
+            len(leaves),
+            tile_data_offset,
+            tile_data_length,
+            len(addressed),
+            len(entries),
+            len(content_offsets),
+            1,
+            COMPRESSION_GZIP,
+            COMPRESSION_GZIP if all_gzip else COMPRESSION_NONE,
+            TILE_TYPES.get(tile_type, 0),
+            min_zoom,
+            max_zoom,
+            int(round(bounds_wgs84["minLon"] * 1e7)),
+            int(round(bounds_wgs84["minLat"] * 1e7)),
+            int(round(bounds_wgs84["maxLon"] * 1e7)),
+            int(round(bounds_wgs84["maxLat"] * 1e7)),
+            min_zoom,
+            int(round((bounds_wgs84["minLon"] + bounds_wgs84["maxLon"]) / 2.0 * 1e7)),
+            int(round((bounds_wgs84["minLat"] + bounds_wgs84["maxLat"]) / 2.0 * 1e7)),
+        )
+
+        tile_data.seek(0)
+        with output_path.open("wb") as output:
+            output.write(header)
+            output.write(root)
+            output.write(metadata_bytes)
+            output.write(leaves)
+            for chunk in iter(lambda: tile_data.read(1024 * 1024), b""):
+                output.write(chunk)
+
+    return {
+        "format": "pmtiles",
+        "spec_version": 3,
+        "path": output_path.name,
+        "tile_type": tile_type,
+        "tile_compression": "gzip" if all_gzip else "none",
+        "clustered": True,
+        "addressed_tiles": len(addressed),
+        "tile_entries": len(entries),
+        "tile_contents": len(content_offsets),
+        "leaf_directories": leaf_count,
+        "bytes": output_path.stat().st_size,
+    }
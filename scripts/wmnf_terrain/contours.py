@@ -0,0 +1,426 @@
+"""
+Contour generation, streaming and annotation.
+
+Contours are read and written one feature at a time so memory stays flat no
+matter how dense the contour set is. Output is newline-delimited GeoJSON
+(GeoJSONSeq), which tippecanoe reads directly (and in parallel with -P).
+
+The native engine traces contours with a vectorized marching-squares pass
+over DEM blocks and emits zoom-banded features: major levels only below
+``minor_min_zoom``, each geometry simplified with Douglas-Peucker at roughly
+one screen pixel for its zoom.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from .dem import DemRaster, mercator_to_lonlat, np, require_numpy
+
+FEET_PER_METER = 3.28084
+METERS_PER_FOOT = 0.3048
+WEB_MERCATOR_WORLD_M = 2.0 * 3.141592653589793 * 6378137.0
+READ_CHUNK_CHARS = 1024 * 1024
+CONTOUR_BLOCK_SIZE = 1024
+
+_seq_skip_re = re.compile(r"[\s\x1e]*")
+_array_skip_re = re.compile(r"[\s,]*")
+_collection_re = re.compile(r'"type"\s*:\s*"FeatureCollection"|"features"\s*:\s*\[')
+_feature_re = re.compile(r'"type"\s*:\s*"Feature"')
+
+
+def _iter_json_values(handle: IO[str], buffer: str, pos: int, skip_re: re.Pattern, stop: str = "") -> Iterator[Dict]:
+    """Decode consecutive JSON values from a text stream, refilling the buffer as needed."""
+    decoder = json.JSONDecoder()
+    while True:
+        pos = skip_re.match(buffer, pos).end()
+        if pos >= len(buffer):
+            chunk = handle.read(READ_CHUNK_CHARS)
+            if not chunk:
+                if stop:
+                    raise RuntimeError("Truncated contour GeoJSON (features list not closed).")
+                return
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        if stop and buffer[pos] == stop:
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = handle.read(READ_CHUNK_CHARS)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield value
+        pos = end
+
+
+def iter_geojson_features(path: Path) -> Iterator[Dict]:
+    """
+    Yield features from GeoJSONSeq/newline-delimited GeoJSON or from a
+    FeatureCollection document, without loading the whole file.
+    """
+    with path.open("r", encoding="utf-8") as handle:
+        buffer = handle.read(READ_CHUNK_CHARS)
+        collection = _collection_re.search(buffer)
+        feature = _feature_re.search(buffer)
+        if collection is None or (feature is not None and feature.start() < collection.start()):
+            yield from _iter_json_values(handle, buffer, 0, _seq_skip_re)
+            return
+
+        while True:
+            match = re.search(r'"features"\s*:\s*\[', buffer)
+            if match is not None:
+                break
+            chunk = handle.read(READ_CHUNK_CHARS)
+            if not chunk:
+                raise RuntimeError("Unexpected contour GeoJSON structure (missing features list).")
+            buffer += chunk
+        yield from _iter_json_values(handle, buffer, match.end(), _array_skip_re, stop="]")
+
+
+def write_geojson_seq(path: Path, features: Iterable[Dict]) -> int:
+    """Write one compact feature per line; returns the feature count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with path.open("w", encoding="utf-8", newline="\n") as handle:
+        for feature in features:
+            handle.write(json.dumps(feature, separators=(",", ":"), sort_keys=True))
+            handle.write("\n")
+            count += 1
+    return count
+
+
+def contour_properties(elev_m: float, minor_ft: int, major_ft: int) -> Dict:
+    major_every = max(1, int(round(float(major_ft) / float(minor_ft))))
+    elev_ft = elev_m * FEET_PER_METER
+    level = int(round(elev_ft / float(minor_ft)))
+    is_major = 1 if level % major_every == 0 else 0
+    return {
+        "elevation_ft": int(round(elev_ft)),
+        "elevation_m": round(elev_m, 2),
+        "interval_ft": int(minor_ft),
+        "is_major": is_major,
+        "contour_type": "major" if is_major else "minor",
+        "level": level,
+    }
+
+
+def _feature_elevation_m(feature: Dict) -> Optional[float]:
+    props = feature.get("properties") or {}
+    elev_m = props.get("elev_m")
+    if elev_m is None:
+        elev_m = props.get("ELEV")
+    if elev_m is None:
+        elev_m = props.get("elev")
+    try:
+        return float(elev_m)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_annotated_contours(features: Iterable[Dict], minor_ft: int, major_ft: int) -> Iterator[Dict]:
+    for feature in features:
+        if not isinstance(feature, dict):
+            continue
+        elev_m = _feature_elevation_m(feature)
+        if elev_m is None:
+            continue
+        feature["properties"] = contour_properties(elev_m, minor_ft, major_ft)
+        yield feature
+
+
+def annotate_contours(raw_geojson: Path, output_geojson: Path, minor_ft: int, major_ft: int) -> int:
+    """Stream raw gdal_contour output into annotated GeoJSONSeq; returns the feature count."""
+    features = iter_geojson_features(raw_geojson)
+    return write_geojson_seq(output_geojson, iter_annotated_contours(features, minor_ft, major_ft))
+
+
+# Marching squares. Corner bits: tl=8, tr=4, br=2, bl=1. Edges: 0=top,
+# 1=right, 2=bottom, 3=left. Each case maps to up to two (start, end) edge
+# pairs; keys 16+5 / 16+10 are the saddle cases when the cell centre is above
+# the level. Segments are oriented so higher ground is always on the same
+# side, which makes every crossing the end of exactly one segment and the
+# start of exactly one other, so lines stitch with a successor lookup.
+_CASE_EDGES = {
+    1: [(3, 2)], 2: [(2, 1)], 3: [(3, 1)], 4: [(1, 0)], 5: [(3, 0), (1, 2)],
+    6: [(2, 0)], 7: [(3, 0)], 8: [(0, 3)], 9: [(0, 2)], 10: [(0, 1), (2, 3)],
+    11: [(0, 1)], 12: [(1, 3)], 13: [(1, 2)], 14: [(2, 3)],
+    16 + 5: [(3, 2), (1, 0)], 16 + 10: [(0, 3), (2, 1)],
+}
+_EDGE_MIDPOINTS = {0: (0.5, 0.0), 1: (1.0, 0.5), 2: (0.5, 1.0), 3: (0.0, 0.5)}
+_CORNERS = {8: (0.0, 0.0), 4: (1.0, 0.0), 2: (1.0, 1.0), 1: (0.0, 1.0)}
+_EDGE_CORNERS = {0: (8, 4), 1: (4, 2), 2: (1, 2), 3: (8, 1)}
+
+
+def _orient(case: int, start: int, end: int) -> Tuple[int, int]:
+    """Order an edge pair so corners at/above the level lie to the left."""
+    bits = case & 15
+    shared = set(_EDGE_CORNERS[start]) & set(_EDGE_CORNERS[end])
+    corner = shared.pop() if shared else next(c for c in _CORNERS if bits & c)
+    (ax, ay), (bx, by) = _EDGE_MIDPOINTS[start], _EDGE_MIDPOINTS[end]
+    cx, cy = _CORNERS[corner]
+    cross = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    high = bool(bits & corner)
+    return (start, end) if (cross < 0) == high else (end, start)
+
+
+def _build_segment_table() -> "np.ndarray":
+    table = np.full((32, 2, 2), -1, dtype=np.int8)
+    for case, pairs in _CASE_EDGES.items():
+        for slot, (start, end) in enumerate(pairs):
+            table[case, slot] = _orient(case, start, end)
+    return table
+
+
+_SEGMENT_TABLE = _build_segment_table() if np is not None else None
+
+
+def _edge_points(
+    edge: "np.ndarray", i: "np.ndarray", j: "np.ndarray", corners: Tuple["np.ndarray", ...], level: float, n_rows: int, n_cols: int
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Return (edge_id, row, col) of the level crossing on each cell edge."""
+    tl, tr, br, bl = corners
+    # Edge endpoints (a, b) and the fractional direction of travel from a.
+    a = np.select([edge == 0, edge == 1, edge == 2], [tl, tr, bl], tl)
+    b = np.select([edge == 0, edge == 1, edge == 2], [tr, br, br], bl)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(b != a, (level - a) / (b - a), 0.5)
+    t = np.clip(t, 0.0, 1.0)
+    rows = np.select([edge == 0, edge == 1, edge == 2], [i + 0.0, i + t, i + 1.0], i + t)
+    cols = np.select([edge == 0, edge == 1, edge == 2], [j + t, j + 1.0, j + t], j + 0.0)
+    horizontal_count = (n_rows + 1) * n_cols
+    ids = np.select(
+        [edge == 0, edge == 1, edge == 2],
+        [i * n_cols + j, horizontal_count + i * (n_cols + 1) + j + 1, (i + 1) * n_cols + j],
+        horizontal_count + i * (n_cols + 1) + j,
+    )
+    return ids, rows, cols
+
+
+def trace_level(block: "np.ndarray", level: float) -> List["np.ndarray"]:
+    """
+    Trace one contour level through a DEM block with vectorized marching
+    squares. Returns polylines as (N, 2) arrays of fractional (row, col).
+    """
+    tl, tr, br, bl = block[:-1, :-1], block[:-1, 1:], block[1:, 1:], block[1:, :-1]
+    n_rows, n_cols = tl.shape
+    with np.errstate(invalid="ignore"):
+        case = (
+            (tl >= level).astype(np.int8) * 8
+            + (tr >= level).astype(np.int8) * 4
+            + (br >= level).astype(np.int8) * 2
+            + (bl >= level).astype(np.int8)
+        )
+    case[np.isnan(tl) | np.isnan(tr) | np.isnan(br) | np.isnan(bl)] = 0
+    i, j = np.nonzero((case != 0) & (case != 15))
+    if i.size == 0:
+        return []
+    cell_case = case[i, j].astype(np.int16)
+    corners = (tl[i, j], tr[i, j], br[i, j], bl[i, j])
+    saddle = (cell_case == 5) | (cell_case == 10)
+    if saddle.any():
+        centre = (corners[0] + corners[1] + corners[2] + corners[3]) / 4.0
+        cell_case = np.where(saddle & (centre >= level), cell_case + 16, cell_case)
+
+    starts, ends, start_rows, start_cols, end_rows, end_cols = [], [], [], [], [], []
+    for slot in (0, 1):
+        pairs = _SEGMENT_TABLE[cell_case, slot]
+        used = pairs[:, 0] >= 0
+        if not used.any():
+            continue
+        ci, cj = i[used], j[used]
+        cell_corners = tuple(corner[used] for corner in corners)
+        s_id, s_row, s_col = _edge_points(pairs[used, 0], ci, cj, cell_corners, level, n_rows, n_cols)
+        e_id, e_row, e_col = _edge_points(pairs[used, 1], ci, cj, cell_corners, level, n_rows, n_cols)
+        starts.append(s_id)
+        ends.append(e_id)
+        start_rows.append(s_row)
+        start_cols.append(s_col)
+        end_rows.append(e_row)
+        end_cols.append(e_col)
+
+    start_ids = np.concatenate(starts)
+    end_ids = np.concatenate(ends)
+    points_row = np.concatenate(start_rows)
+    points_col = np.concatenate(start_cols)
+    last_row = np.concatenate(end_rows)
+    last_col = np.concatenate(end_cols)
+
+    order = np.argsort(start_ids, kind="stable")
+    sorted_starts = start_ids[order]
+    position = np.clip(np.searchsorted(sorted_starts, end_ids), 0, len(order) - 1)
+    successor = np.where(sorted_starts[position] == end_ids, order[position], -1)
+    has_predecessor = np.zeros(len(start_ids), dtype=bool)
+    has_predecessor[successor[successor >= 0]] = True
+
+    successor_list = successor.tolist()
+    visited = bytearray(len(successor_list))
+    lines: List[np.ndarray] = []
+    heads = np.nonzero(~has_predecessor)[0].tolist() + list(range(len(successor_list)))
+    for head in heads:
+        if visited[head]:
+            continue
+        chain = []
+        segment = head
+        while segment != -1 and not visited[segment]:
+            visited[segment] = 1
+            chain.append(segment)
+            segment = successor_list[segment]
+        index = np.asarray(chain)
+        rows = np.append(points_row[index], last_row[index[-1]])
+        cols = np.append(points_col[index], last_col[index[-1]])
+        lines.append(np.column_stack((rows, cols)))
+    return lines
+
+
+def douglas_peucker(points: "np.ndarray", tolerance: float) -> "np.ndarray":
+    """Simplify an (N, 2) polyline, keeping points farther than ``tolerance`` from the chord."""
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return points
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last <= first + 1:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        chord = end - start
+        chord_length = float(np.hypot(chord[0], chord[1]))
+        if chord_length == 0.0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            distances = np.abs(chord[0] * (inner[:, 1] - start[1]) - chord[1] * (inner[:, 0] - start[0])) / chord_length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return points[keep]
+
+
+def zoom_tolerance_m(zoom: int, pixels: float = 1.0) -> float:
+    """Ground distance of ``pixels`` screen pixels (256 px tiles) at ``zoom``."""
+    return WEB_MERCATOR_WORLD_M / (256.0 * (1 << zoom)) * pixels
+
+
+def contour_levels_ft(block: "np.ndarray", minor_ft: int) -> List[int]:
+    finite = block[np.isfinite(block)]
+    if finite.size == 0:
+        return []
+    low = int(np.ceil(float(finite.min()) * FEET_PER_METER / minor_ft))
+    high = int(np.floor(float(finite.max()) * FEET_PER_METER / minor_ft))
+    return [level * minor_ft for level in range(low, high + 1)]
+
+
+def aligned_block_starts(offset: int, length: int, block_size: int) -> List[int]:
+    """Local block starts snapped to multiples of ``block_size`` in the world pixel grid."""
+    starts = list(range((-offset) % block_size, max(1, length - 1), block_size))
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    return starts
+
+
+def iter_dem_blocks(dem: DemRaster, block_size: int) -> Iterator[Tuple[int, int, "np.ndarray"]]:
+    """
+    Yield (row0, col0, block) with a one-pixel overlap so adjacent blocks share
+    edges. Blocks are aligned to the world pixel grid, so a line's extent (and
+    therefore its simplification) does not move when the bbox grows.
+    """
+    row_offset, col_offset = dem.global_offset
+    for row0 in aligned_block_starts(row_offset, dem.rows, block_size):
+        for col0 in aligned_block_starts(col_offset, dem.cols, block_size):
+            block = np.asarray(dem.data[row0:row0 + block_size + 1, col0:col0 + block_size + 1], dtype=np.float64)
+            if block.shape[0] >= 2 and block.shape[1] >= 2:
+                yield row0, col0, block
+
+
+def iter_zoom_banded_lines(
+    line_m: "np.ndarray", is_major: bool, min_zoom: int, max_zoom: int, minor_min_zoom: int, simplify_px: float
+) -> Iterator[Tuple[int, int, "np.ndarray"]]:
+    """
+    Yield (minzoom, maxzoom, coords) for one contour in EPSG:3857 metres.
+    Consecutive zooms whose simplified geometry is identical share a band;
+    lines smaller than two pixels at a zoom are skipped there.
+    """
+    band: Optional[Tuple[int, "np.ndarray"]] = None
+    first_zoom = min_zoom if is_major else max(min_zoom, minor_min_zoom)
+    extent = float(np.max(line_m.max(axis=0) - line_m.min(axis=0)))
+    for zoom in range(first_zoom, max_zoom + 1):
+        tolerance = zoom_tolerance_m(zoom, simplify_px)
+        simplified = douglas_peucker(line_m, tolerance) if extent >= 2.0 * tolerance else None
+        if simplified is not None and len(simplified) < 2:
+            simplified = None
+        if band is not None and (simplified is None or len(simplified) != len(band[1])):
+            yield band[0], zoom - 1, band[1]
+            band = None
+        if simplified is not None and band is None:
+            band = (zoom, simplified)
+    if band is not None:
+        yield band[0], max_zoom, band[1]
+
+
+def iter_native_contour_features(
+    dem: DemRaster,
+    minor_ft: int,
+    major_ft: int,
+    min_zoom: int,
+    max_zoom: int,
+    minor_min_zoom: int,
+    simplify_px: float = 1.0,
+    block_size: int = CONTOUR_BLOCK_SIZE,
+) -> Iterator[Dict]:
+    """
+    Trace contours block by block and yield GeoJSON features carrying
+    tippecanoe minzoom/maxzoom hints for their simplification band.
+    """
+    require_numpy()
+    major_every = max(1, int(round(float(major_ft) / float(minor_ft))))
+    for row0, col0, block in iter_dem_blocks(dem, block_size):
+        for level_ft in contour_levels_ft(block, minor_ft):
+            is_major = (level_ft // minor_ft) % major_every == 0
+            if not is_major and minor_min_zoom > max_zoom:
+                continue
+            elev_m = level_ft * METERS_PER_FOOT
+            properties = contour_properties(elev_m, minor_ft, major_ft)
+            for line in trace_level(block, elev_m):
+                xs, ys = dem.pixel_to_mercator(line[:, 0] + row0, line[:, 1] + col0)
+                line_m = np.column_stack((xs, ys))
+                for band_min, band_max, coords in iter_zoom_banded_lines(
+                    line_m, is_major, min_zoom, max_zoom, minor_min_zoom, simplify_px
+                ):
+                    lons, lats = mercator_to_lonlat(coords[:, 0], coords[:, 1])
+                    yield {
+                        "type": "Feature",
+                        "tippecanoe": {"minzoom": band_min, "maxzoom": band_max},
+                        "properties": properties,
+                        "geometry": {
+                            "type": "LineString",
+                            "coordinates": np.round(np.column_stack((lons, lats)), 7).tolist(),
+                        },
+                    }
+
+
+def generate_native_contours(
+    dem: DemRaster,
+    output_geojson: Path,
+    minor_ft: int,
+    major_ft: int,
+    min_zoom: int,
+    max_zoom: int,
+    minor_min_zoom: int,
+    simplify_px: float = 1.0,
+) -> int:
+    """Write zoom-banded native contours as GeoJSONSeq; returns the feature count."""
+    features = iter_native_contour_features(
+        dem, minor_ft, major_ft, min_zoom, max_zoom, minor_min_zoom, simplify_px=simplify_px
+    )
+    return write_geojson_seq(output_geojson, features)
@@ -0,0 +1,347 @@
+"""
+Terrain build coverage from any set of peak and trail datasets.
+
+Coordinates are pulled from every entry of the given JSON files (overlay
+``latitude``/``longitude``, ``lat``/``lon`` pairs, "lat, lon" ``Coordinates``
+strings, trail ``geometry`` point lists and GeoJSON geometries) into one
+(N, 2) NumPy array, and everything downstream is vectorized over it:
+
+- ``padded_bounds``: the single padded rectangle the build has always used;
+- ``coverage_tiles``: every tile at a planning zoom within the padding of
+  some coordinate, so trails and outlying peaks are covered by the tiles they
+  need instead of one large rectangle;
+- ``merge_tile_boxes`` / ``padded_hull``: compact descriptions of that
+  coverage (a few rectangles, a convex hull) for metadata and clients.
+
+``TileCoverage.contains`` filters tile pyramids and ``mask_dem`` blanks DEM
+pixels outside the covered tiles so no stage spends time on them.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Sequence, Tuple
+
+from .dem import EARTH_RADIUS_M, WEB_MERCATOR_HALF_M, DemRaster, np, require_numpy
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON_EQUATOR = 111.320
+MAX_MERCATOR_LAT = 85.05112878
+MASK_BAND_ROWS = 1024
+
+POINT_KEY_PAIRS = (("latitude", "longitude"), ("lat", "lon"), ("lat", "lng"))
+COORDINATE_STRING_KEYS = ("Coordinates", "coordinates")
+
+
+def _iter_entries(payload) -> Iterator[Dict]:
+    """Entries of a dataset: dict values, list items or GeoJSON features."""
+    if isinstance(payload, dict):
+        if payload.get("type") == "FeatureCollection":
+            yield from (feature for feature in payload.get("features") or [] if isinstance(feature, dict))
+            return
+        if payload.get("type") == "Feature":
+            yield payload
+            return
+        values: Iterable = payload.values()
+    elif isinstance(payload, list):
+        values = payload
+    else:
+        return
+    for entry in values:
+        if isinstance(entry, dict):
+            yield entry
+
+
+def _geojson_positions(coordinates) -> Iterator[Tuple[float, float]]:
+    """(lat, lon) of every position in nested GeoJSON ``coordinates`` ([lon, lat, ...])."""
+    if not isinstance(coordinates, list) or not coordinates:
+        return
+    if isinstance(coordinates[0], (int, float)):
+        if len(coordinates) >= 2:
+            yield coordinates[1], coordinates[0]
+        return
+    for child in coordinates:
+        yield from _geojson_positions(child)
+
+
+def _entry_coordinates(entry: Dict) -> Iterator[Tuple[float, float]]:
+    for lat_key, lon_key in POINT_KEY_PAIRS:
+        if lat_key in entry and lon_key in entry:
+            yield entry[lat_key], entry[lon_key]
+            break
+    for key in COORDINATE_STRING_KEYS:
+        text = entry.get(key)
+        if isinstance(text, str) and "," in text:
+            lat_text, _, lon_text = text.partition(",")
+            try:
+                yield float(lat_text), float(lon_text)
+            except ValueError:
+                pass
+            break
+    geometry = entry.get("geometry")
+    if isinstance(geometry, dict):
+        yield from _geojson_positions(geometry.get("coordinates"))
+    elif isinstance(geometry, list):
+        for vertex in geometry:
+            if isinstance(vertex, dict):
+                yield vertex.get("lat"), vertex.get("lon", vertex.get("lng"))
+            elif isinstance(vertex, (list, tuple)) and len(vertex) >= 2:
+                yield vertex[1], vertex[0]
+
+
+def extract_points(payload) -> "np.ndarray":
+    """(N, 2) float64 array of valid (lat, lon) pairs found anywhere in ``payload``."""
+    require_numpy()
+    raw = [pair for entry in _iter_entries(payload) for pair in _entry_coordinates(entry)]
+    if not raw:
+        return np.empty((0, 2))
+    points = np.array(
+        [(lat, lon) if isinstance(lat, (int, float)) and isinstance(lon, (int, float)) else (np.nan, np.nan) for lat, lon in raw],
+        dtype=np.float64,
+    )
+    valid = (
+        np.isfinite(points).all(axis=1)
+        & (np.abs(points[:, 0]) <= 90.0)
+        & (np.abs(points[:, 1]) <= 180.0)
+        # 0, 0 is a placeholder in several datasets, never a real summit here.
+        & ~((points[:, 0] == 0.0) & (points[:, 1] == 0.0))
+    )
+    return points[valid]
+
+
+def expand_sources(patterns: Sequence[str], root: Path) -> List[Path]:
+    """Resolve dataset paths and glob patterns (relative to ``root``) in order, without duplicates."""
+    paths: List[Path] = []
+    for pattern in patterns:
+        candidate = Path(pattern).expanduser()
+        if not candidate.is_absolute():
+            candidate = root / candidate
+        matches = sorted(Path(match) for match in glob.glob(str(candidate))) if glob.has_magic(str(candidate)) else [candidate]
+        if not matches:
+            raise RuntimeError(f"Coverage source pattern matched no files: {pattern}")
+        for match in matches:
+            resolved = match.resolve()
+            if not resolved.exists():
+                raise RuntimeError(f"Coverage source not found: {resolved}")
+            if resolved not in paths:
+                paths.append(resolved)
+    return paths
+
+
+def load_points(paths: Sequence[Path], root: Path) -> Tuple["np.ndarray", List[Dict]]:
+    """Stack the coordinates of every dataset; returns (points, per-source summary)."""
+    require_numpy()
+    stacks = []
+    sources = []
+    for path in paths:
+        with path.open("r", encoding="utf-8-sig") as handle:
+            points = extract_points(json.load(handle))
+        try:
+            label = path.relative_to(root).as_posix()
+        except ValueError:
+            label = str(path)
+        sources.append({"path": label, "point_count": int(len(points))})
+        stacks.append(points)
+    points = np.concatenate(stacks) if stacks else np.empty((0, 2))
+    if not len(points):
+        raise RuntimeError("No valid latitude/longitude points found in the coverage sources.")
+    return points, sources
+
+
+def _padding_deg(lats: "np.ndarray", padding_km: float) -> Tuple["np.ndarray", "np.ndarray"]:
+    lat_pad = np.full(lats.shape, padding_km / KM_PER_DEG_LAT)
+    lon_pad = padding_km / np.maximum(0.01, KM_PER_DEG_LON_EQUATOR * np.cos(np.radians(lats)))
+    return lat_pad, lon_pad
+
+
+def padded_bounds(points: "np.ndarray", padding_km: float) -> Dict[str, float]:
+    """Single padded bbox around all points (the original bounds contract)."""
+    min_lat, min_lon = points.min(axis=0)
+    max_lat, max_lon = points.max(axis=0)
+    center_lat = (min_lat + max_lat) / 2.0
+    lat_pad, lon_pad = _padding_deg(np.array([center_lat]), padding_km)
+    return {
+        "min_lat": max(-90.0, float(min_lat - lat_pad[0])),
+        "max_lat": min(90.0, float(max_lat + lat_pad[0])),
+        "min_lon": max(-180.0, float(min_lon - lon_pad[0])),
+        "max_lon": min(180.0, float(max_lon + lon_pad[0])),
+        "center_lat": float(center_lat),
+        "center_lon": float((min_lon + max_lon) / 2.0),
+        "padding_km": padding_km,
+    }
+
+
+def _to_mercator(lats: "np.ndarray", lons: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    clipped = np.radians(np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    return EARTH_RADIUS_M * np.radians(lons), EARTH_RADIUS_M * np.log(np.tan(math.pi / 4.0 + clipped / 2.0))
+
+
+def coverage_tiles(points: "np.ndarray", padding_km: float, zoom: int) -> "np.ndarray":
+    """
+    Unique (x, y) tiles at ``zoom`` touched by the padding square around any
+    point, as a sorted (K, 2) int64 array.
+    """
+    require_numpy()
+    xs, ys = _to_mercator(points[:, 0], points[:, 1])
+    # Mercator stretches distances by 1 / cos(lat).
+    pad_m = padding_km * 1000.0 / np.maximum(0.01, np.cos(np.radians(points[:, 0])))
+    tile_m = 2.0 * WEB_MERCATOR_HALF_M / (1 << zoom)
+    last = (1 << zoom) - 1
+    x0 = np.clip(np.floor((xs - pad_m + WEB_MERCATOR_HALF_M) / tile_m), 0, last).astype(np.int64)
+    x1 = np.clip(np.floor((xs + pad_m + WEB_MERCATOR_HALF_M) / tile_m), 0, last).astype(np.int64)
+    y0 = np.clip(np.floor((WEB_MERCATOR_HALF_M - ys - pad_m) / tile_m), 0, last).astype(np.int64)
+    y1 = np.clip(np.floor((WEB_MERCATOR_HALF_M - ys + pad_m) / tile_m), 0, last).astype(np.int64)
+    # Points span at most a few tiles each, so loop over offsets and mask.
+    found = []
+    for dx in range(int((x1 - x0).max()) + 1):
+        for dy in range(int((y1 - y0).max()) + 1):
+            inside = (x0 + dx <= x1) & (y0 + dy <= y1)
+            found.append(np.column_stack((x0[inside] + dx, y0[inside] + dy)))
+    return np.unique(np.concatenate(found), axis=0)
+
+
+def bounds_tile_count(bounds: Dict[str, float], zoom: int) -> int:
+    """Tiles at ``zoom`` covered by a ``padded_bounds`` rectangle (for comparison with coverage)."""
+    xs, ys = _to_mercator(
+        np.array([bounds["min_lat"], bounds["max_lat"]]), np.array([bounds["min_lon"], bounds["max_lon"]])
+    )
+    tile_m = 2.0 * WEB_MERCATOR_HALF_M / (1 << zoom)
+    columns = np.floor((xs + WEB_MERCATOR_HALF_M) / tile_m)
+    rows = np.floor((WEB_MERCATOR_HALF_M - ys) / tile_m)
+    return int((columns[1] - columns[0] + 1) * (rows[0] - rows[1] + 1))
+
+
+def tile_bounds_wgs84(zoom: int, x0: int, y0: int, x1: int, y1: int) -> Dict[str, float]:
+    """Lon/lat bounds of the inclusive tile range [x0, x1] x [y0, y1]."""
+    scale = float(1 << zoom)
+
+    def lat(y: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / scale))))
+
+    return {
+        "minLon": round(x0 / scale * 360.0 - 180.0, 6),
+        "maxLon": round((x1 + 1) / scale * 360.0 - 180.0, 6),
+        "minLat": round(lat(y1 + 1), 6),
+        "maxLat": round(lat(y0), 6),
+    }
+
+
+def merge_tile_boxes(tiles: "np.ndarray", zoom: int) -> List[Dict]:
+    """
+    Describe a tile set as rectangles: horizontal runs per row, merged down
+    through consecutive rows with the same run.
+    """
+    runs: Dict[int, List[Tuple[int, int]]] = {}
+    for y in np.unique(tiles[:, 1]).tolist():
+        xs = np.sort(tiles[tiles[:, 1] == y, 0])
+        breaks = np.nonzero(np.diff(xs) > 1)[0]
+        starts = np.concatenate(([xs[0]], xs[breaks + 1]))
+        stops = np.concatenate((xs[breaks], [xs[-1]]))
+        runs[y] = list(zip(starts.tolist(), stops.tolist()))
+    open_boxes: Dict[Tuple[int, int], int] = {}
+    boxes: List[Tuple[int, int, int, int]] = []
+    previous_row = None
+    for y in sorted(runs):
+        current = set(runs[y])
+        if previous_row is None or y != previous_row + 1:
+            current_open = {}
+        else:
+            current_open = {run: start for run, start in open_boxes.items() if run in current}
+        for run, start in open_boxes.items():
+            if run not in current_open:
+                boxes.append((run[0], start, run[1], previous_row))
+        for run in current:
+            current_open.setdefault(run, y)
+        open_boxes = current_open
+        previous_row = y
+    for run, start in open_boxes.items():
+        boxes.append((run[0], start, run[1], previous_row))
+    return [
+        {"tiles": [x0, y0, x1, y1], **tile_bounds_wgs84(zoom, x0, y0, x1, y1)}
+        for x0, y0, x1, y1 in sorted(boxes, key=lambda box: (box[1], box[0]))
+    ]
+
+
+def padded_hull(points: "np.ndarray", padding_km: float) -> List[List[float]]:
+    """Closed convex hull ring ([lon, lat]) of the padding squares around all points."""
+    lat_pad, lon_pad = _padding_deg(points[:, 0], padding_km)
+    corners = np.concatenate([
+        np.column_stack((points[:, 1] + sx * lon_pad, points[:, 0] + sy * lat_pad))
+        for sx in (-1.0, 1.0)
+        for sy in (-1.0, 1.0)
+    ])
+    corners = np.unique(np.round(corners, 6), axis=0)
+    if len(corners) < 3:
+        return corners.tolist()
+
+    def half(ordered: "np.ndarray") -> List["np.ndarray"]:
+        chain: List[np.ndarray] = []
+        for point in ordered:
+            while len(chain) >= 2:
+                (ax, ay), (bx, by) = chain[-2], chain[-1]
+                if (bx - ax) * (point[1] - ay) - (by - ay) * (point[0] - ax) > 0:
+                    break
+                chain.pop()
+            chain.append(point)
+        return chain
+
+    lower = half(corners)
+    upper = half(corners[::-1])
+    ring = lower[:-1] + upper[:-1]
+    return [[round(float(lon), 6), round(float(lat), 6)] for lon, lat in ring + ring[:1]]
+
+
+@dataclass(frozen=True)
+class TileCoverage:
+    """Covered tiles at ``zoom``; answers membership for any other zoom."""
+
+    zoom: int
+    tiles: FrozenSet[Tuple[int, int]]
+    _ancestors: Dict[int, FrozenSet[Tuple[int, int]]] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def from_array(cls, zoom: int, tiles: "np.ndarray") -> "TileCoverage":
+        return cls(zoom, frozenset((int(x), int(y)) for x, y in tiles.tolist()))
+
+    def contains(self, z: int, x: int, y: int) -> bool:
+        if z >= self.zoom:
+            shift = z - self.zoom
+            return (x >> shift, y >> shift) in self.tiles
+        ancestors = self._ancestors.get(z)
+        if ancestors is None:
+            shift = self.zoom - z
+            ancestors = frozenset((tx >> shift, ty >> shift) for tx, ty in self.tiles)
+            self._ancestors[z] = ancestors
+        return (x, y) in ancestors
+
+
+def mask_dem(dem: DemRaster, coverage: TileCoverage) -> int:
+    """Set DEM pixels outside the covered tiles to NaN (in place); returns the masked pixel count."""
+    require_numpy()
+    tile_m = 2.0 * WEB_MERCATOR_HALF_M / (1 << coverage.zoom)
+    col_tiles = np.floor(
+        (dem.origin_x + (np.arange(dem.cols) + 0.5) * dem.pixel_width + WEB_MERCATOR_HALF_M) / tile_m
+    ).astype(np.int64)
+    row_tiles = np.floor(
+        (WEB_MERCATOR_HALF_M - dem.origin_y - (np.arange(dem.rows) + 0.5) * dem.pixel_height) / tile_m
+    ).astype(np.int64)
+    x_first, y_first = int(col_tiles.min()), int(row_tiles.min())
+    grid = np.zeros((int(row_tiles.max()) - y_first + 1, int(col_tiles.max()) - x_first + 1), dtype=bool)
+    for x, y in coverage.tiles:
+        if 0 <= y - y_first < grid.shape[0] and 0 <= x - x_first < grid.shape[1]:
+            grid[y - y_first, x - x_first] = True
+    local_cols = col_tiles - x_first
+    masked = 0
+    for start in range(0, dem.rows, MASK_BAND_ROWS):
+        stop = min(dem.rows, start + MASK_BAND_ROWS)
+        outside = ~grid[row_tiles[start:stop] - y_first][:, local_cols]
+        band = dem.data[start:stop]
+        masked += int((outside & ~np.isnan(band)).sum())
+        band[outside] = np.nan
+    if hasattr(dem.data, "flush"):
+        dem.data.flush()
+    return masked
@@ -0,0 +1,197 @@
+"""
+DEM raster access for the NumPy terrain engine.
+
+The warped EPSG:3857 GeoTIFF is exported once to a raw ENVI Float32 file with
+gdal_translate and then memory-mapped, so NumPy stages read only the blocks
+they touch and no GDAL Python bindings are required. Whole-raster stages walk
+it in halo-padded windows sized from a RAM budget.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - surfaced when the NumPy engine runs
+    np = None
+
+EARTH_RADIUS_M = 6378137.0
+WEB_MERCATOR_HALF_M = math.pi * EARTH_RADIUS_M
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for the native terrain engine. Install with `python -m pip install numpy`.")
+
+
+@dataclass
+class DemRaster:
+    data: "np.ndarray"
+    origin_x: float
+    origin_y: float
+    pixel_width: float
+    pixel_height: float
+    path: Optional[Path] = None
+
+    @property
+    def rows(self) -> int:
+        return int(self.data.shape[0])
+
+    @property
+    def cols(self) -> int:
+        return int(self.data.shape[1])
+
+    @property
+    def global_offset(self) -> Tuple[int, int]:
+        """(row, col) of pixel (0, 0) in the world pixel grid at this resolution."""
+        row = int(round((WEB_MERCATOR_HALF_M - self.origin_y) / -self.pixel_height))
+        col = int(round((self.origin_x + WEB_MERCATOR_HALF_M) / self.pixel_width))
+        return row, col
+
+    def handle(self) -> Tuple[str, str, Tuple[int, int], Tuple[float, float, float, float]]:
+        """Picklable reference for :func:`open_raw_dem` (requires a file-backed raster)."""
+        if self.path is None:
+            raise RuntimeError("DEM raster is not file-backed; export it with export_raw_dem first.")
+        transform = (self.origin_x, self.origin_y, self.pixel_width, self.pixel_height)
+        return str(self.path), self.data.dtype.str, (self.rows, self.cols), transform
+
+    def read_window(self, row0: int, row1: int, col0: int, col1: int, halo: int = 0) -> "np.ndarray":
+        """
+        Read rows [row0, row1) x cols [col0, col1) as float64 with ``halo``
+        extra pixels on every side; beyond the raster edge the outermost
+        pixels are repeated so windowed kernels match a whole-raster pass.
+        """
+        top, bottom = row0 - halo, row1 + halo
+        left, right = col0 - halo, col1 + halo
+        block = np.asarray(
+            self.data[max(0, top):min(self.rows, bottom), max(0, left):min(self.cols, right)], dtype=np.float64
+        )
+        pad = ((max(0, -top), max(0, bottom - self.rows)), (max(0, -left), max(0, right - self.cols)))
+        if any(pad[0]) or any(pad[1]):
+            block = np.pad(block, pad, mode="edge")
+        return block
+
+    def pixel_to_mercator(self, rows: "np.ndarray", cols: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+        """Map fractional pixel-centre coordinates to EPSG:3857 metres."""
+        xs = self.origin_x + (cols + 0.5) * self.pixel_width
+        ys = self.origin_y + (rows + 0.5) * self.pixel_height
+        return xs, ys
+
+
+def mercator_to_lonlat(xs: "np.ndarray", ys: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    lons = np.degrees(xs / EARTH_RADIUS_M)
+    lats = np.degrees(2.0 * np.arctan(np.exp(ys / EARTH_RADIUS_M)) - math.pi / 2.0)
+    return lons, lats
+
+
+def iter_windows(rows: int, cols: int, size: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (row0, row1, col0, col1) windows of at most ``size`` x ``size`` covering the raster."""
+    for row0 in range(0, rows, size):
+        for col0 in range(0, cols, size):
+            yield row0, min(rows, row0 + size), col0, min(cols, col0 + size)
+
+
+def window_size_for_budget(memory_mb: int, bytes_per_pixel: int = 96, multiple: int = 256) -> int:
+    """
+    Largest square window (a multiple of ``multiple`` px) whose working set,
+    at roughly ``bytes_per_pixel`` for the input, kernel temporaries and
+    output, fits in ``memory_mb``.
+    """
+    side = int(math.sqrt(max(1, memory_mb) * 1024 * 1024 / bytes_per_pixel))
+    return max(multiple, side // multiple * multiple)
+
+
+def aligned_resolution(bounds_wgs84: Dict[str, float], dem_size: int) -> Tuple[int, float]:
+    """
+    Pick the web-mercator zoom whose pixel size is the finest not coarser than
+    the DEM export (``dem_size`` px across the bbox) and return (zoom, metres).
+
+    Warping with ``-tap -tr`` at this resolution keeps the EPSG:3857 grid
+    anchored to tile edges, so growing the bbox leaves interior pixels intact.
+    """
+    span_m = math.radians(bounds_wgs84["maxLon"] - bounds_wgs84["minLon"]) * EARTH_RADIUS_M
+    native_m = span_m / max(1, dem_size)
+    zoom = max(0, int(math.ceil(math.log2(2.0 * WEB_MERCATOR_HALF_M / (256.0 * native_m)))))
+    return zoom, 2.0 * WEB_MERCATOR_HALF_M / (256.0 * (1 << zoom))
+
+
+def _read_envi_byte_order(header_path: Path) -> str:
+    for line in header_path.read_text(encoding="utf-8", errors="replace").splitlines():
+        key, _, value = line.partition("=")
+        if key.strip().lower() == "byte order":
+            return ">" if value.strip() == "1" else "<"
+    return "<"
+
+
+def export_raw_dem(
+    dem_tif: Path,
+    raw_path: Path,
+    gdal_translate: str,
+    gdalinfo: str,
+    cache_mb: Optional[int] = None,
+) -> DemRaster:
+    """
+    Export ``dem_tif`` to raw Float32 (nodata -> NaN) and memory-map it.
+    ``cache_mb`` caps GDAL's block cache during the export.
+    """
+    require_numpy()
+    info = json.loads(
+        subprocess.run([gdalinfo, "-json", str(dem_tif)], check=True, capture_output=True, text=True).stdout
+    )
+    cols, rows = (int(value) for value in info["size"])
+    transform = info["geoTransform"]
+    if transform[2] or transform[4]:
+        raise RuntimeError("Rotated DEM geotransforms are not supported by the native terrain engine.")
+    nodata = (info.get("bands") or [{}])[0].get("noDataValue")
+
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_args = ["--config", "GDAL_CACHEMAX", str(int(cache_mb))] if cache_mb else []
+    print(f"[build-wmnf-stylized] $ {gdal_translate} -of ENVI -ot Float32 {dem_tif} {raw_path}")
+    subprocess.run(
+        [
+            gdal_translate,
+            "-q",
+            *cache_args,
+            "-of",
+            "ENVI",
+            "-ot",
+            "Float32",
+            "-co",
+            "INTERLEAVE=BSQ",
+            str(dem_tif),
+            str(raw_path),
+        ],
+        check=True,
+    )
+    header_path = raw_path.with_suffix(".hdr")
+    if not header_path.exists():
+        header_path = raw_path.with_name(raw_path.name + ".hdr")
+    byte_order = _read_envi_byte_order(header_path)
+    data = np.memmap(raw_path, dtype=np.dtype(f"{byte_order}f4"), mode="r+", shape=(rows, cols))
+    if nodata is not None and not (isinstance(nodata, float) and math.isnan(nodata)):
+        for start in range(0, rows, 1024):
+            block = data[start:start + 1024]
+            block[block == np.float32(nodata)] = np.nan
+        data.flush()
+    return DemRaster(
+        data=data,
+        origin_x=float(transform[0]),
+        origin_y=float(transform[3]),
+        pixel_width=float(transform[1]),
+        pixel_height=float(transform[5]),
+        path=raw_path,
+    )
+
+
+def open_raw_dem(path: Path, dtype: str, shape: Tuple[int, int], transform: Tuple[float, float, float, float]) -> DemRaster:
+    """Re-open an exported raw DEM read-only (e.g. inside a worker process)."""
+    require_numpy()
+    origin_x, origin_y, pixel_width, pixel_height = transform
+    data = np.memmap(path, dtype=np.dtype(dtype), mode="r", shape=shape)
+    return DemRaster(data, origin_x, origin_y, pixel_width, pixel_height, path=path)
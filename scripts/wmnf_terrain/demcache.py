@@ -0,0 +1,269 @@
+"""
+Cached DEM acquisition from an ArcGIS ImageServer ``exportImage`` endpoint.
+
+The bbox is covered by fixed sub-tiles on a global lon/lat grid whose pixel
+size is snapped to a power-of-two number of arc-seconds, so the cache under
+``<cache>/tiles/<resolution>_<px>px_<endpoint-hash>/`` is keyed by
+resolution, tile size, endpoint and tile position, and a slightly different
+(or larger) bbox only downloads the missing tiles. Each
+tile is fetched with resumable HTTP range requests into a ``.part`` file,
+checked (length, GeoTIFF magic) and recorded with its sha256 in a JSON
+sidecar that is re-verified on reuse. The tiles are mosaicked with
+gdalbuildvrt into ``<cache>/mosaics/<bbox-key>.vrt``, cropped to the bbox.
+
+``endpoint`` defaults to USGS 3DEP but any server answering the same query
+(for example a local stand-in serving fixtures) can be used for offline runs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+USGS_EXPORT_ENDPOINT = "https://elevation.nationalmap.gov/arcgis/rest/services/3DEPElevation/ImageServer/exportImage"
+ARCSEC_PER_DEGREE = 3600.0
+TIFF_MAGIC = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+DOWNLOAD_ATTEMPTS = 4
+
+
+@dataclass(frozen=True)
+class DemTile:
+    resolution_arcsec: float
+    tile_px: int
+    row: int
+    col: int
+
+    @property
+    def size_deg(self) -> float:
+        return self.resolution_arcsec * self.tile_px / ARCSEC_PER_DEGREE
+
+    @property
+    def bbox(self) -> Tuple[float, float, float, float]:
+        """(min_lon, min_lat, max_lon, max_lat) of the tile."""
+        size = self.size_deg
+        min_lon = -180.0 + self.col * size
+        min_lat = -90.0 + self.row * size
+        return min_lon, min_lat, min_lon + size, min_lat + size
+
+    @property
+    def name(self) -> str:
+        return f"r{self.row}_c{self.col}.tif"
+
+
+def resolution_key(resolution_arcsec: float) -> str:
+    return f"{resolution_arcsec:g}as".replace(".", "p")
+
+
+def endpoint_key(endpoint: str) -> str:
+    """Short stable hash of the export endpoint, so tiles from different servers never mix."""
+    return hashlib.sha256(endpoint.encode("utf-8")).hexdigest()[:10]
+
+
+def snap_resolution_arcsec(bounds: Dict[str, float], dem_size: int) -> float:
+    """Power-of-two arc-second step nearest (in log scale) to ``dem_size`` px across the bbox."""
+    natural = (bounds["max_lon"] - bounds["min_lon"]) * ARCSEC_PER_DEGREE / max(1, dem_size)
+    return 2.0 ** round(math.log2(natural))
+
+
+def tiles_for_bounds(bounds: Dict[str, float], resolution_arcsec: float, tile_px: int) -> List[DemTile]:
+    size = resolution_arcsec * tile_px / ARCSEC_PER_DEGREE
+    col0 = int(math.floor((bounds["min_lon"] + 180.0) / size))
+    col1 = int(math.ceil((bounds["max_lon"] + 180.0) / size))
+    row0 = int(math.floor((bounds["min_lat"] + 90.0) / size))
+    row1 = int(math.ceil((bounds["max_lat"] + 90.0) / size))
+    return [
+        DemTile(resolution_arcsec, tile_px, row, col)
+        for row in range(row0, row1)
+        for col in range(col0, col1)
+    ]
+
+
+def export_image_url(endpoint: str, bbox: Tuple[float, float, float, float], width: int, height: int) -> str:
+    params = {
+        "bbox": ",".join(f"{value:.10g}" for value in bbox),
+        "bboxSR": "4326",
+        "size": f"{width},{height}",
+        "imageSR": "4326",
+        "format": "tiff",
+        "pixelType": "F32",
+        "f": "image",
+        "interpolation": "RSP_BilinearInterpolation",
+    }
+    return f"{endpoint}?{urllib.parse.urlencode(params, safe=',')}"
+
+
+def sha256_path(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(DOWNLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".json")
+
+
+def cached_file_valid(path: Path) -> bool:
+    """True when ``path`` exists and still matches the sha256 in its sidecar."""
+    sidecar = _sidecar(path)
+    if not path.exists() or not sidecar.exists():
+        return False
+    try:
+        recorded = json.loads(sidecar.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return recorded.get("sha256") == sha256_path(path) and recorded.get("bytes") == path.stat().st_size
+
+
+def download_resumable(url: str, destination: Path, timeout: float = 120.0) -> Dict:
+    """
+    Download ``url`` to ``destination`` via ``<destination>.part``, resuming
+    with ``Range`` requests after interruptions. Servers that ignore ranges
+    (200 instead of 206) restart the file. The result must be a GeoTIFF;
+    ArcGIS reports errors as JSON with status 200, which would otherwise be
+    cached as a DEM. Writes and returns the sha256 sidecar record.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    last_error: Optional[Exception] = None
+    for _ in range(DOWNLOAD_ATTEMPTS):
+        offset = partial.stat().st_size if partial.exists() else 0
+        request = urllib.request.Request(url, headers={"User-Agent": "nh48-wmnf-stylized/1"})
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                resumed = offset and response.status == 206
+                expected = response.headers.get("Content-Length")
+                expected_total = (offset if resumed else 0) + int(expected) if expected else None
+                with partial.open("ab" if resumed else "wb") as output:
+                    for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_BYTES), b""):
+                        output.write(chunk)
+            if expected_total is not None and partial.stat().st_size != expected_total:
+                raise RuntimeError(
+                    f"Short DEM download ({partial.stat().st_size}/{expected_total} bytes) from {url}"
+                )
+            break
+        except urllib.error.HTTPError as exc:
+            if exc.code == 416 and offset:
+                # Range past the end: the .part file is already complete.
+                break
+            last_error = exc
+            if 400 <= exc.code < 500:
+                raise RuntimeError(f"DEM download failed ({exc.code}) for {url}") from exc
+        except (urllib.error.URLError, OSError, RuntimeError) as exc:
+            last_error = exc
+    else:
+        raise RuntimeError(f"DEM download failed after {DOWNLOAD_ATTEMPTS} attempts: {last_error}")
+
+    with partial.open("rb") as handle:
+        magic = handle.read(4)
+    if magic not in TIFF_MAGIC:
+        snippet = partial.read_bytes()[:200].decode("utf-8", errors="replace")
+        partial.unlink()
+        raise RuntimeError(f"DEM endpoint did not return a GeoTIFF for {url}: {snippet}")
+    partial.replace(destination)
+    record = {"url": url, "bytes": destination.stat().st_size, "sha256": sha256_path(destination)}
+    _sidecar(destination).write_text(json.dumps(record, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    return record
+
+
+def fetch_url_cached(url: str, cache_dir: Path) -> Path:
+    """Single-file download keyed by URL (used for an explicit --dem-source URL)."""
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    destination = cache_dir / "urls" / f"{key}.tif"
+    if cached_file_valid(destination):
+        print(f"[build-wmnf-stylized] DEM cache hit: {destination}")
+        return destination
+    print(f"[build-wmnf-stylized] Downloading DEM from URL -> {destination}")
+    download_resumable(url, destination)
+    return destination
+
+
+def _intersects(bbox: Tuple[float, float, float, float], box: Dict[str, float]) -> bool:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return min_lon < box["maxLon"] and max_lon > box["minLon"] and min_lat < box["maxLat"] and max_lat > box["minLat"]
+
+
+def fetch_dem_mosaic(
+    bounds: Dict[str, float],
+    cache_dir: Path,
+    dem_size: int,
+    gdalbuildvrt: str,
+    endpoint: str = USGS_EXPORT_ENDPOINT,
+    tile_px: int = 1024,
+    workers: int = 4,
+    boxes: Optional[List[Dict[str, float]]] = None,
+) -> Tuple[Path, Dict]:
+    """
+    Make sure every cached sub-tile covering ``bounds`` exists, download the
+    missing ones in parallel and return (mosaic VRT, summary).
+
+    With ``boxes`` (minLon/minLat/maxLon/maxLat coverage rectangles) only
+    sub-tiles intersecting one of them are used; the rest of the bbox is
+    nodata in the mosaic.
+    """
+    resolution = snap_resolution_arcsec(bounds, dem_size)
+    tiles = tiles_for_bounds(bounds, resolution, tile_px)
+    if boxes:
+        tiles = [tile for tile in tiles if any(_intersects(tile.bbox, box) for box in boxes)]
+    tile_root = cache_dir / "tiles" / f"{resolution_key(resolution)}_{tile_px}px_{endpoint_key(endpoint)}"
+    paths = [tile_root / tile.name for tile in tiles]
+    missing = [(tile, path) for tile, path in zip(tiles, paths) if not cached_file_valid(path)]
+    print(
+        f"[build-wmnf-stylized] DEM cache: {len(tiles) - len(missing)}/{len(tiles)} sub-tile(s) cached "
+        f"at {resolution:g} arcsec; fetching {len(missing)}"
+    )
+
+    def fetch(item: Tuple[DemTile, Path]) -> Dict:
+        tile, path = item
+        return download_resumable(export_image_url(endpoint, tile.bbox, tile_px, tile_px), path)
+
+    downloaded_bytes = 0
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for record in pool.map(fetch, missing):
+                downloaded_bytes += record["bytes"]
+
+    key_fields = {
+        "bounds": [round(bounds[key], 6) for key in ("min_lon", "min_lat", "max_lon", "max_lat")],
+        "resolution_arcsec": resolution,
+        "tile_px": tile_px,
+        "endpoint": endpoint,
+    }
+    if boxes:
+        key_fields["tiles"] = [tile.name for tile in tiles]
+    bbox_key = hashlib.sha256(json.dumps(key_fields, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    mosaic = cache_dir / "mosaics" / f"{bbox_key}.vrt"
+    mosaic.parent.mkdir(parents=True, exist_ok=True)
+    tile_list = mosaic.with_suffix(".txt")
+    tile_list.write_text("".join(f"{path}\n" for path in paths), encoding="utf-8")
+    extent = [f"{bounds[key]:.10g}" for key in ("min_lon", "min_lat", "max_lon", "max_lat")]
+    print(f"[build-wmnf-stylized] $ {gdalbuildvrt} -te {' '.join(extent)} -input_file_list {tile_list} {mosaic}")
+    subprocess.run(
+        [gdalbuildvrt, "-q", "-overwrite", "-te", *extent, "-input_file_list", str(tile_list), str(mosaic)],
+        check=True,
+    )
+    tile_digests = {
+        tile.name: json.loads(_sidecar(path).read_text(encoding="utf-8"))["sha256"] for tile, path in zip(tiles, paths)
+    }
+    return mosaic, {
+        "resolution_arcsec": resolution,
+        "tile_px": tile_px,
+        "tile_count": len(tiles),
+        "downloaded_tiles": len(missing),
+        "downloaded_bytes": downloaded_bytes,
+        "endpoint": endpoint,
+        "tiles_sha256": hashlib.sha256(json.dumps(tile_digests, sort_keys=True).encode("utf-8")).hexdigest(),
+    }
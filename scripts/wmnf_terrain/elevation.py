@@ -0,0 +1,197 @@
+"""
+Elevation (raster-dem) tiles encoded as Mapbox Terrain-RGB or Terrarium PNGs.
+
+Clients decode the RGB triplet back to metres and shade or query terrain
+themselves, so lighting changes no longer need a tile rebuild:
+
+  mapbox:    h = -10000 + (R * 65536 + G * 256 + B) * 0.1
+  terrarium: h = (R * 256 + G + B / 256) - 32768
+
+Tiles at or above the DEM's native zoom are sampled bilinearly; coarser tiles
+average whole f x f pixel blocks of the tile-aligned DEM in row bands, so
+memory stays bounded however much of the raster a tile covers. Nodata
+encodes as 0 m.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .dem import WEB_MERCATOR_HALF_M, DemRaster, np, open_raw_dem, require_numpy
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - surfaced when elevation tiles are rendered
+    Image = None
+
+TILE_SIZE = 256
+ENCODINGS = ("mapbox", "terrarium")
+AVERAGE_BAND_PIXELS = 1 << 22
+
+DECODE_FORMULAS = {
+    "mapbox": "-10000 + (R * 256 * 256 + G * 256 + B) * 0.1",
+    "terrarium": "(R * 256 + G + B / 256) - 32768",
+}
+
+
+def encode_elevation(elevation_m: "np.ndarray", encoding: str) -> "np.ndarray":
+    """Encode a 2-D elevation array (NaN = nodata) to an (h, w, 3) uint8 RGB array."""
+    heights = np.where(np.isnan(elevation_m), 0.0, elevation_m)
+    if encoding == "mapbox":
+        value = np.clip(np.rint((heights + 10000.0) * 10.0), 0, (1 << 24) - 1).astype(np.uint32)
+        channels = ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+    elif encoding == "terrarium":
+        value = np.clip(heights + 32768.0, 0.0, 65535.996)
+        whole = np.floor(value)
+        channels = (whole // 256, whole % 256, np.floor((value - whole) * 256.0))
+    else:
+        raise RuntimeError(f"Unknown elevation encoding: {encoding}")
+    return np.stack(channels, axis=-1).astype(np.uint8)
+
+
+def decode_elevation(rgb: "np.ndarray", encoding: str) -> "np.ndarray":
+    """Inverse of :func:`encode_elevation` for an (h, w, 3) uint8 array (metres)."""
+    r, g, b = (rgb[..., channel].astype(np.float64) for channel in range(3))
+    if encoding == "mapbox":
+        return -10000.0 + (r * 65536.0 + g * 256.0 + b) * 0.1
+    if encoding == "terrarium":
+        return r * 256.0 + g + b / 256.0 - 32768.0
+    raise RuntimeError(f"Unknown elevation encoding: {encoding}")
+
+
+def native_zoom(dem: DemRaster) -> float:
+    """Zoom whose 256 px tiles match the DEM pixel size (integer on a -tap aligned grid)."""
+    return math.log2(2.0 * WEB_MERCATOR_HALF_M / (TILE_SIZE * dem.pixel_width))
+
+
+def _sample_bilinear(dem: DemRaster, z: int, x: int, y: int) -> "np.ndarray":
+    tile_m = 2.0 * WEB_MERCATOR_HALF_M / (1 << z)
+    centres = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE * tile_m
+    cols = (-WEB_MERCATOR_HALF_M + x * tile_m + centres - dem.origin_x) / dem.pixel_width - 0.5
+    rows = (WEB_MERCATOR_HALF_M - y * tile_m - centres - dem.origin_y) / dem.pixel_height - 0.5
+    row0 = int(math.floor(rows.min()))
+    col0 = int(math.floor(cols.min()))
+    row1 = int(math.floor(rows.max())) + 2
+    col1 = int(math.floor(cols.max())) + 2
+    if row1 <= 0 or col1 <= 0 or row0 >= dem.rows or col0 >= dem.cols:
+        return np.full((TILE_SIZE, TILE_SIZE), np.nan)
+    window = dem.read_window(max(0, row0), min(dem.rows, row1), max(0, col0), min(dem.cols, col1))
+    # Positions outside the raster stay NaN rather than smearing edge pixels.
+    window = np.pad(
+        window,
+        ((max(0, -row0), max(0, row1 - dem.rows)), (max(0, -col0), max(0, col1 - dem.cols))),
+        constant_values=np.nan,
+    )
+    local_rows = rows - row0
+    local_cols = cols - col0
+    r = np.clip(np.floor(local_rows).astype(np.int64), 0, window.shape[0] - 2)
+    c = np.clip(np.floor(local_cols).astype(np.int64), 0, window.shape[1] - 2)
+    fr = (local_rows - r)[:, None]
+    fc = (local_cols - c)[None, :]
+    top = window[r][:, c] * (1.0 - fc) + window[r][:, c + 1] * fc
+    bottom = window[r + 1][:, c] * (1.0 - fc) + window[r + 1][:, c + 1] * fc
+    return top * (1.0 - fr) + bottom * fr
+
+
+def _block_average(dem: DemRaster, z: int, x: int, y: int, factor: int) -> "np.ndarray":
+    row_offset, col_offset = dem.global_offset
+    row0 = y * TILE_SIZE * factor - row_offset
+    col0 = x * TILE_SIZE * factor - col_offset
+    span = TILE_SIZE * factor
+    out = np.full((TILE_SIZE, TILE_SIZE), np.nan)
+    # Largest power-of-two output band whose source rows fit the pixel budget.
+    band_rows = TILE_SIZE
+    while band_rows > 1 and band_rows * factor * span > AVERAGE_BAND_PIXELS:
+        band_rows //= 2
+    for out_row in range(0, TILE_SIZE, band_rows):
+        top = row0 + out_row * factor
+        bottom = top + band_rows * factor
+        clipped_top, clipped_bottom = max(0, top), min(dem.rows, bottom)
+        clipped_left, clipped_right = max(0, col0), min(dem.cols, col0 + span)
+        if clipped_top >= clipped_bottom or clipped_left >= clipped_right:
+            continue
+        band = np.full((band_rows * factor, span), np.nan, dtype=np.float64)
+        band[clipped_top - top:clipped_bottom - top, clipped_left - col0:clipped_right - col0] = dem.data[
+            clipped_top:clipped_bottom, clipped_left:clipped_right
+        ]
+        blocks = band.reshape(band_rows, factor, TILE_SIZE, factor)
+        valid = ~np.isnan(blocks)
+        counts = valid.sum(axis=(1, 3))
+        totals = np.where(valid, blocks, 0.0).sum(axis=(1, 3))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[out_row:out_row + band_rows] = np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+    return out
+
+
+def sample_tile(dem: DemRaster, z: int, x: int, y: int) -> "np.ndarray":
+    """256x256 elevation grid (metres, NaN = nodata) for tile z/x/y."""
+    factor = 2.0 ** (native_zoom(dem) - z)
+    if factor >= 2.0 and abs(factor - round(factor)) < 1e-6:
+        return _block_average(dem, z, x, y, int(round(factor)))
+    return _sample_bilinear(dem, z, x, y)
+
+
+def encode_png(rgb: "np.ndarray") -> bytes:
+    if Image is None:
+        raise RuntimeError("Pillow is required for elevation tiles. Install with `python -m pip install pillow`.")
+    buffer = BytesIO()
+    Image.fromarray(rgb, "RGB").save(buffer, format="PNG", compress_level=6)
+    return buffer.getvalue()
+
+
+def render_elevation_job(job: Tuple) -> Tuple[int, int]:
+    """Render one batch of tiles; returns (tiles, bytes)."""
+    handle, tiles, output_root, encoding = job
+    dem = open_raw_dem(Path(handle[0]), handle[1], handle[2], handle[3])
+    written = 0
+    count = 0
+    for z, x, y in tiles:
+        elevation = sample_tile(dem, z, x, y)
+        if np.isnan(elevation).all():
+            continue
+        payload = encode_png(encode_elevation(elevation, encoding))
+        path = Path(output_root) / str(z) / str(x) / f"{y}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(payload)
+        written += len(payload)
+        count += 1
+    return count, written
+
+
+def write_elevation_tiles(
+    dem: DemRaster,
+    output_root: Path,
+    tiles: Iterable[Tuple[int, int, int]],
+    encoding: str = "mapbox",
+    workers: Optional[int] = None,
+    batch_size: int = 64,
+) -> Dict:
+    """Render ``tiles`` to {z}/{x}/{y}.png under ``output_root`` in parallel batches."""
+    require_numpy()
+    if encoding not in ENCODINGS:
+        raise RuntimeError(f"Unknown elevation encoding: {encoding}")
+    ordered = sorted(tiles)
+    handle = dem.handle()
+    jobs: List[Tuple] = [
+        (handle, ordered[start:start + batch_size], str(output_root), encoding)
+        for start in range(0, len(ordered), batch_size)
+    ]
+    workers = max(1, workers or os.cpu_count() or 1)
+    tile_count = 0
+    byte_count = 0
+    if workers == 1:
+        results = map(render_elevation_job, jobs)
+        for count, written in results:
+            tile_count += count
+            byte_count += written
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for count, written in pool.map(render_elevation_job, jobs):
+                tile_count += count
+                byte_count += written
+    return {"tile_count": tile_count, "bytes": byte_count, "jobs": len(jobs)}
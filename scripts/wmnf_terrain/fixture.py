@@ -0,0 +1,116 @@
+"""
+Synthetic DEM fixtures for benchmarking the terrain engine offline.
+
+The fixture is a sum of Gaussian hills over a gently tilted base, laid out on
+a block of whole web-mercator tiles at its native zoom (so it behaves like a
+``-tap`` warped DEM) with a small nodata pond to exercise NaN handling. It is
+fully deterministic: the same arguments always give the same pixels.
+
+``write_fixture_geotiff`` writes the same grid as a Float32 EPSG:3857 GeoTIFF
+(via Pillow's TIFF writer and GeoTIFF tags) for driving the full GDAL build
+with ``--dem-source``.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .dem import WEB_MERCATOR_HALF_M, DemRaster, np, open_raw_dem, require_numpy
+
+try:
+    from PIL import Image, TiffImagePlugin
+except ImportError:  # pragma: no cover - surfaced when a GeoTIFF is requested
+    Image = None
+    TiffImagePlugin = None
+
+FIXTURE_BAND_ROWS = 256
+FIXTURE_NODATA = -9999.0
+
+# (row, col, sigma) as fractions of the fixture size, height in metres.
+GAUSSIAN_HILLS: List[Tuple[float, float, float, float]] = [
+    (0.30, 0.35, 0.12, 1450.0),
+    (0.62, 0.70, 0.09, 1100.0),
+    (0.75, 0.25, 0.06, 700.0),
+    (0.20, 0.80, 0.05, 520.0),
+    (0.50, 0.50, 0.25, 260.0),
+]
+BASE_ELEVATION_M = 280.0
+BASE_TILT_M = 120.0
+# Nodata pond as (row0, row1, col0, col1) fractions.
+NODATA_POND = (0.86, 0.94, 0.06, 0.16)
+
+
+def fixture_elevation(rows: "np.ndarray", cols: "np.ndarray", size_rows: int, size_cols: int) -> "np.ndarray":
+    """Elevation (metres) at integer pixel positions of a ``size_rows`` x ``size_cols`` fixture."""
+    v = (rows[:, None] + 0.5) / size_rows
+    u = (cols[None, :] + 0.5) / size_cols
+    heights = BASE_ELEVATION_M + BASE_TILT_M * (u - v)
+    for row, col, sigma, height in GAUSSIAN_HILLS:
+        heights = heights + height * np.exp(-((v - row) ** 2 + (u - col) ** 2) / (2.0 * sigma * sigma))
+    pond_row0, pond_row1, pond_col0, pond_col1 = NODATA_POND
+    pond = (v >= pond_row0) & (v < pond_row1) & (u >= pond_col0) & (u < pond_col1)
+    return np.where(pond, np.nan, heights)
+
+
+def fixture_transform(zoom: int, tile_x: int, tile_y: int) -> Tuple[float, float, float, float]:
+    """(origin_x, origin_y, pixel_width, pixel_height) of a fixture anchored at tile z/x/y."""
+    pixel = 2.0 * WEB_MERCATOR_HALF_M / (256.0 * (1 << zoom))
+    return -WEB_MERCATOR_HALF_M + tile_x * 256 * pixel, WEB_MERCATOR_HALF_M - tile_y * 256 * pixel, pixel, -pixel
+
+
+def write_fixture_dem(raw_path: Path, zoom: int, tile_x: int, tile_y: int, tiles_x: int, tiles_y: int) -> DemRaster:
+    """Write the fixture covering ``tiles_x`` x ``tiles_y`` tiles to a raw Float32 file and map it."""
+    require_numpy()
+    rows, cols = tiles_y * 256, tiles_x * 256
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    data = np.memmap(raw_path, dtype=np.dtype("<f4"), mode="w+", shape=(rows, cols))
+    col_index = np.arange(cols)
+    for start in range(0, rows, FIXTURE_BAND_ROWS):
+        stop = min(rows, start + FIXTURE_BAND_ROWS)
+        data[start:stop] = fixture_elevation(np.arange(start, stop), col_index, rows, cols)
+    data.flush()
+    del data
+    return open_raw_dem(raw_path, "<f4", (rows, cols), fixture_transform(zoom, tile_x, tile_y))
+
+
+def fixture_summary(dem: DemRaster) -> Dict:
+    """Identity of a fixture grid, recorded next to golden results."""
+    return {
+        "rows": dem.rows,
+        "cols": dem.cols,
+        "origin": [round(dem.origin_x, 3), round(dem.origin_y, 3)],
+        "pixel_m": round(dem.pixel_width, 6),
+        "hills": [list(hill) for hill in GAUSSIAN_HILLS],
+    }
+
+
+def write_fixture_geotiff(dem: DemRaster, path: Path) -> None:
+    """Write ``dem`` as a Float32 GeoTIFF in EPSG:3857 with a -9999 nodata value."""
+    if Image is None:
+        raise RuntimeError("Pillow is required to write the fixture GeoTIFF. Install with `python -m pip install pillow`.")
+    if dem.rows * dem.cols > 1 << 28:
+        raise RuntimeError("Fixture too large for a single-strip GeoTIFF; use fewer tiles.")
+    pixels = np.where(np.isnan(dem.data), FIXTURE_NODATA, dem.data).astype(np.float32)
+    tags = TiffImagePlugin.ImageFileDirectory_v2()
+    # ModelPixelScale, ModelTiepoint (pixel 0,0 -> origin) and GeoKeyDirectory:
+    # raster type PixelIsArea, projected CRS EPSG:3857.
+    tags[33550] = (dem.pixel_width, -dem.pixel_height, 0.0)
+    tags.tagtype[33550] = 12
+    tags[33922] = (0.0, 0.0, 0.0, dem.origin_x, dem.origin_y, 0.0)
+    tags.tagtype[33922] = 12
+    tags[34735] = (1, 1, 0, 3, 1024, 0, 1, 1, 1025, 0, 1, 1, 3072, 0, 1, 3857)
+    tags.tagtype[34735] = 3
+    tags[42113] = f"{FIXTURE_NODATA:g}"
+    tags.tagtype[42113] = 2
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(pixels, "F").save(path, tiffinfo=tags)
+
+
+def tile_for_lonlat(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    scale = 1 << zoom
+    x = int(math.floor((lon + 180.0) / 360.0 * scale))
+    lat_rad = math.radians(lat)
+    y = int(math.floor((1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi) / 2.0 * scale))
+    return x, y
@@ -0,0 +1,108 @@
+"""
+Windowed Horn hillshade over the memory-mapped DEM.
+
+The DEM is shaded in square windows read with a one-pixel halo, so every
+output pixel sees the same 3x3 neighbourhood it would in a whole-raster pass
+and window seams are invisible. Results go straight into a memory-mapped
+Byte raster (1..255 shade, 0 nodata, like ``gdaldem hillshade``) described
+by a small VRT that gdal2tiles reads directly. RAM use is bounded by the
+window size, not the DEM size.
+"""
+
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Dict
+
+from .dem import DemRaster, iter_windows, np, require_numpy
+
+HILLSHADE_NODATA = 0
+
+
+def horn_hillshade(
+    padded: "np.ndarray",
+    ew_res: float,
+    ns_res: float,
+    z_factor: float = 1.0,
+    azimuth: float = 315.0,
+    altitude: float = 45.0,
+) -> "np.ndarray":
+    """
+    Shade the interior of ``padded`` (a window with a one-pixel halo) with
+    Horn's 3x3 gradient. ``ns_res`` is the signed geotransform row step.
+    NaN neighbours take the centre value; NaN centres map to nodata.
+    """
+    centre = padded[1:-1, 1:-1]
+
+    def neighbour(row: int, col: int) -> "np.ndarray":
+        values = padded[row:row + centre.shape[0], col:col + centre.shape[1]]
+        return np.where(np.isnan(values), centre, values)
+
+    a, b, c = neighbour(0, 0), neighbour(0, 1), neighbour(0, 2)
+    d, f = neighbour(1, 0), neighbour(1, 2)
+    g, h, i = neighbour(2, 0), neighbour(2, 1), neighbour(2, 2)
+    # dz/dx towards east and dz/dy towards north (rows run south, ns_res < 0).
+    dz_dx = ((c + 2.0 * f + i) - (a + 2.0 * d + g)) / (8.0 * ew_res) * z_factor
+    dz_dy = ((g + 2.0 * h + i) - (a + 2.0 * b + c)) / (8.0 * ns_res) * z_factor
+
+    azimuth_rad = math.radians(azimuth)
+    altitude_rad = math.radians(altitude)
+    light_east = math.sin(azimuth_rad) * math.cos(altitude_rad)
+    light_north = math.cos(azimuth_rad) * math.cos(altitude_rad)
+    cosine = (math.sin(altitude_rad) - dz_dx * light_east - dz_dy * light_north) / np.sqrt(
+        1.0 + dz_dx * dz_dx + dz_dy * dz_dy
+    )
+    shade = np.where(cosine <= 0.0, 1.0, 1.0 + 254.0 * cosine)
+    shade = np.where(np.isnan(centre), HILLSHADE_NODATA, np.rint(shade))
+    return shade.astype(np.uint8)
+
+
+def write_raw_vrt(vrt_path: Path, raw_path: Path, dem: DemRaster, nodata: int = HILLSHADE_NODATA) -> None:
+    """Describe a raw single-band Byte raster on the DEM grid as an EPSG:3857 VRT."""
+    geotransform = ", ".join(
+        repr(value) for value in (dem.origin_x, dem.pixel_width, 0.0, dem.origin_y, 0.0, dem.pixel_height)
+    )
+    vrt_path.write_text(
+        f'<VRTDataset rasterXSize="{dem.cols}" rasterYSize="{dem.rows}">\n'
+        "  <SRS>EPSG:3857</SRS>\n"
+        f"  <GeoTransform>{geotransform}</GeoTransform>\n"
+        '  <VRTRasterBand dataType="Byte" band="1" subClass="VRTRawRasterBand">\n'
+        f"    <NoDataValue>{nodata}</NoDataValue>\n"
+        f'    <SourceFilename relativeToVRT="1">{raw_path.name}</SourceFilename>\n'
+        "    <ImageOffset>0</ImageOffset>\n"
+        "    <PixelOffset>1</PixelOffset>\n"
+        f"    <LineOffset>{dem.cols}</LineOffset>\n"
+        "  </VRTRasterBand>\n"
+        "</VRTDataset>\n",
+        encoding="utf-8",
+    )
+
+
+def render_hillshade(
+    dem: DemRaster,
+    vrt_path: Path,
+    window: int,
+    z_factor: float = 1.0,
+    azimuth: float = 315.0,
+    altitude: float = 45.0,
+) -> Dict:
+    """
+    Shade ``dem`` window by window into ``<vrt_path>.bin`` and write the VRT.
+    Returns a small summary (window size and count) for logging.
+    """
+    require_numpy()
+    raw_path = vrt_path.with_suffix(".bin")
+    raw_path.parent.mkdir(parents=True, exist_ok=True)
+    shaded = np.memmap(raw_path, dtype=np.uint8, mode="w+", shape=(dem.rows, dem.cols))
+    windows = 0
+    for row0, row1, col0, col1 in iter_windows(dem.rows, dem.cols, window):
+        padded = dem.read_window(row0, row1, col0, col1, halo=1)
+        shaded[row0:row1, col0:col1] = horn_hillshade(
+            padded, dem.pixel_width, dem.pixel_height, z_factor=z_factor, azimuth=azimuth, altitude=altitude
+        )
+        windows += 1
+    shaded.flush()
+    del shaded
+    write_raw_vrt(vrt_path, raw_path, dem)
+    return {"window": window, "windows": windows}
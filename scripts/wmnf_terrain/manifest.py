@@ -0,0 +1,232 @@
+"""
+Build manifest for incremental stylized-terrain rebuilds.
+
+``build-manifest.json`` in the output root records the source DEM sha256, the
+build parameters and, per layer, every tile's input hash and content hash.
+A tile's input hash covers the layer parameters plus the DEM pixels the tile
+depends on (its footprint and a halo, or for contours the aligned tracing
+blocks it overlaps), so a rebuild only regenerates tiles whose footprint or
+inputs changed: a larger bbox dirties the edge tiles, a higher max zoom only
+adds the new level.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .dem import WEB_MERCATOR_HALF_M, DemRaster, np, require_numpy
+from .tiles import tile_id
+
+MANIFEST_NAME = "build-manifest.json"
+MANIFEST_VERSION = 1
+HASH_BAND_ROWS = 256
+
+
+def params_digest(params: Dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def tile_pixel_window(dem: DemRaster, z: int, x: int, y: int) -> Tuple[int, int, int, int]:
+    """Unclipped (row0, row1, col0, col1) DEM window covered by tile z/x/y."""
+    row_offset, col_offset = dem.global_offset
+    tile_cols = 2.0 * WEB_MERCATOR_HALF_M / dem.pixel_width / (1 << z)
+    tile_rows = 2.0 * WEB_MERCATOR_HALF_M / -dem.pixel_height / (1 << z)
+    # Work in world-grid pixels so identical tiles get identical windows
+    # regardless of where the raster origin sits.
+    return (
+        int(math.floor(round(y * tile_rows, 6))) - row_offset,
+        int(math.ceil(round((y + 1) * tile_rows, 6))) - row_offset,
+        int(math.floor(round(x * tile_cols, 6))) - col_offset,
+        int(math.ceil(round((x + 1) * tile_cols, 6))) - col_offset,
+    )
+
+
+def iter_footprint(dem: DemRaster, zoom: int, buffer_fraction: float = 0.0) -> Iterator[Tuple[int, int]]:
+    """Yield (x, y) of every tile at ``zoom`` whose (buffered) extent overlaps the DEM raster."""
+    tile_m = 2.0 * WEB_MERCATOR_HALF_M / (1 << zoom)
+    margin = tile_m * buffer_fraction
+    max_x = dem.origin_x + dem.cols * dem.pixel_width
+    min_y = dem.origin_y + dem.rows * dem.pixel_height
+    last = (1 << zoom) - 1
+    x0 = max(0, int(math.floor((dem.origin_x - margin + WEB_MERCATOR_HALF_M) / tile_m)))
+    x1 = min(last, int(math.ceil((max_x + margin + WEB_MERCATOR_HALF_M) / tile_m)) - 1)
+    y0 = max(0, int(math.floor((WEB_MERCATOR_HALF_M - dem.origin_y - margin) / tile_m)))
+    y1 = min(last, int(math.ceil((WEB_MERCATOR_HALF_M - min_y + margin) / tile_m)) - 1)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield x, y
+
+
+def _snap_window(start: int, stop: int, offset: int, block_size: int) -> Tuple[int, int]:
+    """Grow [start, stop) outward to whole world-aligned blocks (plus the shared edge pixel)."""
+    start = ((start + offset) // block_size) * block_size - offset
+    stop = -((-(stop + offset)) // block_size) * block_size - offset + 1
+    return start, stop
+
+
+def tile_input_hashes(
+    dem: DemRaster,
+    min_zoom: int,
+    max_zoom: int,
+    digest: str,
+    halo_px: int = 2,
+    buffer_fraction: float = 0.0,
+    block_size: Optional[int] = None,
+    keep: Optional[Callable[[int, int, int], bool]] = None,
+) -> Dict[str, str]:
+    """
+    Hash the DEM window each tile depends on, salted with the layer digest.
+    ``buffer_fraction`` widens every tile by that share of its size (the MVT
+    clip buffer) on top of ``halo_px``.
+
+    With ``block_size`` the window is widened to the world-aligned tracing
+    blocks it touches, because a contour line's simplification depends on the
+    whole (block-clipped) line rather than the tile it is drawn in.
+
+    ``keep(z, x, y)`` restricts the footprint (e.g. to the covered tiles).
+    """
+    require_numpy()
+    row_offset, col_offset = dem.global_offset
+    hashes: Dict[str, str] = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        for x, y in iter_footprint(dem, zoom, buffer_fraction):
+            if keep is not None and not keep(zoom, x, y):
+                continue
+            row0, row1, col0, col1 = tile_pixel_window(dem, zoom, x, y)
+            halo = halo_px + int(math.ceil((row1 - row0) * buffer_fraction))
+            row0, row1, col0, col1 = row0 - halo, row1 + halo, col0 - halo, col1 + halo
+            if block_size:
+                row0, row1 = _snap_window(row0, row1, row_offset, block_size)
+                col0, col1 = _snap_window(col0, col1, col_offset, block_size)
+            row0, row1 = max(0, row0), min(dem.rows, row1)
+            col0, col1 = max(0, col0), min(dem.cols, col1)
+            hasher = hashlib.sha256(digest.encode("ascii"))
+            hasher.update(f"{row0 + row_offset}:{row1 + row_offset}:{col0 + col_offset}:{col1 + col_offset}".encode("ascii"))
+            # Stream low-zoom windows (which span the whole DEM) in row bands
+            # so hashing stays within the RAM budget.
+            for band in range(row0, row1, HASH_BAND_ROWS):
+                hasher.update(np.ascontiguousarray(dem.data[band:min(row1, band + HASH_BAND_ROWS), col0:col1]).tobytes())
+            hashes[tile_id(zoom, x, y)] = hasher.hexdigest()[:16]
+    return hashes
+
+
+def load_manifest(output_root: Path) -> Dict:
+    path = output_root / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def plan_layer(previous_layer: Optional[Dict], inputs: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """Return (dirty, removed) tile ids: new or changed inputs, and tiles no longer in the footprint."""
+    previous_tiles = (previous_layer or {}).get("tiles", {})
+    dirty = [tid for tid, digest in inputs.items() if (previous_tiles.get(tid) or {}).get("input") != digest]
+    removed = [tid for tid in previous_tiles if tid not in inputs]
+    return dirty, removed
+
+
+def dirty_zoom_range(dirty: Iterable[str]) -> Optional[Tuple[int, int]]:
+    zooms = [int(tid.split("/", 1)[0]) for tid in dirty]
+    return (min(zooms), max(zooms)) if zooms else None
+
+
+def _content_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+
+
+def _unlink_tile(layer_root: Path, target: Path) -> None:
+    target.unlink()
+    for parent in (target.parent, target.parent.parent):
+        if parent != layer_root and parent.exists() and not any(parent.iterdir()):
+            parent.rmdir()
+
+
+def sync_layer(
+    stage_root: Path,
+    layer_root: Path,
+    suffix: str,
+    dirty: Iterable[str],
+    removed: Iterable[str],
+) -> Tuple[Dict[str, Optional[str]], List[str], List[str]]:
+    """
+    Move regenerated tiles from ``stage_root`` into ``layer_root``.
+
+    Dirty tiles missing from the stage (nothing to draw) and removed tiles are
+    deleted. Tiles whose bytes did not change are left untouched so their
+    mtime and any upload state survive. Returns (content hashes of the dirty
+    tiles, changed paths, deleted paths) with paths relative to ``layer_root``.
+    """
+    contents: Dict[str, Optional[str]] = {}
+    changed: List[str] = []
+    deleted: List[str] = []
+    for tid in dirty:
+        relative = f"{tid}{suffix}"
+        staged = stage_root / relative
+        target = layer_root / relative
+        if not staged.exists():
+            contents[tid] = None
+            if target.exists():
+                _unlink_tile(layer_root, target)
+                deleted.append(relative)
+            continue
+        digest = _content_hash(staged)
+        contents[tid] = digest
+        if target.exists() and _content_hash(target) == digest:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(staged), str(target))
+        changed.append(relative)
+    for tid in removed:
+        relative = f"{tid}{suffix}"
+        target = layer_root / relative
+        if target.exists():
+            _unlink_tile(layer_root, target)
+            deleted.append(relative)
+    return contents, changed, deleted
+
+
+def drop_layer(layer_root: Path, suffix: str) -> List[str]:
+    """Delete a layer that is no longer built; returns its removed tile paths relative to ``layer_root``."""
+    if not layer_root.exists():
+        return []
+    deleted = sorted(path.relative_to(layer_root).as_posix() for path in layer_root.rglob(f"*{suffix}"))
+    shutil.rmtree(layer_root)
+    return deleted
+
+
+def layer_record(
+    previous_layer: Optional[Dict],
+    digest: str,
+    inputs: Dict[str, str],
+    contents: Dict[str, Optional[str]],
+) -> Dict:
+    """Manifest entry for a layer: clean tiles keep their previous content hash."""
+    previous_tiles = (previous_layer or {}).get("tiles", {})
+    tiles = {}
+    for tid, input_hash in inputs.items():
+        content = contents[tid] if tid in contents else (previous_tiles.get(tid) or {}).get("content")
+        tiles[tid] = {"input": input_hash, "content": content}
+    return {"params_digest": digest, "tiles": tiles}
+
+
+def build_manifest(dem_sha256: str, params: Dict, layers: Dict[str, Dict], changed: List[str], deleted: List[str]) -> Dict:
+    return {
+        "version": MANIFEST_VERSION,
+        "dem_sha256": dem_sha256,
+        "params": params,
+        "layers": layers,
+        "last_build": {"changed": sorted(changed), "deleted": sorted(deleted)},
+    }
+
+
+def dirty_tile_set(dirty: Iterable[str]) -> Set[Tuple[int, int, int]]:
+    return {tuple(int(part) for part in tid.split("/")) for tid in dirty}
@@ -0,0 +1,419 @@
+"""
+Direct Mapbox Vector Tile (v2.1) encoder for contour lines.
+
+Reads the zoom-banded GeoJSONSeq written by the native contour engine, clips
+every line to each tile it touches (with a small buffer), quantizes it to the
+tile extent and writes contours/{z}/{x}/{y}.pbf without tippecanoe/tile-join.
+Work is split into (zoom, column-stripe) jobs that run in parallel processes.
+The source is read once and each feature is copied to the slice file of every
+job whose zoom band and stripe it touches, so a job parses only its slice.
+
+Spec: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .contours import iter_geojson_features
+from .dem import np, require_numpy
+
+EXTENT = 4096
+BUFFER = 64
+LINESTRING = 2
+
+CMD_MOVE_TO = 1
+CMD_LINE_TO = 2
+
+WIRE_VARINT = 0
+WIRE_64BIT = 1
+WIRE_BYTES = 2
+
+
+def zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _key(field: int, wire: int, out: bytearray) -> None:
+    _varint((field << 3) | wire, out)
+
+
+def _bytes_field(field: int, payload: bytes, out: bytearray) -> None:
+    _key(field, WIRE_BYTES, out)
+    _varint(len(payload), out)
+    out.extend(payload)
+
+
+def _packed_field(field: int, values: Iterable[int], out: bytearray) -> None:
+    packed = bytearray()
+    for value in values:
+        _varint(value, packed)
+    _bytes_field(field, bytes(packed), out)
+
+
+def encode_value(value) -> bytes:
+    out = bytearray()
+    if isinstance(value, bool):
+        _key(7, WIRE_VARINT, out)
+        _varint(int(value), out)
+    elif isinstance(value, int):
+        _key(6, WIRE_VARINT, out)
+        _varint(zigzag(value), out)
+    elif isinstance(value, float):
+        _key(3, WIRE_64BIT, out)
+        out.extend(struct.pack("<d", value))
+    else:
+        _bytes_field(1, str(value).encode("utf-8"), out)
+    return bytes(out)
+
+
+def encode_line_geometry(parts: List["np.ndarray"]) -> List[int]:
+    """MoveTo/LineTo command stream for (possibly multi-part) integer lines."""
+    commands: List[int] = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for part in parts:
+        deltas = np.diff(np.vstack((cursor, part)), axis=0)
+        zigzagged = ((deltas << 1) ^ (deltas >> 63)).tolist()
+        commands.append((1 << 3) | CMD_MOVE_TO)
+        commands.extend(zigzagged[0])
+        commands.append(((len(part) - 1) << 3) | CMD_LINE_TO)
+        for dx, dy in zigzagged[1:]:
+            commands.append(dx)
+            commands.append(dy)
+        cursor = part[-1]
+    return commands
+
+
+class LayerEncoder:
+    """Accumulates features for one MVT layer with shared key/value tables."""
+
+    def __init__(self, name: str, extent: int = EXTENT) -> None:
+        self.name = name
+        self.extent = extent
+        self.keys: Dict[str, int] = {}
+        self.values: Dict[bytes, int] = {}
+        self.features: List[bytes] = []
+
+    def add_line(self, parts: List["np.ndarray"], properties: Dict) -> None:
+        tags: List[int] = []
+        for key in sorted(properties):
+            value = properties[key]
+            if value is None:
+                continue
+            key_index = self.keys.setdefault(key, len(self.keys))
+            value_index = self.values.setdefault(encode_value(value), len(self.values))
+            tags.extend((key_index, value_index))
+        feature = bytearray()
+        _packed_field(2, tags, feature)
+        _key(3, WIRE_VARINT, feature)
+        _varint(LINESTRING, feature)
+        _packed_field(4, encode_line_geometry(parts), feature)
+        self.features.append(bytes(feature))
+
+    def encode(self) -> bytes:
+        layer = bytearray()
+        _key(15, WIRE_VARINT, layer)
+        _varint(2, layer)
+        _bytes_field(1, self.name.encode("utf-8"), layer)
+        for feature in self.features:
+            _bytes_field(2, feature, layer)
+        for key in self.keys:
+            _bytes_field(3, key.encode("utf-8"), layer)
+        for value in self.values:
+            _bytes_field(4, value, layer)
+        _key(5, WIRE_VARINT, layer)
+        _varint(self.extent, layer)
+        tile = bytearray()
+        _bytes_field(3, bytes(layer), tile)
+        return bytes(tile)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _iter_fields(data: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield (field, wire type, value) for a protobuf message; bytes fields as slices."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire = key >> 3, key & 0x7
+        if wire == WIRE_VARINT:
+            value, pos = _read_varint(data, pos)
+        elif wire == WIRE_64BIT:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire == WIRE_BYTES:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        elif wire == 5:
+            value, pos = data[pos:pos + 4], pos + 4
+        else:
+            raise RuntimeError(f"Unsupported protobuf wire type {wire} in vector tile")
+        yield field, wire, value
+
+
+def layer_feature_counts(payload: bytes) -> Dict[str, int]:
+    """Feature count per layer name of an encoded (uncompressed) vector tile."""
+    counts: Dict[str, int] = {}
+    for field, _, layer in _iter_fields(payload):
+        if field != 3:
+            continue
+        name = ""
+        features = 0
+        for layer_field, _, value in _iter_fields(layer):
+            if layer_field == 1:
+                name = bytes(value).decode("utf-8")
+            elif layer_field == 2:
+                features += 1
+        counts[name] = counts.get(name, 0) + features
+    return counts
+
+
+def lonlat_to_world(coords: "np.ndarray") -> "np.ndarray":
+    """WGS84 lon/lat -> world coordinates in [0, 1) (x right, y down)."""
+    lons = coords[:, 0]
+    lats = np.clip(coords[:, 1], -85.05112878, 85.05112878)
+    x = (lons + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lats)) + 1.0 / np.cos(np.radians(lats))) / math.pi) / 2.0
+    return np.column_stack((x, y))
+
+
+def clip_line(points: "np.ndarray", low: float, high: float) -> List["np.ndarray"]:
+    """Vectorized Liang-Barsky clip of a polyline to the square [low, high]^2."""
+    if len(points) < 2:
+        return []
+    if points.min() >= low and points.max() <= high:
+        return [points]
+    start, end = points[:-1], points[1:]
+    delta = end - start
+    t0 = np.zeros(len(start))
+    t1 = np.ones(len(start))
+    rejected = np.zeros(len(start), dtype=bool)
+    for axis in (0, 1):
+        for p, q in ((-delta[:, axis], start[:, axis] - low), (delta[:, axis], high - start[:, axis])):
+            parallel = p == 0
+            rejected |= parallel & (q < 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ratio = np.where(parallel, 0.0, q / np.where(parallel, 1.0, p))
+            t0 = np.where(~parallel & (p < 0), np.maximum(t0, ratio), t0)
+            t1 = np.where(~parallel & (p > 0), np.minimum(t1, ratio), t1)
+    visible = ~rejected & (t0 <= t1)
+    if not visible.any():
+        return []
+
+    parts: List[np.ndarray] = []
+    current: List[np.ndarray] = []
+    for index in np.nonzero(visible)[0].tolist():
+        clipped_start = start[index] + t0[index] * delta[index]
+        clipped_end = start[index] + t1[index] * delta[index]
+        connected = current and t0[index] == 0.0 and visible[index - 1] and t1[index - 1] == 1.0
+        if not connected:
+            if len(current) >= 2:
+                parts.append(np.array(current))
+            current = [clipped_start]
+        current.append(clipped_end)
+    if len(current) >= 2:
+        parts.append(np.array(current))
+    return parts
+
+
+def quantize_part(part: "np.ndarray") -> Optional["np.ndarray"]:
+    rounded = np.round(part).astype(np.int64)
+    keep = np.ones(len(rounded), dtype=bool)
+    keep[1:] = np.any(rounded[1:] != rounded[:-1], axis=1)
+    rounded = rounded[keep]
+    return rounded if len(rounded) >= 2 else None
+
+
+def _tile_range(world_min: float, world_max: float, zoom: int, buffer_fraction: float) -> range:
+    scale = 1 << zoom
+    first = max(0, int(math.floor(world_min * scale - buffer_fraction)))
+    last = min(scale - 1, int(math.floor(world_max * scale + buffer_fraction)))
+    return range(first, last + 1)
+
+
+ContourJob = Tuple[str, int, int, int, str, str, Optional[FrozenSet[Tuple[int, int]]]]
+
+
+def encode_contour_job(job: ContourJob) -> Tuple[int, int]:
+    """
+    Encode all tiles of one zoom with x in [x_first, x_last] (restricted to the
+    job's (x, y) set when one is given) from the job's slice file, as written
+    by ``split_contour_source``; returns (tiles, bytes).
+    """
+    source, zoom, x_first, x_last, output_root, layer_name, only = job
+    require_numpy()
+    scale = 1 << zoom
+    buffer_fraction = BUFFER / EXTENT
+    layers: Dict[Tuple[int, int], LayerEncoder] = {}
+
+    with Path(source).open("r", encoding="utf-8") as handle:
+        for line in handle:
+            properties, coords = json.loads(line)
+            world = lonlat_to_world(np.asarray(coords, dtype=np.float64))
+            low, high = world.min(axis=0), world.max(axis=0)
+            xs = _tile_range(low[0], high[0], zoom, buffer_fraction)
+            xs = range(max(xs.start, x_first), min(xs.stop, x_last + 1))
+            if not xs:
+                continue
+            ys = _tile_range(low[1], high[1], zoom, buffer_fraction)
+            for tx in xs:
+                for ty in ys:
+                    if only is not None and (tx, ty) not in only:
+                        continue
+                    local = (world * scale - (tx, ty)) * EXTENT
+                    parts = []
+                    for part in clip_line(local, -BUFFER, EXTENT + BUFFER):
+                        quantized = quantize_part(part)
+                        if quantized is not None:
+                            parts.append(quantized)
+                    if not parts:
+                        continue
+                    layer = layers.get((tx, ty))
+                    if layer is None:
+                        layer = layers[(tx, ty)] = LayerEncoder(layer_name)
+                    layer.add_line(parts, properties)
+
+    written_bytes = 0
+    for (tx, ty), layer in layers.items():
+        path = Path(output_root) / str(zoom) / str(tx) / f"{ty}.pbf"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = layer.encode()
+        path.write_bytes(payload)
+        written_bytes += len(payload)
+    return len(layers), written_bytes
+
+
+def split_contour_source(source: Path, jobs: List[ContourJob], slice_dir: Path) -> List[ContourJob]:
+    """
+    Read ``source`` once and write each job's features ([properties, coordinates]
+    per line) to its own slice file; returns the jobs that received any, now
+    pointing at their slices.
+    """
+    require_numpy()
+    buffer_fraction = BUFFER / EXTENT
+    stripes: Dict[int, List[Tuple[int, int, int]]] = {}
+    for index, (_, zoom, first, last, *_rest) in enumerate(jobs):
+        stripes.setdefault(zoom, []).append((first, last, index))
+    for zoom_stripes in stripes.values():
+        zoom_stripes.sort()
+    handles: Dict[int, object] = {}
+    try:
+        for feature in iter_geojson_features(Path(source)):
+            coords = (feature.get("geometry") or {}).get("coordinates") or []
+            if len(coords) < 2:
+                continue
+            hints = feature.get("tippecanoe") or {}
+            world = lonlat_to_world(np.asarray(coords, dtype=np.float64))
+            low, high = world.min(axis=0), world.max(axis=0)
+            line = None
+            for zoom, zoom_stripes in stripes.items():
+                if not hints.get("minzoom", 0) <= zoom <= hints.get("maxzoom", 32):
+                    continue
+                xs = _tile_range(low[0], high[0], zoom, buffer_fraction)
+                for first, last, index in zoom_stripes:
+                    if first >= xs.stop:
+                        break
+                    if last < xs.start:
+                        continue
+                    if line is None:
+                        line = json.dumps([feature.get("properties") or {}, coords], separators=(",", ":")) + "\n"
+                    handle = handles.get(index)
+                    if handle is None:
+                        handle = handles[index] = (slice_dir / f"job-{index:05d}.json").open("w", encoding="utf-8")
+                    handle.write(line)
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return [
+        (str(slice_dir / f"job-{index:05d}.json"), *job[1:])
+        for index, job in enumerate(jobs)
+        if index in handles
+    ]
+
+
+def plan_contour_jobs(
+    source: Path,
+    output_root: Path,
+    bounds_wgs84: Dict[str, float],
+    min_zoom: int,
+    max_zoom: int,
+    layer_name: str = "contours",
+    columns_per_job: int = 8,
+    tiles: Optional[Set[Tuple[int, int, int]]] = None,
+) -> List[ContourJob]:
+    """Split each zoom into column stripes covering the bbox (or only the stripes holding ``tiles``)."""
+    corners = lonlat_to_world(np.array([
+        [bounds_wgs84["minLon"], bounds_wgs84["maxLat"]],
+        [bounds_wgs84["maxLon"], bounds_wgs84["minLat"]],
+    ]))
+    jobs = []
+    for zoom in range(min_zoom, max_zoom + 1):
+        columns = _tile_range(corners[0][0], corners[1][0], zoom, BUFFER / EXTENT)
+        for first in range(columns.start, columns.stop, columns_per_job):
+            last = min(first + columns_per_job, columns.stop) - 1
+            only = None
+            if tiles is not None:
+                only = frozenset((x, y) for z, x, y in tiles if z == zoom and first <= x <= last)
+                if not only:
+                    continue
+            jobs.append((str(source), zoom, first, last, str(output_root), layer_name, only))
+    return jobs
+
+
+def write_contour_tiles(
+    source: Path,
+    output_root: Path,
+    bounds_wgs84: Dict[str, float],
+    min_zoom: int,
+    max_zoom: int,
+    workers: int | None = None,
+    tiles: Optional[Set[Tuple[int, int, int]]] = None,
+) -> Dict:
+    """
+    Encode contours/{z}/{x}/{y}.pbf directly from zoom-banded GeoJSONSeq.
+    Pass ``tiles`` to encode only those (z, x, y) positions.
+    """
+    require_numpy()
+    jobs = plan_contour_jobs(source, output_root, bounds_wgs84, min_zoom, max_zoom, tiles=tiles)
+    workers = max(1, workers or os.cpu_count() or 1)
+    tile_count = 0
+    byte_count = 0
+    Path(output_root).parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="contour-slices-", dir=Path(output_root).parent) as slice_dir:
+        jobs = split_contour_source(source, jobs, Path(slice_dir))
+        # Largest zooms first so the long jobs start early.
+        jobs.sort(key=lambda job: (-job[1], job[2]))
+        if workers == 1:
+            results: Iterator[Tuple[int, int]] = map(encode_contour_job, jobs)
+            for tiles, written in results:
+                tile_count += tiles
+                byte_count += written
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for tiles, written in pool.map(encode_contour_job, jobs):
+                    tile_count += tiles
+                    byte_count += written
+    return {"tile_count": tile_count, "bytes": byte_count, "jobs": len(jobs)}
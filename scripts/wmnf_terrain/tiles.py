@@ -0,0 +1,156 @@
+"""
+XYZ tile pyramid helpers: enumeration and shared-blob deduplication.
+
+Hillshade tiles at the edges of the padded bbox are usually fully transparent
+(nodata) or a single flat colour. Those tiles are stored once under
+``<layer>/_shared/<sha256-prefix>.png`` and every duplicate position is
+recorded in a tile index instead of being written to disk and R2.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - surfaced when dedupe actually runs
+    Image = None
+
+SHARED_DIR_NAME = "_shared"
+
+
+def tile_id(z: int, x: int, y: int) -> str:
+    return f"{z}/{x}/{y}"
+
+
+def iter_tile_files(layer_root: Path, suffix: str) -> Iterator[Tuple[str, Path]]:
+    """Yield ("z/x/y", path) for every tile in an XYZ directory, in z/x/y order."""
+    if not layer_root.exists():
+        return
+    z_dirs = [p for p in layer_root.iterdir() if p.is_dir() and p.name.isdigit()]
+    for z_dir in sorted(z_dirs, key=lambda p: int(p.name)):
+        x_dirs = [p for p in z_dir.iterdir() if p.is_dir() and p.name.isdigit()]
+        for x_dir in sorted(x_dirs, key=lambda p: int(p.name)):
+            tiles = [p for p in x_dir.iterdir() if p.is_file() and p.name.endswith(suffix)]
+            for tile in sorted(tiles, key=lambda p: int(p.name[: -len(suffix)] or 0)):
+                stem = tile.name[: -len(suffix)]
+                if stem.isdigit():
+                    yield tile_id(int(z_dir.name), int(x_dir.name), int(stem)), tile
+
+
+def classify_png_tile(data: bytes) -> Optional[str]:
+    """
+    Return a pixel signature for tiles that carry no detail, else None.
+
+    Fully transparent tiles all share the "transparent" signature regardless
+    of their colour channels; constant tiles are keyed by mode, size and value.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required for tile deduplication. Install with `python -m pip install pillow`.")
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        bands = image.getbands()
+        extrema = image.getextrema()
+        if len(bands) == 1:
+            extrema = (extrema,)
+        if "A" in bands and extrema[bands.index("A")][1] == 0:
+            return "transparent"
+        if all(low == high for low, high in extrema):
+            values = ",".join(str(low) for low, _ in extrema)
+            return f"uniform:{image.mode}:{image.width}x{image.height}:{values}"
+    return None
+
+
+def _prune_empty_dirs(layer_root: Path) -> None:
+    for directory in sorted((p for p in layer_root.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True):
+        if not any(directory.iterdir()):
+            directory.rmdir()
+
+
+def dedupe_tile_layer(
+    layer_root: Path,
+    suffix: str = ".png",
+    classify: Callable[[bytes], Optional[str]] = classify_png_tile,
+    previous: Optional[Dict] = None,
+    invalidated: Iterable[str] = (),
+) -> Tuple[Dict, List[str]]:
+    """
+    Collapse transparent/uniform tiles in ``layer_root`` into shared blobs.
+
+    Groups of two or more tiles with the same signature are replaced by one
+    blob (the smallest encoding in the group). Returns the tile index that is
+    written into metadata.json and the ids of the tile files it unlinked.
+
+    For incremental rebuilds pass the ``previous`` index: its entries are kept
+    except for ``invalidated`` tile ids, and freshly written tiles matching an
+    existing blob join it even when they are the only new member.
+    """
+    shared_root = layer_root / SHARED_DIR_NAME
+    blobs: Dict[str, List[str]] = {}
+    known_blobs: Dict[str, str] = {}
+    logical_count = 0
+    if previous:
+        dropped = set(invalidated)
+        for blob_name, ids in previous.get("blobs", {}).items():
+            blob_path = shared_root / blob_name
+            kept = [tid for tid in ids if tid not in dropped]
+            if not kept or not blob_path.exists():
+                continue
+            blobs[blob_name] = kept
+            logical_count += len(kept)
+            signature = classify(blob_path.read_bytes())
+            if signature is not None:
+                known_blobs.setdefault(signature, blob_name)
+
+    groups: Dict[str, List[Tuple[str, Path, bytes]]] = {}
+    for tid, path in iter_tile_files(layer_root, suffix):
+        logical_count += 1
+        data = path.read_bytes()
+        signature = classify(data)
+        if signature is not None:
+            groups.setdefault(signature, []).append((tid, path, data))
+
+    duplicate_count = sum(len(ids) for ids in blobs.values())
+    unlinked: List[str] = []
+    bytes_saved = 0
+    for signature in sorted(groups):
+        members = groups[signature]
+        blob_name = known_blobs.get(signature)
+        if blob_name is None:
+            if len(members) < 2:
+                continue
+            blob = min((data for _, _, data in members), key=len)
+            blob_name = f"{hashlib.sha256(blob).hexdigest()[:16]}{suffix}"
+            shared_root.mkdir(parents=True, exist_ok=True)
+            (shared_root / blob_name).write_bytes(blob)
+            bytes_saved -= len(blob)
+        blobs.setdefault(blob_name, [])
+        for tid, path, data in members:
+            blobs[blob_name].append(tid)
+            bytes_saved += len(data)
+            path.unlink()
+            unlinked.append(tid)
+        duplicate_count += len(members)
+
+    if shared_root.exists():
+        for stale in shared_root.iterdir():
+            if stale.is_file() and stale.name not in blobs:
+                stale.unlink()
+    if blobs or previous:
+        _prune_empty_dirs(layer_root)
+
+    index = {
+        "shared_dir": SHARED_DIR_NAME,
+        "logical_tile_count": logical_count,
+        "deduplicated_tile_count": duplicate_count,
+        "bytes_saved": bytes_saved,
+        "blobs": {name: sorted(set(ids), key=_tile_sort_key) for name, ids in sorted(blobs.items())},
+    }
+    return index, sorted(unlinked, key=_tile_sort_key)
+
+
+def _tile_sort_key(tid: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in tid.split("/"))
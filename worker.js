@@ -35,6 +35,7 @@ let wikiAnimalsCache = null;
 let wikiPlantDiseasesCache = null;
 let wikiForestHealthFlowchartBase64Cache = null;
 let ogCardsManifestCache = null;
+let wmnfHillshadeSharedIndexCache = null;
 
 export default {
   async fetch(request, env, ctx) {
@@ -127,6 +128,7 @@ export default {
     const WMNF_STYLIZED_PREFIX = 'tiles/wmnf-stylized/v1';
     const WMNF_HILLSHADE_PREFIX = `${WMNF_STYLIZED_PREFIX}/hillshade`;
     const WMNF_CONTOURS_PREFIX = `${WMNF_STYLIZED_PREFIX}/contours`;
+    const WMNF_TERRAIN_PREFIX = `${WMNF_STYLIZED_PREFIX}/terrain`;
     const WMNF_METADATA_KEY = `${WMNF_STYLIZED_PREFIX}/metadata.json`;
     const LONG_TILE_CACHE_CONTROL = 'public, max-age=31536000, immutable';
     const STYLE_METADATA_CACHE_CONTROL = 'public, max-age=300';
@@ -213,6 +215,28 @@ export default {
       return { minX, minY, maxX, maxY };
     };
 
+    const loadWmnfHillshadeSharedIndex = async () => {
+      const now = Date.now();
+      if (wmnfHillshadeSharedIndexCache && now - wmnfHillshadeSharedIndexCache.loadedAt < 300000) {
+        return wmnfHillshadeSharedIndexCache.lookup;
+      }
+      const lookup = new Map();
+      try {
+        const metadataObject = await env.WMNF_TILE_DATA.get(WMNF_METADATA_KEY);
+        const metadata = metadataObject ? await metadataObject.json() : null;
+        const sharedTiles = metadata?.hillshade?.shared_tiles;
+        const sharedDir = cleanText(sharedTiles?.shared_dir) || '_shared';
+        Object.entries(sharedTiles?.blobs || {}).forEach(([blobName, tileIds]) => {
+          if (!Array.isArray(tileIds)) return;
+          tileIds.forEach((tileId) => lookup.set(String(tileId), `${sharedDir}/${blobName}`));
+        });
+      } catch (error) {
+        console.warn('[wmnf] Failed to load hillshade shared tile index', error);
+      }
+      wmnfHillshadeSharedIndexCache = { loadedAt: now, lookup };
+      return lookup;
+    };
+
     const boundsIntersect = (a, b) => {
       if (!a || !b) return false;
       if (a.maxX < b.minX || a.minX > b.maxX) return false;
@@ -246,7 +270,8 @@ export default {
         version: 'wmnf_v1',
         available: false,
         hillshadeTemplate: '/api/tiles/wmnf-hillshade/{z}/{x}/{y}.png',
-        contourTemplate: '/api/tiles/wmnf-contours/{z}/{x}/{y}.pbf'
+        contourTemplate: '/api/tiles/wmnf-contours/{z}/{x}/{y}.pbf',
+        terrainTemplate: '/api/tiles/wmnf-terrain/{z}/{x}/{y}.png'
       };
         if (!env.WMNF_TILE_DATA) {
           const payload = {
@@ -326,8 +351,15 @@ export default {
         });
       }
       const [, z, x, y] = match;
-      const key = `${WMNF_HILLSHADE_PREFIX}/${z}/${x}/${y}.png`;
+      // The shared-blob index is authoritative: a leftover standalone object
+      // must not shadow the blob the current build assigned to this tile.
+      const sharedIndex = await loadWmnfHillshadeSharedIndex();
+      const sharedPath = sharedIndex.get(`${z}/${x}/${y}`);
+      const key = sharedPath
+        ? `${WMNF_HILLSHADE_PREFIX}/${sharedPath}`
+        : `${WMNF_HILLSHADE_PREFIX}/${z}/${x}/${y}.png`;
       const tileObject = await env.WMNF_TILE_DATA.get(key);
+      const tileSource = sharedPath ? 'r2-shared' : 'r2-hit';
       if (!tileObject) {
         return new Response('WMNF hillshade tile not found.', {
           status: 404,
@@ -342,7 +374,7 @@ export default {
         status: 200,
         headers: tileResponseHeadersWithDebug('image/png', LONG_TILE_CACHE_CONTROL, {
           'X-WMNF-Route': 'hillshade',
-          'X-WMNF-Source': 'r2-hit',
+          'X-WMNF-Source': tileSource,
           'X-WMNF-Tile-Key': key
         })
       });
@@ -408,6 +440,66 @@ export default {
       });
     }
 
+    if (pathname.startsWith('/api/tiles/wmnf-terrain/')) {
+      const match = pathname.match(/^\/api\/tiles\/wmnf-terrain\/(\d+)\/(\d+)\/(\d+)\.png$/);
+      if (!match) {
+        return new Response('Invalid WMNF terrain tile path.', {
+          status: 400,
+          headers: tileResponseHeadersWithDebug('text/plain; charset=utf-8', STYLE_METADATA_CACHE_CONTROL, {
+            'X-WMNF-Route': 'terrain',
+            'X-WMNF-Error': 'invalid-path'
+          })
+        });
+      }
+      if (request.method === 'OPTIONS') {
+        return new Response(null, {
+          status: 204,
+          headers: tileResponseHeadersWithDebug('image/png', LONG_TILE_CACHE_CONTROL, {
+            'X-WMNF-Route': 'terrain'
+          })
+        });
+      }
+      if (!['GET', 'HEAD'].includes(request.method)) {
+        return new Response('Method Not Allowed', {
+          status: 405,
+          headers: tileResponseHeadersWithDebug('text/plain; charset=utf-8', STYLE_METADATA_CACHE_CONTROL, {
+            'X-WMNF-Route': 'terrain',
+            'X-WMNF-Error': 'method-not-allowed'
+          })
+        });
+      }
+      if (!env.WMNF_TILE_DATA) {
+        return new Response('Stylized tile bucket binding unavailable.', {
+          status: 503,
+          headers: tileResponseHeadersWithDebug('text/plain; charset=utf-8', STYLE_METADATA_CACHE_CONTROL, {
+            'X-WMNF-Route': 'terrain',
+            'X-WMNF-Source': 'binding-missing'
+          })
+        });
+      }
+      const [, z, x, y] = match;
+      const key = `${WMNF_TERRAIN_PREFIX}/${z}/${x}/${y}.png`;
+      const tileObject = await env.WMNF_TILE_DATA.get(key);
+      if (!tileObject) {
+        return new Response('WMNF terrain tile not found.', {
+          status: 404,
+          headers: tileResponseHeadersWithDebug('text/plain; charset=utf-8', STYLE_METADATA_CACHE_CONTROL, {
+            'X-WMNF-Route': 'terrain',
+            'X-WMNF-Source': 'r2-miss',
+            'X-WMNF-Tile-Key': key
+          })
+        });
+      }
+      return new Response(request.method === 'HEAD' ? null : tileObject.body, {
+        status: 200,
+        headers: tileResponseHeadersWithDebug('image/png', LONG_TILE_CACHE_CONTROL, {
+          'X-WMNF-Route': 'terrain',
+          'X-WMNF-Source': 'r2-hit',
+          'X-WMNF-Tile-Key': key
+        })
+      });
+    }
+
     if (pathname.startsWith('/api/tiles/opentopo/')) {
       const match = pathname.match(/^\/api\/tiles\/opentopo\/(\d+)\/(\d+)\/(\d+)\.(png|jpg)$/);
       if (!match) {